@@ -26,14 +26,13 @@ martin.tastler@posteo.de
 Date: August 2025
 
 """
-import sys, os, socket
-import subprocess
-import platform
-import ipaddress
+import sys, os
 import threading
+import ipaddress
+from functools import lru_cache
 
-from PyQt6.QtCore import QThread, pyqtSignal
-from PyQt6.QtWidgets import QApplication, QMainWindow
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal, Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtWidgets import QApplication, QMainWindow, QHeaderView, QAbstractItemView
 
 """
      in terminal: 
@@ -45,6 +44,21 @@ from PyQt6.QtWidgets import QApplication, QMainWindow
  """
 from portscanner_gui import Ui_MainWindow
 
+# scan engines without Qt (also usable with: python -m portscanner ...)
+from portscanner import (NetworkScan, OpenPortsScan, FreePortsScan, ReverseResolver, HostnameCache, DNS_CACHE_FILE,
+                         RttTable, ScanHistory, local_ipv4, local_network)
+from portscanner.history import diff_results
+from portscanner.delta import target_key
+from portscanner.stream import ResultBatcher
+
+# results are handed to the GUI at most every 100 ms
+BATCH_INTERVAL = 0.1
+
+# wait for the user to stop typing before the result tables are filtered
+FILTER_DELAY_MS = 200
+
+# words of the filter field: "host:10.0.0", "port:22" or "port:1000-2000", "state:open"
+FILTER_FIELDS = {"host": 0, "port": 1, "state": 2}
 
 
 def resource_path(relative_path):
@@ -54,211 +68,279 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# Tool for ARP Table scan
-try:
-    from scapy.all import ARP, Ether, srp
-    SCAPY_AVAILABLE = True
-except ImportError:
-    SCAPY_AVAILABLE = False
-
-# Scanner-class for Network-scan
-class NetworkScanner(QThread):
-
-    # starting a own process
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(list)
-
-    def __init__(self, mode="ping", network="192.168.1.0/24", stop_event=None):
-        super().__init__()  # calling QThread-constructor
-        self.network = network
-        self.mode = mode
-        self.stop_event = stop_event or threading.Event()
-        self.ping_thread = None
-        self.found_hosts = []
-
-    def run(self):
-        hosts = []
 
-        if self.mode == "ping":
-            hosts = self.scan_with_ping()
-        elif self.mode == "dns":
-            hosts = self.scan_with_dns()
-        elif self.mode == "arp":
-            hosts = self.scan_with_arp()
-
-        self.finished.emit(hosts)
-
-    # 1) Ping-Scan can not good work with Stop
-    def scan_with_ping(self):
+# addresses in numeric order (10.0.0.9 before 10.0.0.10), names after them
+@lru_cache(maxsize=65536)
+def host_sort_key(host):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return 7, 0, host
+    return address.version, int(address), ""
+
+
+# "127.0.0 port:22 state:open" -> [(column, text)], every word has to match, words without field: any column
+def parse_filter(text):
+    terms = []
+    for word in text.lower().split():
+        field, _, value = word.partition(":")
+        if field in FILTER_FIELDS and value:
+            terms.append((FILTER_FIELDS[field], value))
+        else:
+            terms.append((None, word))
+    return terms
 
-        # Reset before starting
-        if hasattr(self, 'ping_thread') and self.ping_thread is not None:
-            self.ping_thread.stop_event.set()
 
+def term_matches(row, column, value):
+    if column is None:
+        return any(term_matches(row, c, value) for c in range(len(row)))
+    if column == 1:
+        # port: exact or range, 22 does not match 2200
+        start, _, end = value.partition("-")
         try:
-            all_ips = list(ipaddress.IPv4Network(self.network, strict=False))
-            total = len(all_ips) or 1
-            is_win = platform.system().lower().startswith("win")
-
-            for i, ip in enumerate(all_ips, start=1):
-                if self.stop_event.is_set():
-                    break
-
-                ip = str(ip)
-                cmd = ["ping", "-n" if is_win else "-c", "1", ip]
-                if is_win:
-                    cmd += ["-w", "300"]  # 300 ms Timeout unter Windows
-
-                try:
-                    subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
-                    self.found_hosts.append(ip)
-                except subprocess.CalledProcessError:
-                    pass
-
-                self.progress.emit(int(i / total * 100))
-        except Exception as e:
-            print(f"Ping scan error: {e}")
-
-
-    # 2) DNS Scan
-    def scan_with_dns(self):
-        if self.stop_event.is_set():
-            return []
-
-        results = []
+            return int(start) <= row[1] <= int(end or start)
+        except ValueError:
+            return False
+    return value in str(row[column]).lower()
+
+
+# Results of a port scan for a QTableView: every row stays a (host, port, state) tuple, the text of a cell
+# is only built when the view paints it (the view only asks for the rows on screen)
+# rows come in batches that are merged into the sort order, sort() and set_filter() work on the tuples
+class ResultTableModel(QAbstractTableModel):
+
+    COLUMNS = ("Host", "Port", "State")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []   # all results
+        self.shown = []  # rows that pass the filter, in sort order
+        self.terms = []
+        self.sort_column = None
+        self.descending = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.shown)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(self.shown[index.row()][index.column()])
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() == 1:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def sort_key(self, row):
+        host, port, state = row
+        if self.sort_column == 0:
+            return host_sort_key(host), port
+        if self.sort_column == 2:
+            return state, port, host_sort_key(host)
+        return port, host_sort_key(host)
+
+    def accepts(self, row):
+        return all(term_matches(row, column, value) for column, value in self.terms)
+
+    # one batch of the scan thread: only the batch is sorted, then merged in with one insert per run
+    # of rows that go to the same place (ports come in order -> mostly one run at the end)
+    def add_rows(self, rows):
+        self.rows.extend(rows)
+        rows = [row for row in rows if self.accepts(row)] if self.terms else list(rows)
+        if not rows:
+            return
+        if self.sort_column is None:
+            self.insert_run(len(self.shown), rows)
+            return
+        rows.sort(key=self.sort_key, reverse=self.descending)
+        runs = []  # (position in shown, rows)
+        position = 0
+        for row in rows:
+            position = self.position(self.sort_key(row), position)
+            if runs and runs[-1][0] == position:
+                runs[-1][1].append(row)
+            else:
+                runs.append((position, [row]))
+        # from the back, so the positions in front stay valid
+        for position, run in reversed(runs):
+            self.insert_run(position, run)
+
+    # `a` sorts before `b` in the current order
+    def before(self, a, b):
+        return b < a if self.descending else a < b
+
+    # index in shown for a row with `key`, behind the rows with the same key (binary search from `lo`)
+    def position(self, key, lo=0):
+        hi = len(self.shown)
+        if lo < hi and not self.before(key, self.sort_key(self.shown[-1])):
+            return hi  # the usual case: behind the last row
+        if lo < hi and self.before(key, self.sort_key(self.shown[lo])):
+            return lo  # same place as the row before
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if self.before(key, self.sort_key(self.shown[middle])):
+                hi = middle
+            else:
+                lo = middle + 1
+        return lo
+
+    def insert_run(self, position, rows):
+        self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+        self.shown[position:position] = rows
+        self.endInsertRows()
+
+    # called by the view when a column header is clicked
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = column
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.relayout(sorted(self.shown, key=self.sort_key, reverse=self.descending))
+
+    def set_filter(self, text):
+        self.terms = parse_filter(text)
+        shown = [row for row in self.rows if self.accepts(row)] if self.terms else list(self.rows)
+        if self.sort_column is not None:
+            shown.sort(key=self.sort_key, reverse=self.descending)
+        self.beginResetModel()
+        self.shown = shown
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.shown = []
+        self.endResetModel()
+
+    # same rows in a new order, selection and current row move with their rows
+    def relayout(self, shown):
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        moved = [self.shown[index.row()] for index in old]
+        self.shown = shown
+        if old:
+            positions = {id(row): n for n, row in enumerate(shown)}
+            self.changePersistentIndexList(old, [self.index(positions[id(row)], index.column())
+                                                 for row, index in zip(moved, old)])
+        self.layoutChanged.emit()
 
-        try:
-            all_ips = list(ipaddress.IPv4Network(self.network, strict=False))
-            total = len(all_ips) or 1
 
-            for i, ip in enumerate(all_ips, start=1):
-                if self.stop_event.is_set():
-                    break
+# Scanner-class for Network-scan
+class NetworkScanner(QThread):
 
-                try:
-                    host = socket.gethostbyaddr(str(ip))[0]  # Reverse DNS
-                    results.append(f"{host}: {ip}")
-                except socket.herror:
-                    results.append(f"{ip}: no hostname")
+    # starting a own process
+    progress = pyqtSignal(int)
+    result = pyqtSignal(list)    # new hosts while scanning, batched
+    finished = pyqtSignal(list)  # all hosts, sorted
 
-                self.progress.emit(int(i / total * 100))
+    def __init__(self, mode="ping", network="192.168.1.0/24", stop_event=None, resolver=None, rtt=None):
+        super().__init__()  # calling QThread-constructor
+        self.batcher = ResultBatcher(self.result.emit, interval=BATCH_INTERVAL)
+        self.scan = NetworkScan(mode=mode, network=network, stop_event=stop_event, resolver=resolver,
+                                progress=self.report_progress, rtt=rtt)
 
-        except Exception as e:
-            print(f"DNS scan error: {e}")
+    @property
+    def stop_event(self):
+        return self.scan.stop_event
 
-        return results
+    @property
+    def metrics(self):
+        return self.scan.metrics
 
-    # 3) ARP Scan
-    def scan_with_arp(self):
-        if self.stop_event.is_set():
-            return []
+    def report_progress(self, percent):
+        self.progress.emit(percent)
+        self.batcher.tick()
 
-        if not SCAPY_AVAILABLE:
-            return []
+    def run(self):
+        pairs = []
+        for ip, host in self.scan.iter_pairs():
+            pairs.append((ip, host))
+            self.batcher.add(host)
+        self.batcher.flush()
+        self.addresses = [ip for ip, _ in pairs]
+        self.finished.emit(NetworkScan.collect(pairs))
 
-        try:
-            arp = ARP(pdst=self.network)
-            ether = Ether(dst="ff:ff:ff:ff:ff:ff")
-            packet = ether / arp
-            result = srp(packet, timeout=2, verbose=0)[0]
-
-            devices = []
-            for _, received in result:
-                ip = received.psrc
-                mac = received.hwsrc
-                # optional: versuche Hostname per socket.gethostbyaddr()
-                try:
-                    hostname = socket.gethostbyaddr(ip)[0]
-                except socket.herror:
-                    hostname = "unknown"
-                devices.append({"ip": ip, "mac": mac, "hostname": hostname})
-            return devices
-        except PermissionError:
-            return []  # falls kein Admin
-
-        except Exception as e:
-            print(f"ARP Scan Error: {e}")
-            return []
-
-    # own stop-Event
     def stop(self):
-        self.stop_event = threading.Event()
+        self.scan.stop()
 
 
 
 # Scanner for open Ports for anit freezing window
 class OpenPortsScanner(QThread):
     progress = pyqtSignal(int)
-    finished = pyqtSignal(list)
+    result = pyqtSignal(list)    # new open ports while scanning, batched
+    finished = pyqtSignal(list)  # all open ports, sorted
 
     # function scanning open ports on local host
-    def __init__(self,  host="127.0.0.1", start=1, end=1024, timeout=0.5):
+    # concurrency = number of connects in flight at the same time
+    def __init__(self,  host="127.0.0.1", start=1, end=1024, timeout=0.5, concurrency=1000, rtt=None):
         super().__init__()
-        self.host = host
-        self.start_port = start
-        self.end_port = end
-        self.timeout = timeout
-        self.stop_event = threading.Event()
+        self.batcher = ResultBatcher(self.result.emit, interval=BATCH_INTERVAL)
+        self.scan = OpenPortsScan(host, start, end, timeout=timeout, concurrency=concurrency,
+                                  progress=self.report_progress, rtt=rtt)
+
+    @property
+    def stop_event(self):
+        return self.scan.stop_event
+
+    @property
+    def metrics(self):
+        return self.scan.metrics
+
+    def report_progress(self, percent):
+        self.progress.emit(percent)
+        self.batcher.tick()
 
     def run(self):
         open_ports = []
+        for port in self.scan.iter_results():
+            open_ports.append(port)
+            self.batcher.add(port)
+        self.batcher.flush()
+        self.finished.emit(sorted(open_ports))
 
-        for port in range(self.start_port, self.end_port + 1):
-            # check for stop is called
-            if self.stop_event.is_set():
-                break
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(self.timeout)
-                result = s.connect_ex((self.host, port))
-                if result == 0:
-                    open_ports.append(port)
-            progress = int((port - self.start_port) / (self.end_port - self.start_port) * 100)
-            self.progress.emit(progress)
-
-        self.finished.emit(open_ports)
-
-    # own stop-Event
     def stop(self):
-        self.stop_event = threading.Event()
+        self.scan.stop()
 
 
 
 # Scanner for open Ports for anit freezing window
 class FreePortsScanner(QThread):
     progress = pyqtSignal(int)
-    finished = pyqtSignal(list)
+    result = pyqtSignal(list)    # new free ports while scanning, batched
+    finished = pyqtSignal(list)  # all free ports
 
     def __init__(self, start=1, end=65535):
         super().__init__()
-        self.start_port = start
-        self.end_port = end
-        self.stop_event = threading.Event()
+        self.batcher = ResultBatcher(self.result.emit, interval=BATCH_INTERVAL)
+        self.scan = FreePortsScan(start, end, progress=self.report_progress)
 
-    def run(self):
-        free_ports = []
-        total_ports = self.end_port - self.start_port + 1
-
-        for idx, port in enumerate(range(self.start_port, self.end_port + 1), start=1):
+    @property
+    def stop_event(self):
+        return self.scan.stop_event
 
-            # check for stop is called
-            if self.stop_event.is_set():
-                break
+    @property
+    def metrics(self):
+        return self.scan.metrics
 
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(0.01)
-                try:
-                    s.bind(("", port))  # if its possible -> Port is free
-                    free_ports.append(port)
-                except OSError:
-                    pass  # Port not free
-
-            self.progress.emit(int((idx / total_ports) * 100))
+    def report_progress(self, percent):
+        self.progress.emit(percent)
+        self.batcher.tick()
 
+    def run(self):
+        free_ports = []
+        for port in self.scan.iter_results():
+            free_ports.append(port)
+            self.batcher.add(port)
+        self.batcher.flush()
         self.finished.emit(free_ports)
 
-    # own stop-Event
     def stop(self):
-        self.stop_event = threading.Event()
+        self.scan.stop()
 
 class MainApp(QMainWindow):
     def __init__(self):
@@ -286,6 +368,15 @@ class MainApp(QMainWindow):
         # Stop-Event global for all Threads
         self.stop_event = threading.Event()
 
+        # Reverse-DNS answers are kept between scans and program runs
+        self.resolver = ReverseResolver(cache=HostnameCache(path=DNS_CACHE_FILE))
+
+        # measured round trip times, host scan and port scan learn from each other
+        self.rtt = RttTable(initial=0.5)
+
+        # results of every finished scan, to show what changed since the last one
+        self.history = ScanHistory()
+
         # Button Events:
         # laying function on close Button
         self.ui.closeBtn.clicked.connect(self.close)
@@ -314,13 +405,60 @@ class MainApp(QMainWindow):
         self.free_ports_thread = None
         self.open_ports_thread = None
 
+        # port results as tables, the filter field filters both
+        self.free_ports_model = ResultTableModel(self)
+        self.open_ports_model = ResultTableModel(self)
+        self.setup_table(self.ui.freePortsTable, self.free_ports_model)
+        self.setup_table(self.ui.openPortsTable, self.open_ports_model)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.filter_ports)
+        self.ui.portFilterEdit.textChanged.connect(self.filter_timer.start)
+
+        # live scan metrics in the status bar
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_status)
+        self.status_timer.start(500)
+
+    # fixed row height -> the view never measures rows that are not on screen
+    def setup_table(self, view, model):
+        view.setModel(model)
+        header = view.verticalHeader()
+        header.setVisible(False)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        header.setDefaultSectionSize(20)
+        view.horizontalHeader().setStretchLastSection(True)
+        view.setColumnWidth(0, 110)
+        view.setColumnWidth(1, 60)
+        view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        view.setSortingEnabled(True)
+        view.sortByColumn(1, Qt.SortOrder.AscendingOrder)
+
+    def filter_ports(self):
+        text = self.ui.portFilterEdit.text()
+        self.free_ports_model.set_filter(text)
+        self.open_ports_model.set_filter(text)
+
+    # metrics of all running scans in the status bar
+    def update_status(self):
+        messages = []
+        for thread in (self.thread, self.open_ports_thread, self.free_ports_thread):
+            try:
+                if thread is not None and thread.isRunning():
+                    messages.append(thread.metrics.summary())
+            except RuntimeError:
+                pass  # Qt object already deleted
+        if messages:
+            self.ui.statusbar.showMessage(" | ".join(messages))
+
     # function for reset/cleaning fields
     def clear_fields(self):
         self.ui.localHostsText.clear()
         self.ui.progressBarHosts.setValue(0)
-        self.ui.freePortsText.clear()
+        self.free_ports_model.clear()
         self.ui.progressBarFree.setValue(0)
-        self.ui.openPortsText.clear()
+        self.open_ports_model.clear()
         self.ui.progressBarOpen.setValue(0)
         self.ui.ipAddressText.clear()
 
@@ -349,10 +487,13 @@ class MainApp(QMainWindow):
     def show_free_ports(self):
 
         self.ui.freeBtn.setEnabled(False)
-        self.ui.freePortsText.setText(f"Scanning")
+        self.free_ports_model.clear()
+        self.ui.statusbar.showMessage("Scanning free ports...")
 
         self.free_ports_thread = FreePortsScanner()
         self.free_ports_thread.progress.connect(self.ui.progressBarFree.setValue)
+        self.free_ports_thread.result.connect(
+            lambda ports: self.free_ports_model.add_rows([("localhost", port, "free") for port in ports]))
         self.free_ports_thread.finished.connect(lambda ports, t=self.free_ports_thread: self.scan_free_finished(ports, t))
         self.free_ports_thread.start()
 
@@ -360,51 +501,73 @@ class MainApp(QMainWindow):
     # function for getting open ports on the system
     def show_open_ports(self):
         self.ui.openPortsBtn.setEnabled(False)
-        self.ui.openPortsText.setText(f"Scanning...")
+        self.open_ports_model.clear()
+        self.ui.statusbar.showMessage("Scanning open ports...")
 
-        self.open_ports_thread = OpenPortsScanner()
+        self.open_ports_thread = OpenPortsScanner(rtt=self.rtt)
+        host = self.open_ports_thread.scan.host
         self.open_ports_thread.progress.connect(self.ui.progressBarOpen.setValue)
+        self.open_ports_thread.result.connect(
+            lambda ports: self.open_ports_model.add_rows([(host, port, "open") for port in ports]))
         self.open_ports_thread.finished.connect(lambda ports,  t=self.open_ports_thread: self.scan_open_finished(ports, t))
         self.open_ports_thread.start()
 
 
+    # store a finished scan -> (new, gone) compared with the last scan of the same target
+    def record_history(self, kind, target, results):
+        baseline = self.history.last_run(kind, target)
+        before = self.history.results(baseline) if baseline is not None else None
+        self.history.save_run(kind, target, results)
+        if before is None:
+            return [], []
+        return diff_results(before, set(results))
+
+    # "Since the last scan: new ... | gone ..." or None if nothing changed
+    def changes_text(self, new, gone):
+        parts = []
+        if new:
+            parts.append("new " + ", ".join(str(port or host) for host, port in new))
+        if gone:
+            parts.append("gone " + ", ".join(str(port or host) for host, port in gone))
+        return "Since the last scan: " + " | ".join(parts) if parts else None
+
     # function finish open ports
+    # the rows are already in the table (result batches), only the summary goes to the status bar
     def scan_open_finished(self,open_ports, thread):
         self.ui.openPortsBtn.setEnabled(True)
         if open_ports:
-            self.ui.openPortsText.append("Open ports on your system:")
-            for port in open_ports:
-                self.ui.openPortsText.append(f"[+] Port {port}")
+            messages = [f"{len(open_ports)} open ports on your system."]
         else:
-            self.ui.openPortsText.append("No open ports found.")
+            messages = ["No open ports found."]
+        if not thread.stop_event.is_set():
+            scan = thread.scan
+            new, gone = self.record_history("ports", target_key(scan.host, f"{scan.start_port}-{scan.end_port}"),
+                                            [(scan.host, port) for port in open_ports])
+            changes = self.changes_text(new, gone)
+            if changes:
+                messages.append(changes)
         thread.deleteLater()
-        if hasattr(self, 'free_ports_thread') and self.free_ports_thread == thread:
+        self.ui.statusbar.showMessage(" | ".join(messages + [thread.metrics.summary()]))
+        if hasattr(self, 'open_ports_thread') and self.open_ports_thread == thread:
             self.open_ports_thread = None
 
     # function finish free ports
     def scan_free_finished(self, free_ports, thread):
         self.ui.freeBtn.setEnabled(True)
         if free_ports:
-            self.ui.freePortsText.append("Free ports on your system:")
-            for port in free_ports:
-                self.ui.freePortsText.append(f"[+] Port {port}")
+            message = f"{len(free_ports)} free ports on your system."
         else:
-            self.ui.freePortsText.append("No free ports found.")
+            message = "No free ports found."
         thread.deleteLater()
+        self.ui.statusbar.showMessage(f"{message} | {thread.metrics.summary()}")
         if hasattr(self, 'free_ports_thread') and self.free_ports_thread == thread:
             self.free_ports_thread = None
 
 
     # function for getting the own IP Address
     def show_own_ip(self):
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        try:
-            # Verbindung ins Internet simulieren (keine Daten werden gesendet)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-        finally:
-            s.close()
-        self.ui.ipAddressText.setText(ip)
+        # Verbindung ins Internet simulieren (keine Daten werden gesendet)
+        self.ui.ipAddressText.setText(local_ipv4())
 
 
     # function for getting local IPs
@@ -423,8 +586,10 @@ class MainApp(QMainWindow):
 
         if mode:
             # Thread starten
-            self.thread = NetworkScanner(mode=mode, network="192.168.1.0/24", stop_event=self.stop_event)
+            self.thread = NetworkScanner(mode=mode, network=local_network(), stop_event=self.stop_event,
+                                         resolver=self.resolver, rtt=self.rtt)
             self.thread.progress.connect(self.ui.progressBarHosts.setValue)
+            self.thread.result.connect(self.append_hosts)
             self.thread.finished.connect(self.scan_hosts_finished)
             self.thread.start()
         else:
@@ -437,14 +602,32 @@ class MainApp(QMainWindow):
         """
 
 
+    # hosts found while the scan is still running, the sorted list follows in scan_hosts_finished
+    def append_hosts(self, hosts):
+        lines = []
+        for host in hosts:
+            if isinstance(host, dict):
+                lines.append(f"{host['hostname']}: {host['mac']} | {host['ip']}")
+            else:
+                lines.append(str(host))
+        self.ui.localHostsText.append("\n".join(lines))
+
     # results in a separate methode
     def scan_hosts_finished(self, hosts):
         self.ui.hostsBtn.setEnabled(True)
         self.ui.stopBtn.setEnabled(True)
+        changes = None
+        if self.thread is not None and not self.stop_event.is_set() and self.thread.scan.mode in ("ping", "arp"):
+            new, gone = self.record_history("hosts", target_key(self.thread.scan.network),
+                                            [(ip, None) for ip in self.thread.addresses])
+            changes = self.changes_text(new, gone)
         self.stop_event.clear()
+        self.resolver.cache.save()
+        if self.thread is not None:
+            self.ui.statusbar.showMessage(self.thread.metrics.summary())
 
         if not hosts:
-            self.ui.localHostsText.setText("No Hosts found.")
+            self.ui.localHostsText.setText("No Hosts found." + (f"\n{changes}" if changes else ""))
             return
 
         # ARP Results
@@ -459,6 +642,8 @@ class MainApp(QMainWindow):
         else:
             text = str(hosts)
 
+        if changes:
+            text += "\n" + changes
         self.ui.localHostsText.setText(text)
 
 
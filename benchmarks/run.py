@@ -0,0 +1,224 @@
+"""
+Benchmarks for the scan engines against the local target simulator
+
+    python benchmarks/run.py                          all cases
+    python benchmarks/run.py -c tcp-one-host -c udp   only these
+    python benchmarks/run.py --save baseline.json     keep the numbers
+    python benchmarks/run.py --compare baseline.json  exit code 1 if a case got worse than --tolerance
+
+Every case runs in its own process (peak RSS per engine), the simulator in this one.
+Reported: ports/s, hosts/s, p50 / p99 latency per probe and peak RSS.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import TargetSimulator, netem_delay  # noqa: E402
+
+OPEN_PORTS = range(20000, 22000)
+DROPPED_PORTS = range(22000, 22200)
+UDP_PORTS = range(9000, 9020)
+MULTI_HOSTS = [f"127.0.1.{i}" for i in range(1, 65)]
+MULTI_PORTS = [22, 80, 443, 3306, 8080]
+NETEM_DELAY_MS = 20
+
+# name -> simulator settings (the scan itself is built in the child, see build_scan)
+CASES = {
+    "tcp-one-host": {"open_ports": OPEN_PORTS, "dropped_ports": DROPPED_PORTS},
+    "tcp-hosts": {"hosts": MULTI_HOSTS, "open_ports": MULTI_PORTS},
+    "tcp-sharded": {"open_ports": OPEN_PORTS, "dropped_ports": DROPPED_PORTS},
+    "tcp-syn": {"open_ports": OPEN_PORTS, "dropped_ports": DROPPED_PORTS},
+    "tcp-services": {"open_ports": OPEN_PORTS, "banner": b"SSH-2.0-OpenSSH_9.6\r\n"},
+    "tcp-latency": {"hosts": MULTI_HOSTS, "open_ports": MULTI_PORTS, "netem": NETEM_DELAY_MS},
+    "udp": {"udp_ports": UDP_PORTS},
+    "pipeline": {"hosts": MULTI_HOSTS, "open_ports": MULTI_PORTS},
+    "icmp": {},
+    "free-table": {},
+    "free-bind": {},
+}
+
+
+# scan object, number of probed ports, number of hosts
+def build_scan(name, rtt):
+    from portscanner import TargetScan, ShardedScan, UdpScan, PipelineScan, NetworkScan, FreePortsScan
+
+    if name == "tcp-one-host":
+        return TargetScan("127.0.0.1", "1-65535", rtt=rtt), 65535, 1
+    if name in ("tcp-hosts", "tcp-latency"):
+        return TargetScan(MULTI_HOSTS, "1-1024", rtt=rtt), 1024 * len(MULTI_HOSTS), len(MULTI_HOSTS)
+    if name == "tcp-sharded":
+        return ShardedScan("127.0.0.1", "1-65535"), 65535, 1
+    if name == "tcp-syn":
+        scan = TargetScan("127.0.0.1", "1-65535", rtt=rtt, syn=True)
+        if scan.syn is None:
+            raise SystemExit("SYN scan needs root / CAP_NET_RAW")
+        return scan, 65535, 1
+    if name == "tcp-services":
+        return (TargetScan("127.0.0.1", f"{OPEN_PORTS[0]}-{OPEN_PORTS[-1]}", rtt=rtt, services=True),
+                len(OPEN_PORTS), 1)
+    if name == "udp":
+        return UdpScan("127.0.0.1", "1-10000", rate=0, host_rate=100000, concurrency=1000, rtt=rtt), 10000, 1
+    if name == "pipeline":
+        return PipelineScan("127.0.1.0/26", "1-1024", rtt=rtt), 1024 * 62, 62
+    if name == "icmp":
+        return NetworkScan(mode="ping", network="127.0.0.0/22", rtt=rtt, retries=0), 0, 1024
+    if name == "free-table":
+        return FreePortsScan(1, 65535, method="table"), 65535, 1
+    if name == "free-bind":
+        return FreePortsScan(1, 65535, method="bind"), 65535, 1
+    raise ValueError(f"unknown case {name}")
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[int(q * (len(samples) - 1))]
+
+
+def milliseconds(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+# runs in the child process: one scan, measured
+def measure(name):
+    from portscanner import RttTable
+
+    samples = []
+
+    # every answer of the ICMP / connect engines ends up in the RTT table
+    class RecordingRtt(RttTable):
+        def update(self, host, sample):
+            samples.append(sample)
+            super().update(host, sample)
+
+    scan, ports, hosts = build_scan(name, RecordingRtt(initial=0.5))
+    # time of every probe including the wait for a timeout
+    probe_func = getattr(scan, "probe_func", None)
+    if probe_func is not None:
+        samples = []
+
+        async def timed_probe(host, port, timeout, family):
+            start = time.perf_counter()
+            try:
+                return await probe_func(host, port, timeout, family)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        scan.probe_func = timed_probe
+
+    start = time.perf_counter()
+    results = sum(1 for _ in scan.iter_results())
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss: KB on Linux, bytes on macOS; workers of the sharded scan are children
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return {
+        "case": name,
+        "elapsed": round(elapsed, 3),
+        "results": results,
+        "ports_per_sec": round(ports / elapsed, 1) if ports else None,
+        "hosts_per_sec": round(hosts / elapsed, 1),
+        "p50_ms": milliseconds(percentile(samples, 0.50)),
+        "p99_ms": milliseconds(percentile(samples, 0.99)),
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+
+def run_case(name, repeat):
+    settings = dict(CASES[name])
+    delay = settings.pop("netem", None)
+    runs = []
+    with netem_delay(delay or 0) as delayed:
+        if delay and not delayed:
+            return {"case": name, "skipped": "tc netem not available (needs root and sch_netem)"}
+        with TargetSimulator(**settings):
+            for _ in range(repeat):
+                child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name],
+                                       capture_output=True, text=True)
+                if child.returncode != 0:
+                    return {"case": name, "skipped": child.stderr.strip().splitlines()[-1:]}
+                runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    # the median run by time
+    runs.sort(key=lambda r: r["elapsed"])
+    return runs[len(runs) // 2]
+
+
+def format_row(result):
+    if "skipped" in result:
+        return f"{result['case']:<14} skipped: {result['skipped']}"
+
+    def value(key, unit=""):
+        return "-" if result[key] is None else f"{result[key]}{unit}"
+
+    return (f"{result['case']:<14} {result['elapsed']:>8.2f}s {value('ports_per_sec'):>11} "
+            f"{value('hosts_per_sec'):>10} {value('p50_ms'):>9} {value('p99_ms'):>9} "
+            f"{result['peak_rss_mb']:>8.1f} {result['results']:>7}")
+
+
+HEADER = f"{'case':<14} {'time':>9} {'ports/s':>11} {'hosts/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'found':>7}"
+
+
+# results that are worse than the baseline by more than `tolerance` (0.2 = 20 %)
+def regressions(results, baseline, tolerance):
+    old = {r["case"]: r for r in baseline if "skipped" not in r}
+    found = []
+    for result in results:
+        before = old.get(result["case"])
+        if before is None or "skipped" in result:
+            continue
+        for key, higher_is_better in (("ports_per_sec", True), ("hosts_per_sec", True), ("p99_ms", False),
+                                      ("peak_rss_mb", False)):
+            if result.get(key) is None or not before.get(key):
+                continue
+            change = (result[key] - before[key]) / before[key]
+            if (-change if higher_is_better else change) > tolerance:
+                found.append(f"{result['case']}: {key} {before[key]} -> {result[key]} ({change:+.0%})")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="portscanner benchmarks")
+    parser.add_argument("-c", "--case", action="append", choices=sorted(CASES), help="only this case (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the median is reported")
+    parser.add_argument("--save", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare with results saved before")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown for --compare (0.2 = 20%%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        return 0
+
+    print(HEADER)
+    results = []
+    for name in args.case or list(CASES):
+        result = run_case(name, max(1, args.repeat))
+        results.append(result)
+        print(format_row(result), flush=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
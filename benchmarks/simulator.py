@@ -0,0 +1,115 @@
+"""
+Target simulator for the benchmarks: thousands of ports on loopback addresses
+
+    open     listener that accepts (and can send a banner)
+    closed   nothing listens -> the kernel answers with RST / ICMP port unreachable
+    dropped  listener with a full accept queue -> the kernel drops every SYN, the connect times out
+    udp      UDP socket that echoes every datagram
+    latency  tc netem delay on lo (needs root and the netem module, skipped otherwise)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import socket
+import selectors
+import subprocess
+import threading
+from contextlib import contextmanager
+
+
+class TargetSimulator:
+
+    def __init__(self, hosts=("127.0.0.1",), open_ports=(), dropped_ports=(), udp_ports=(), banner=None):
+        self.hosts = list(hosts)
+        self.open_ports = list(open_ports)
+        self.dropped_ports = list(dropped_ports)
+        self.udp_ports = list(udp_ports)
+        self.banner = banner
+        self.selector = selectors.DefaultSelector()
+        self.sockets = []
+        self.running = False
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def listen(self, host, port, backlog):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((host, port))
+        s.listen(backlog)
+        self.sockets.append(s)
+        return s
+
+    def start(self):
+        for host in self.hosts:
+            for port in self.open_ports:
+                s = self.listen(host, port, 1024)
+                s.setblocking(False)
+                self.selector.register(s, selectors.EVENT_READ, "tcp")
+
+            for port in self.dropped_ports:
+                s = self.listen(host, port, 0)
+                # fill the accept queue, nobody ever accepts -> further SYNs are dropped
+                for _ in range(2):
+                    filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    filler.setblocking(False)
+                    filler.connect_ex((host, port))
+                    self.sockets.append(filler)
+
+            for port in self.udp_ports:
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                s.bind((host, port))
+                s.setblocking(False)
+                self.sockets.append(s)
+                self.selector.register(s, selectors.EVENT_READ, "udp")
+
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.1):
+                s = key.fileobj
+                try:
+                    if key.data == "udp":
+                        data, address = s.recvfrom(2048)
+                        s.sendto(data, address)
+                        continue
+                    conn, _ = s.accept()
+                except (BlockingIOError, InterruptedError, OSError):
+                    continue
+                try:
+                    if self.banner:
+                        conn.send(self.banner)
+                except OSError:
+                    pass
+                conn.close()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.selector.close()
+        for s in self.sockets:
+            s.close()
+        self.sockets = []
+
+
+# delay every packet on `device` by `ms` (tc netem), yields False when that is not possible
+@contextmanager
+def netem_delay(ms, device="lo"):
+    command = ["tc", "qdisc", "add", "dev", device, "root", "netem", "delay", f"{ms}ms"]
+    try:
+        active = subprocess.run(command, capture_output=True).returncode == 0
+    except OSError:
+        active = False
+    try:
+        yield active
+    finally:
+        if active:
+            subprocess.run(["tc", "qdisc", "del", "dev", device, "root"], capture_output=True)
@@ -0,0 +1,25 @@
+"""
+Scan engines of the Portscanner, without Qt
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+from .tcp import connect_scan, iter_connect_scan, iter_connect_targets, probe_tcp_port, clamp_concurrency
+from .icmp import icmp_sweep, ping_sweep
+from .syn import SynProber, syn_available
+from .resolver import HostnameCache, ReverseResolver, shared_resolver, DNS_CACHE_FILE
+from .arp import scapy_available, arp_available, read_neighbors, iter_arp_sweep
+from .metrics import ScanMetrics, serve_prometheus
+from .ratelimit import RateLimiter, shared_limiter, raise_fd_limit
+from .rtt import RttEstimator, RttTable
+from .targets import TargetSpec, HostRange, HostOrder, Permutation, parse_hosts, parse_ports, local_ipv4, local_network
+from .scanners import NetworkScan, TargetScan, OpenPortsScan, UdpScan, FreePortsScan
+from .pipeline import PipelineScan
+from .shard import ShardedScan, shard_targets
+from .history import ScanHistory, HISTORY_FILE
+from .checkpoint import Watermark, Checkpointer, load_checkpoint, save_checkpoint
+from .export import ResultWriter, JsonlWriter, CsvWriter, NmapXmlWriter, open_exporter, result_record, EXPORTERS
+from .daemon import ScanDaemon, ScanJob, serve_daemon
+from .delta import DeltaScan, DeltaHostScan
+from .portstate import PortStates, SparsePortStates, PortStateTable, AddressBitmap, PORT_OPEN, PORT_CLOSED, PORT_FILTERED
+from .udp import udp_probe, UdpPacing, UDP_PAYLOADS
+from .service import ServiceTable, fingerprint, match_service
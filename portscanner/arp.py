@@ -0,0 +1,182 @@
+"""
+ARP host discovery: kernel neighbor cache, own sweep over an AF_PACKET socket (Linux),
+scapy only as fallback on other systems (only imported when it is really used)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import socket
+import struct
+import ipaddress
+
+from .sweep import iter_sweep
+
+PROC_ARP = "/proc/net/arp"
+PROC_ROUTE = "/proc/net/route"
+
+ETH_P_ARP = 0x0806
+ETH_P_IP = 0x0800
+ARP_REQUEST = 1
+ARP_REPLY = 2
+ATF_COM = 0x2  # neighbor entry is complete (MAC known)
+BROADCAST_MAC = b"\xff" * 6
+
+# ioctls for the interface address / MAC (linux/sockios.h)
+SIOCGIFADDR = 0x8915
+SIOCGIFHWADDR = 0x8927
+
+_scapy = None
+
+
+# import scapy on first use, "from scapy.all import ..." alone takes seconds
+# returns (ARP, Ether, srp) or None if scapy is not installed
+def load_scapy():
+    global _scapy
+    if _scapy is None:
+        try:
+            from scapy.all import ARP, Ether, srp
+            _scapy = (ARP, Ether, srp)
+        except ImportError:
+            _scapy = False
+    return _scapy or None
+
+
+def scapy_available():
+    return load_scapy() is not None
+
+
+# own sweep without scapy needs packet sockets (Linux)
+def packet_socket_available():
+    return hasattr(socket, "AF_PACKET")
+
+
+def arp_available():
+    return packet_socket_available() or scapy_available()
+
+
+# one ARP broadcast for the whole network -> list of (ip, mac)
+# raises PermissionError without admin rights
+def arp_request(network, timeout=2):
+    scapy = load_scapy()
+    if scapy is None:
+        return []
+    ARP, Ether, srp = scapy
+
+    arp = ARP(pdst=network)
+    ether = Ether(dst="ff:ff:ff:ff:ff:ff")
+    packet = ether / arp
+    result = srp(packet, timeout=timeout, verbose=0)[0]
+    return [(received.psrc, received.hwsrc) for _, received in result]
+
+
+# What the kernel already knows: complete entries of the neighbor table, no packet is sent
+# -> list of (ip, mac), only addresses inside `network` if given
+def read_neighbors(network=None):
+    net = ipaddress.ip_network(network, strict=False) if network else None
+    neighbors = []
+    try:
+        with open(PROC_ARP, "r") as f:
+            next(f, None)  # header
+            for line in f:
+                fields = line.split()
+                if len(fields) < 6:
+                    continue
+                ip, flags, mac = fields[0], int(fields[2], 16), fields[3]
+                if not flags & ATF_COM or mac == "00:00:00:00:00:00":
+                    continue  # incomplete / failed entry
+                if net is not None and ipaddress.ip_address(ip) not in net:
+                    continue
+                neighbors.append((ip, mac))
+    except (OSError, ValueError):
+        return []  # no /proc (Windows, macOS)
+    return neighbors
+
+
+# interface with the most specific route into `network` (from the kernel routing table)
+def interface_for(network):
+    target = ipaddress.ip_network(network, strict=False).network_address
+    best, best_prefix = None, -1
+    try:
+        with open(PROC_ROUTE, "r") as f:
+            next(f, None)  # header
+            for line in f:
+                fields = line.split()
+                if len(fields) < 8:
+                    continue
+                # addresses are little-endian hex
+                destination = ipaddress.ip_address(struct.pack("<I", int(fields[1], 16)))
+                mask = ipaddress.ip_address(struct.pack("<I", int(fields[7], 16)))
+                route = ipaddress.ip_network(f"{destination}/{mask}", strict=False)
+                if target in route and route.prefixlen > best_prefix:
+                    best, best_prefix = fields[0], route.prefixlen
+    except (OSError, ValueError):
+        return None
+    return best
+
+
+def _interface_ioctl(interface, request):
+    import fcntl  # Unix only
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        return fcntl.ioctl(s.fileno(), request, struct.pack("256s", interface.encode()[:15]))
+
+
+# own IPv4 address and MAC of the interface as bytes
+def interface_addresses(interface):
+    ip = _interface_ioctl(interface, SIOCGIFADDR)[20:24]
+    mac = _interface_ioctl(interface, SIOCGIFHWADDR)[18:24]
+    return ip, mac
+
+
+def build_arp_request(src_mac, src_ip, dst_ip):
+    ether = BROADCAST_MAC + src_mac + struct.pack("!H", ETH_P_ARP)
+    arp = struct.pack("!HHBBH", 1, ETH_P_IP, 6, 4, ARP_REQUEST)
+    return ether + arp + src_mac + src_ip + b"\x00" * 6 + dst_ip
+
+
+# Parse an ethernet frame -> (ip, mac) of an ARP reply, or None
+def parse_arp_reply(frame):
+    if len(frame) < 42 or frame[12:14] != b"\x08\x06":
+        return None
+    if struct.unpack("!H", frame[20:22])[0] != ARP_REPLY:
+        return None
+    mac = ":".join(f"{b:02x}" for b in frame[22:28])
+    return socket.inet_ntoa(frame[28:32]), mac
+
+
+# Send ARP requests for all addresses at `rate` packets/s on an AF_PACKET socket and read replies while sending
+# generator: yields (ip, mac) of every answering address as soon as its reply arrives
+# timeout / retries / limiter / answered: see sweep.iter_sweep
+# raises PermissionError without root / CAP_NET_RAW, OSError if no interface reaches the addresses
+def iter_arp_sweep(addresses, interface=None, timeout=1.0, rate=1000, stop_event=None, progress=None,
+                   metrics=None, rtt=None, retries=0, limiter=None, answered=None):
+    if not hasattr(addresses, "__len__"):
+        addresses = list(addresses)  # a sequence can be walked again for the retries
+    first = next(iter(addresses), None)
+    if first is None:
+        return
+    interface = interface or interface_for(f"{first}/32")
+    if interface is None:
+        raise OSError(f"no interface for {first}")
+    src_ip, src_mac = interface_addresses(interface)
+
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+
+    def send(ip):
+        sock.send(build_arp_request(src_mac, src_ip, socket.inet_aton(ip)))
+
+    def replies():
+        while True:
+            try:
+                frame = sock.recv(128)
+            except (BlockingIOError, InterruptedError):
+                return
+            reply = parse_arp_reply(frame)
+            if reply is not None:  # not other traffic
+                yield reply[0], None, reply
+
+    try:
+        sock.bind((interface, ETH_P_ARP))
+        sock.setblocking(False)
+        yield from iter_sweep(addresses, sock, send, replies, timeout, rate, stop_event, progress, metrics,
+                              rtt, retries, limiter, answered)
+    finally:
+        sock.close()
@@ -0,0 +1,79 @@
+"""
+Checkpoints of running scans: position in the target space and the results so far, as JSON
+
+A stopped, killed or crashed scan continues with `python -m portscanner resume FILE`
+(or TargetScan.resume / ShardedScan.resume) from the last checkpoint instead of from the start.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import json
+import time
+
+# seconds between two checkpoints of a running scan
+CHECKPOINT_INTERVAL = 5.0
+
+
+# Lowest position in the target space that is not finished yet: every target before it is done.
+# Many probes are in flight and finish out of order, the finished ones after the gap are kept until it closes.
+class Watermark:
+
+    def __init__(self):
+        self.issued = {}  # target -> position, still in flight
+        self.next = 0  # position of the next target that is handed out
+        self.finished = set()  # finished positions behind the gap
+        self.position = 0
+
+    # target is handed out to a probe (in the order of the target space)
+    def issue(self, target):
+        self.issued[target] = self.next
+        self.next += 1
+
+    def done(self, target):
+        position = self.issued.pop(target, None)
+        if position is None:
+            return
+        self.finished.add(position)
+        while self.position in self.finished:
+            self.finished.remove(self.position)
+            self.position += 1
+
+
+def load_checkpoint(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# write to a temporary file and replace -> a crash while saving keeps the previous checkpoint
+def save_checkpoint(path, state):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+# Saves the state of a scan at most every `interval` seconds; state() builds it only when it is written
+class Checkpointer:
+
+    def __init__(self, path, state, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.state = state
+        self.interval = interval
+        self.saved = time.monotonic()
+
+    def tick(self):
+        if time.monotonic() - self.saved >= self.interval:
+            self.save()
+
+    def save(self):
+        self.saved = time.monotonic()
+        save_checkpoint(self.path, self.state())
+
+    # the scan is complete, nothing to resume
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,406 @@
+"""
+Command line for headless scans (no Qt needed)
+
+    python -m portscanner scan 127.0.0.1 -p 1-1024
+    python -m portscanner scan 192.168.1.0/24,10.0.0.5 -p top100
+    python -m portscanner scan 192.168.1.1 --udp -p udptop20,5353
+    sudo python -m portscanner scan 192.168.1.0/24 -p top100 --syn
+    python -m portscanner hosts 192.168.1.0/24 --mode ping
+    python -m portscanner audit 192.168.1.0/24 -p top100
+    python -m portscanner free -p 1024-65535
+    python -m portscanner scan 192.168.1.0/24 -p top100 --delta
+    python -m portscanner scan 10.0.0.0/8 -p 22,443 --shuffle --workers 0
+    python -m portscanner scan 10.0.0.0/16 -p top100 --checkpoint scan.json   (Ctrl+C, later:)
+    python -m portscanner resume scan.json
+    python -m portscanner scan 10.0.0.0/16 -p top100 -o scan.xml   (also .jsonl / .csv, .gz compressed)
+    python -m portscanner daemon --port 8765 --files ~/scan-jobs   (scan jobs over HTTP/JSON, see daemon.py)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import sys
+import secrets
+import argparse
+import threading
+
+from .scanners import NetworkScan, TargetScan, UdpScan, FreePortsScan
+from .pipeline import PipelineScan
+from .shard import ShardedScan
+from .delta import DeltaScan, DeltaHostScan
+from .history import ScanHistory, HISTORY_FILE
+from .targets import parse_ports, format_ports, local_network
+from .arp import arp_available
+from .metrics import serve_prometheus
+from .rtt import MIN_TIMEOUT
+from .ratelimit import shared_limiter
+from .checkpoint import load_checkpoint
+from .resolver import DNS_CACHE_FILE
+from .export import open_exporter, EXPORTERS
+
+
+# "80" or "1-1024" -> (start, end)
+def parse_port_range(text):
+    try:
+        if "-" in text:
+            start, end = (int(p) for p in text.split("-", 1))
+        else:
+            start = end = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid port range: {text}")
+    if not 1 <= start <= end <= 65535:
+        raise argparse.ArgumentTypeError(f"invalid port range: {text}")
+    return start, end
+
+
+# "auto" or a number of connects
+def per_host_value(text):
+    if text == "auto":
+        return text
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid per-host limit: {text}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"invalid per-host limit: {text}")
+    return value
+
+
+# checks the spec early, the scan parses it again
+def port_spec(text):
+    try:
+        parse_ports(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return text
+
+
+# parser_class: the daemon takes the arguments of its jobs with a parser that raises instead of exiting
+def build_parser(parser_class=argparse.ArgumentParser):
+    parser = parser_class(prog="portscanner", description="Local network portscanner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    # options for every command
+    common = parser_class(add_help=False)
+    common.add_argument("--metrics", metavar="FILE", help="write scan metrics as JSON to FILE at the end")
+    common.add_argument("--prometheus", metavar="PORT", type=int,
+                        help="serve live metrics in Prometheus format on 127.0.0.1:PORT")
+    common.add_argument("--max-rate", type=int, default=0,
+                        help="packets per second of all scans together (0 = only slow down on congestion)")
+    common.add_argument("--max-in-flight", type=int, default=None,
+                        help="probes in flight of all scans together (default: what the fd limit allows)")
+    common.add_argument("-o", "--output", metavar="FILE",
+                        help="also write every result to FILE while scanning (.jsonl, .csv, nmap .xml; .gz compressed)")
+    common.add_argument("--format", choices=sorted(EXPORTERS), help="format of --output (default: from the file name)")
+
+    scan = sub.add_parser("scan", parents=[common], help="scan hosts for open TCP (or UDP) ports")
+    scan.add_argument("hosts", help="hosts / networks, e.g. 192.168.1.0/24,10.0.0.5")
+    scan.add_argument("-p", "--ports", type=port_spec,
+                      help="ports, e.g. 22,80,1-1024 or top100 / udptop20 (default: 1-1024, UDP: udptop20)")
+    scan.add_argument("--services", action="store_true",
+                      help="read the banner / send a short probe on every open port (ssh, http, tls, ...), "
+                           "connect scan in one process only")
+    scan.add_argument("--syn", action="store_true",
+                      help="half-open SYN scan on a raw socket (root, IPv4), connect scan otherwise")
+    scan.add_argument("--udp", action="store_true", help="UDP scan with protocol payloads")
+    scan.add_argument("--rate", type=int, default=1000, help="UDP: datagrams per second overall")
+    scan.add_argument("--host-rate", type=int, default=100,
+                      help="UDP: datagrams per second and host (lowered when the host limits its ICMP)")
+    scan.add_argument("--per-host", type=per_host_value, default="auto",
+                      help="connects in flight to the same host (auto: no limit for a single host, "
+                           "else an even share of --concurrency, at least 100)")
+    scan.add_argument("--timeout", type=float, default=0.5, help="connect timeout in seconds (start value)")
+    scan.add_argument("--min-timeout", type=float, default=MIN_TIMEOUT, help="lower bound for the adaptive timeout")
+    scan.add_argument("--max-timeout", type=float,
+                      help="upper bound for the adaptive timeout (default: 2.0, UDP: 3.0)")
+    scan.add_argument("--retries", type=int, default=1, help="extra tries for silent ports")
+    scan.add_argument("--fixed-timeout", action="store_true", help="always use --timeout, no RTT measurement")
+    scan.add_argument("--concurrency", type=int, default=1000, help="connects in flight at the same time")
+    scan.add_argument("--shuffle", action="store_true",
+                      help="probe hosts and ports in random order, spread over all subnets")
+    scan.add_argument("--seed", type=int, help="with --shuffle: same seed -> same order")
+    scan.add_argument("--workers", type=int, default=1,
+                      help="processes to spread the targets over (0 = one per CPU core)")
+    scan.add_argument("--delta", action="store_true",
+                      help="only report changes since the last delta scan of the same hosts and ports")
+    scan.add_argument("--quick", action="store_true", help="with --delta: only check the ports open last time")
+    scan.add_argument("--history", metavar="FILE", default=HISTORY_FILE, help="scan history for --delta")
+    scan.add_argument("--checkpoint", metavar="FILE",
+                      help="save position and results to FILE every few seconds and when stopped (see resume)")
+
+    resume = sub.add_parser("resume", parents=[common], help="continue a stopped scan from its checkpoint")
+    resume.add_argument("checkpoint", metavar="FILE", help="checkpoint file of scan --checkpoint")
+
+    daemon = sub.add_parser("daemon", parents=[common], help="run scan jobs for clients over a local HTTP/JSON API")
+    daemon.add_argument("--port", type=int, default=DAEMON_PORT, help="listen on 127.0.0.1:PORT")
+    daemon.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of a TCP port")
+    daemon.add_argument("--jobs", type=int, default=4, help="jobs that run at the same time")
+    daemon.add_argument("--dns-cache", metavar="FILE", default=DNS_CACHE_FILE,
+                        help="reverse-DNS answers, kept between jobs and restarts")
+    daemon.add_argument("--files", metavar="DIR",
+                        help="directory for the files of jobs (-o, --metrics, --checkpoint, --history, resume "
+                             "take file names inside it); without it jobs cannot use files")
+    daemon.add_argument("--token-file", metavar="FILE", default=DAEMON_TOKEN_FILE,
+                        help="TCP port only: the daemon writes its access token here (mode 600), clients send "
+                             "it as 'Authorization: Bearer TOKEN'")
+
+    hosts = sub.add_parser("hosts", parents=[common], help="find hosts in a network")
+    hosts.add_argument("network", nargs="?", help="network in CIDR notation, e.g. 192.168.1.0/24 "
+                                                  "(default: own network)")
+    hosts.add_argument("--mode", choices=("ping", "dns", "arp"), default="ping")
+    hosts.add_argument("--timeout", type=float, default=1.0, help="wait for replies in seconds (start value)")
+    hosts.add_argument("--retries", type=int, default=1, help="extra rounds for silent hosts")
+    hosts.add_argument("--shuffle", action="store_true", help="probe the addresses in random order")
+    hosts.add_argument("--delta", action="store_true",
+                       help="only report hosts that are new or gone since the last delta scan (ping / arp)")
+    hosts.add_argument("--history", metavar="FILE", default=HISTORY_FILE, help="scan history for --delta")
+
+    audit = sub.add_parser("audit", parents=[common], help="find hosts and scan their ports at the same time")
+    audit.add_argument("network", nargs="?", help="network in CIDR notation (default: own network)")
+    audit.add_argument("-p", "--ports", type=port_spec, default="top100", help="ports, e.g. 22,80,1-1024 or top100")
+    audit.add_argument("--mode", choices=("ping", "arp"), default="ping", help="host discovery")
+    audit.add_argument("--timeout", type=float, default=0.5, help="timeout in seconds (start value)")
+    audit.add_argument("--concurrency", type=int, default=1000, help="connects in flight at the same time")
+    audit.add_argument("--per-host", type=int, default=100, help="connects in flight to the same host")
+
+    free = sub.add_parser("free", parents=[common], help="list free TCP ports on this system")
+    free.add_argument("-p", "--ports", type=parse_port_range, default=(1, 65535), help="port range, e.g. 1-65535")
+    free.add_argument("--udp", action="store_true", help="UDP instead of TCP ports")
+    free.add_argument("--ipv6", action="store_true", help="bind IPv6 sockets (only for --method bind)")
+    free.add_argument("--method", choices=("auto", "table", "bind"), default="auto",
+                      help="table = kernel socket tables (Linux), bind = try every port")
+
+    return parser
+
+
+# options that do not go together (one scan class would ignore the other): command -> [(option, others)]
+CONFLICTS = {
+    "scan": [("--udp", ("--syn", "--services", "--delta", "--workers")),
+             ("--services", ("--workers", "--delta", "--syn")),
+             ("--syn", ("--delta",)),
+             ("--delta", ("--checkpoint", "--shuffle", "--workers", "--fixed-timeout")),
+             ("--fixed-timeout", ("--min-timeout", "--max-timeout"))],
+    "hosts": [("--delta", ("--shuffle",))],
+}
+
+
+# options whose default is not None / False
+OPTION_DEFAULTS = {"--workers": 1, "--max-rate": 0, "--history": HISTORY_FILE, "--min-timeout": MIN_TIMEOUT}
+
+
+# the option ("--workers") is set to something else than its default
+def option_given(args, option):
+    value = getattr(args, option[2:].replace("-", "_"), None)
+    if option in OPTION_DEFAULTS:
+        return value is not None and value != OPTION_DEFAULTS[option]
+    return value is not None and value is not False
+
+
+# parser.error for combinations of options that a scan would silently drop
+def check_args(parser, args):
+    for option, others in CONFLICTS.get(args.command, ()):
+        for other in others:
+            if option_given(args, option) and option_given(args, other):
+                parser.error(f"{option} does not work together with {other}")
+
+
+def make_scan(args):
+    if args.command == "resume":
+        if load_checkpoint(args.checkpoint)["kind"] == "sharded":
+            return ShardedScan.resume(args.checkpoint)
+        return TargetScan.resume(args.checkpoint)
+    if args.command == "scan" and args.ports is None:
+        args.ports = "udptop20" if args.udp else "1-1024"
+    if args.command == "scan" and args.max_timeout is None:
+        args.max_timeout = 3.0 if args.udp else 2.0
+    if args.command == "scan" and args.udp:
+        return UdpScan(args.hosts, args.ports, timeout=args.timeout, concurrency=args.concurrency,
+                       per_host=args.per_host, rate=args.rate, host_rate=args.host_rate,
+                       adaptive=not args.fixed_timeout, min_timeout=args.min_timeout, max_timeout=args.max_timeout,
+                       retries=args.retries, shuffle=args.shuffle, seed=args.seed, checkpoint=args.checkpoint)
+    if args.command == "scan" and args.delta:
+        return DeltaScan(args.hosts, args.ports, history=ScanHistory(args.history), quick=args.quick,
+                         timeout=args.timeout, concurrency=args.concurrency, per_host=args.per_host,
+                         min_timeout=args.min_timeout, max_timeout=args.max_timeout, retries=args.retries)
+    if args.command == "hosts" and args.delta:
+        return DeltaHostScan(args.network or local_network(), mode=args.mode, history=ScanHistory(args.history),
+                             timeout=args.timeout, retries=args.retries)
+    if args.command == "scan" and args.workers != 1:
+        return ShardedScan(args.hosts, args.ports, workers=args.workers or None, timeout=args.timeout,
+                           concurrency=args.concurrency, per_host=args.per_host, adaptive=not args.fixed_timeout,
+                           min_timeout=args.min_timeout, max_timeout=args.max_timeout, retries=args.retries,
+                           shuffle=args.shuffle, seed=args.seed, syn=args.syn, checkpoint=args.checkpoint)
+    if args.command == "scan":
+        return TargetScan(args.hosts, args.ports, timeout=args.timeout, concurrency=args.concurrency,
+                          per_host=args.per_host, adaptive=not args.fixed_timeout, min_timeout=args.min_timeout,
+                          max_timeout=args.max_timeout, retries=args.retries, services=args.services,
+                          shuffle=args.shuffle, seed=args.seed, syn=args.syn, checkpoint=args.checkpoint)
+    if args.command == "hosts":
+        return NetworkScan(mode=args.mode, network=args.network or local_network(), timeout=args.timeout,
+                           retries=args.retries, shuffle=args.shuffle)
+    if args.command == "audit":
+        return PipelineScan(args.network or local_network(), args.ports, mode=args.mode, timeout=args.timeout,
+                            concurrency=args.concurrency, per_host=args.per_host)
+    if args.command == "free":
+        start, end = args.ports
+        return FreePortsScan(start, end, protocol="udp" if args.udp else "tcp", ipv6=args.ipv6, method=args.method)
+    return None
+
+
+def format_result(item, single_host=False):
+    # (change, host, port) of a delta scan
+    if isinstance(item, tuple) and len(item) == 3:
+        change, host, port = item
+        if port is None:
+            return f"[{change}] {host}"
+        return f"[{change}] Port {port}" if single_host else f"[{change}] {host} Port {port}"
+    # (host, port) of the port scan, (host, None) = host found by the pipeline
+    if isinstance(item, tuple):
+        host, port = item
+        if port is None:
+            return f"{host} is up"
+        return f"[+] Port {port}" if single_host else f"[+] {host} Port {port}"
+    # ARP results are dicts
+    if isinstance(item, dict):
+        return f"{item['ip']}\t{item['mac']}\t{item['hostname']}"
+    if isinstance(item, int):
+        return f"[+] Port {item}"
+    return str(item)
+
+
+# what the results of `scan` do not carry themselves: protocol, state and host (for bare port numbers)
+def result_options(args, scan):
+    return {
+        "protocol": "udp" if isinstance(scan, UdpScan) or getattr(args, "udp", False) else "tcp",
+        "state": "free" if isinstance(scan, FreePortsScan) else "open",
+        "host": "localhost" if isinstance(scan, FreePortsScan) else None,
+    }
+
+
+# exporter for --output
+def make_exporter(args, scan, argv=None):
+    if isinstance(scan, UdpScan):
+        scan_type = "udp"
+    elif getattr(args, "syn", False):
+        scan_type = "syn"
+    else:
+        scan_type = "connect"
+    targets = getattr(scan, "targets", None)
+    if targets is not None:
+        ports = targets.ports
+    elif isinstance(scan, FreePortsScan):
+        ports = range(scan.start_port, scan.end_port + 1)
+    else:
+        ports = getattr(scan, "ports", ())
+    return open_exporter(args.output, args.format, scan_type=scan_type, services=format_ports(ports),
+                         args=" ".join(argv or sys.argv), **result_options(args, scan))
+
+
+# port and token file of the daemon, the daemon module itself imports the command line (same arguments for its jobs)
+DAEMON_PORT = 8765
+DAEMON_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".portscanner_daemon_token")
+
+
+def run_daemon(args):
+    from .daemon import ScanDaemon, serve_daemon
+
+    shared_limiter.configure(args.max_rate, args.max_in_flight)
+    token = None if args.socket else write_token(args.token_file)
+    daemon = ScanDaemon(jobs=args.jobs, dns_cache=args.dns_cache, files=args.files)
+    try:
+        server = serve_daemon(daemon, args.port, args.socket, token)
+    except OSError as e:
+        daemon.close()
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    where = args.socket or f"http://127.0.0.1:{args.port} (token in {args.token_file})"
+    print(f"Scan daemon on {where}, {args.jobs} jobs at once", flush=True)
+    try:
+        threading.Event().wait()
+    finally:
+        server.shutdown()
+        server.server_close()
+        daemon.close()
+        os.remove(args.socket or args.token_file)
+
+
+# new random token for the TCP API in a file only this user can read -> token
+def write_token(path):
+    token = secrets.token_urlsafe(32)
+    if os.path.lexists(path):
+        os.remove(path)  # O_EXCL below: never write through a link someone else put there
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token + "\n")
+    return token
+
+
+def run_command(args):
+    if args.command == "daemon":
+        return run_daemon(args)
+    if args.command in ("hosts", "audit") and args.mode == "arp" and not arp_available():
+        print("ARP mode needs Linux or scapy (pip install scapy)", file=sys.stderr)
+        return 1
+
+    try:
+        scan = make_scan(args)
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if scan is None:
+        return 2
+    shared_limiter.configure(args.max_rate, args.max_in_flight)
+
+    single_host = isinstance(scan, (TargetScan, ShardedScan, DeltaScan)) and scan.targets.hosts.count == 1
+    try:
+        exporter = make_exporter(args, scan) if args.output else None
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    server = serve_prometheus(scan.metrics, args.prometheus) if args.prometheus else None
+    try:
+        # print (and export) every result as soon as it is found
+        services = getattr(scan, "services", None)
+        for item in scan.iter_results():
+            line = format_result(item, single_host)
+            service = None
+            if services is not None and isinstance(item, tuple) and len(item) == 2:
+                service = services.get(*item)
+                description = services.describe(*item)
+                if description:
+                    line += f"\t{description}"
+            print(line, flush=True)
+            if exporter is not None:
+                exporter.write(item, service)
+        if isinstance(scan, UdpScan):
+            print(f"{len(scan.silent_ports())} ports open|filtered (no answer)")
+        limits = shared_limiter.snapshot()
+        if limits["backoffs"]:
+            print(f"Slowed down {limits['backoffs']}x ({limits['reason']}), "
+                  f"last rate {limits['rate']} packets/s", file=sys.stderr)
+    except KeyboardInterrupt:
+        checkpoint = getattr(scan, "checkpoint", None)
+        if checkpoint is not None:
+            print(f"Stopped - continue with: python -m portscanner resume {checkpoint.path}", file=sys.stderr)
+        raise
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if server is not None:
+            server.shutdown()
+        if args.metrics:
+            scan.metrics.dump(args.metrics)
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    try:
+        return run_command(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+"""
+Scan service: one long-running process that takes scan jobs over a local HTTP/JSON API
+
+    python -m portscanner daemon [--port 8765 | --socket /run/portscanner.sock] [--jobs 4] [--files DIR]
+
+    POST   /jobs                {"args": ["scan", "10.0.0.0/24", "-p", "top100"], "client": "ci"}
+    GET    /jobs                all jobs
+    GET    /jobs/ID             state, progress, number of results, metrics
+    GET    /jobs/ID/results     ?offset=N&wait=S - results from N on, waits up to S seconds for new ones
+    GET    /jobs/ID/stream      results as JSON lines while the job runs (connection ends with the job)
+    POST   /jobs/ID/stop        stop, results so far stay
+    DELETE /jobs/ID             stop and forget the job
+    GET    /status              jobs, shared rate limiter
+
+Jobs take the same arguments as the command line. Up to `jobs` of them run at once, the queue is served
+round-robin over the clients, so one client with many jobs does not hold up the others. All jobs share
+the rate limiter, the reverse-DNS cache and the RTT tables - a job starts with what the jobs before
+it learned, without process startup.
+
+The daemon often runs as root: on the TCP port every request needs "Authorization: Bearer TOKEN" with
+the token from --token-file, a Unix socket is only open for the user of the daemon (mode 600). Files of
+jobs are names inside the --files directory, settings of the whole process (--max-rate, --max-in-flight,
+--prometheus, --workers) are options of the daemon, not of a job.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import hmac
+import json
+import time
+import socket
+import ipaddress
+import itertools
+import threading
+import argparse
+import socketserver
+from collections import OrderedDict, Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .cli import build_parser, check_args, option_given, make_scan, make_exporter, result_options, DAEMON_PORT
+from .export import result_record
+from .resolver import HostnameCache, shared_resolver, DNS_CACHE_FILE
+from .ratelimit import shared_limiter
+
+# finished jobs that are kept for clients that did not fetch their results yet
+KEEP_FINISHED = 100
+
+# longest wait of GET /jobs/ID/results?wait=S
+MAX_WAIT = 30.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+STOPPED = "stopped"
+FAILED = "failed"
+
+# options with a file of the daemon's machine: only names inside the --files directory
+FILE_OPTIONS = ("--output", "--metrics", "--checkpoint", "--history")
+
+# options for the whole process, they belong to the daemon itself
+PROCESS_OPTIONS = ("--max-rate", "--max-in-flight", "--prometheus", "--workers")
+
+
+# the scan and the scans inside it (discovery of the pipeline, host scan of a delta host scan)
+def inner_scans(scan):
+    yield scan
+    for name in ("discovery", "scan"):
+        inner = getattr(scan, name, None)
+        if inner is not None:
+            yield inner
+
+
+# errors in the arguments of a job go back to the client, not to the console of the daemon
+class _JobParser(argparse.ArgumentParser):
+
+    def error(self, message):
+        raise ValueError(message)
+
+    def exit(self, status=0, message=None):
+        raise ValueError(message or "no scan")
+
+
+# One scan job: command line arguments -> scan, results as records (see export.result_record)
+# the scan is only built when the job runs (a queued SYN scan holds no raw socket)
+class ScanJob:
+
+    def __init__(self, number, args, argv, client):
+        self.id = str(number)
+        self.args = args
+        self.argv = argv
+        self.client = client
+        self.scan = None
+        self.stopping = False
+        self.state = QUEUED
+        self.progress = 0
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.results = []
+        self.changed = threading.Condition()
+
+    def report_progress(self, percent):
+        self.progress = percent
+
+    @property
+    def done(self):
+        return self.state in (DONE, STOPPED, FAILED)
+
+    # scan of the job; prepare(scan) e.g. gives it the shared RTT tables
+    def build(self, prepare=None):
+        scan = make_scan(self.args)
+        if scan is None:
+            raise ValueError(f"no scan for {self.argv}")
+        for inner in inner_scans(scan):
+            if hasattr(inner, "progress"):
+                inner.progress = self.report_progress
+        if prepare is not None:
+            prepare(scan)
+        with self.changed:
+            self.scan = scan
+            if self.stopping:
+                scan.stop()  # stopped while it was built
+        return scan
+
+    # runs in a thread of the daemon
+    def run(self, prepare=None):
+        self.state = RUNNING
+        self.started = time.time()
+        exporter = None
+        try:
+            scan = self.build(prepare)
+            options = result_options(self.args, scan)
+            if self.args.output:
+                exporter = make_exporter(self.args, scan, ["portscanner"] + self.argv)
+            services = getattr(scan, "services", None)
+            for item in scan.iter_results():
+                service = None
+                if services is not None and isinstance(item, tuple) and len(item) == 2:
+                    service = services.get(*item)
+                record = result_record(item, service=service, **options)
+                with self.changed:
+                    self.results.append({key: value for key, value in record.items() if value is not None})
+                    self.changed.notify_all()
+                if exporter is not None:
+                    exporter.write(item, service)
+            self.state = STOPPED if scan.stop_event.is_set() else DONE
+            if self.state == DONE:
+                self.progress = 100
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+        finally:
+            if exporter is not None:
+                exporter.close()
+            if self.args.metrics and self.scan is not None:
+                self.scan.metrics.dump(self.args.metrics)
+            self.finished = time.time()
+            with self.changed:
+                self.changed.notify_all()
+
+    def stop(self):
+        if self.state == QUEUED:
+            self.state = STOPPED
+            self.finished = time.time()
+        with self.changed:
+            self.stopping = True
+            if self.scan is not None:
+                self.scan.stop()
+            self.changed.notify_all()
+
+    # results from `offset` on, waits up to `timeout` seconds while there are none and the job is not done
+    # -> (results, next offset, done)
+    def wait_results(self, offset, timeout=0.0):
+        with self.changed:
+            if offset >= len(self.results) and not self.done and timeout > 0:
+                self.changed.wait(timeout)
+            return self.results[offset:], len(self.results), self.done
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "args": self.argv,
+            "client": self.client,
+            "state": self.state,
+            "progress": self.progress,
+            "results": len(self.results),
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "metrics": self.scan.metrics.snapshot() if self.scan is not None else None,
+        }
+
+
+# Job queue and the threads that run the jobs; the HTTP server (serve_daemon) is only the front end
+# every job gets at most 1/jobs of the probes in flight of the process, so jobs that run
+# at the same time share the limiter instead of the first one taking all of it
+class ScanDaemon:
+
+    # files: directory for the files of jobs (created for this user only), None = jobs cannot use files
+    def __init__(self, jobs=4, dns_cache=DNS_CACHE_FILE, files=None):
+        self.max_jobs = max(1, jobs)
+        self.files = files
+        if files:
+            os.makedirs(files, mode=0o700, exist_ok=True)
+        self.jobs = OrderedDict()  # id -> ScanJob, also the finished ones
+        self.queues = OrderedDict()  # client -> deque of waiting jobs, in round-robin order
+        self.active = Counter()  # client -> running jobs
+        self.numbers = itertools.count(1)
+        self.lock = threading.Condition()
+        self.closed = False
+        self.rtt_tables = {}  # (initial, min, max timeout) -> RttTable shared by all jobs
+        # reverse-DNS answers stay for the next jobs and the next start
+        if dns_cache:
+            shared_resolver.cache = HostnameCache(path=dns_cache)
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(self.max_jobs)]
+        for worker in self.workers:
+            worker.start()
+
+    # command line arguments of a scan (without "python -m portscanner") -> queued ScanJob
+    # raises ValueError for arguments the parser does not take
+    def submit(self, argv, client="default"):
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            raise ValueError("args must be a list of strings")
+        if argv[:1] == ["daemon"]:
+            raise ValueError("a daemon does not start daemons")
+        parser = build_parser(_JobParser)
+        args = parser.parse_args(argv)
+        check_args(parser, args)
+        for option in PROCESS_OPTIONS:
+            if option_given(args, option):
+                raise ValueError(f"{option} is a setting of the daemon, not of a job")
+        self.confine_files(args)
+        if getattr(args, "network", None):
+            ipaddress.ip_network(args.network, strict=False)  # ValueError for the client
+        _, budget = shared_limiter.limits()
+        if budget and getattr(args, "concurrency", None):
+            args.concurrency = max(1, min(args.concurrency, budget // self.max_jobs))
+        job = ScanJob(next(self.numbers), args, argv, str(client))
+        with self.lock:
+            if self.closed:
+                raise ValueError("daemon is shutting down")
+            self.jobs[job.id] = job
+            self.queues.setdefault(job.client, deque()).append(job)
+            self.forget_finished()
+            self.lock.notify()
+        return job
+
+    # file names of a job -> paths inside the files directory; raises ValueError for paths or without the directory
+    def confine_files(self, args):
+        for option in [option for option in FILE_OPTIONS if option_given(args, option)]:
+            name = option[2:]
+            value = getattr(args, name)
+            if not self.files:
+                raise ValueError(f"{option} needs a daemon started with --files DIR")
+            if value in ("", ".", "..") or os.path.basename(value) != value:
+                raise ValueError(f"{option}: only a file name inside the files directory of the daemon")
+            setattr(args, name, os.path.join(self.files, value))
+        if args.command == "resume" and not os.path.isfile(args.checkpoint):
+            raise ValueError(f"no checkpoint {os.path.basename(args.checkpoint)}")
+
+    # jobs with the same timeout settings use one RttTable -> learned timeouts carry over
+    def share_rtt(self, scan):
+        for inner in inner_scans(scan):
+            rtt = getattr(inner, "rtt", None)
+            if rtt is None:
+                continue
+            key = (rtt.initial, rtt.min_timeout, rtt.max_timeout)
+            inner.rtt = self.rtt_tables.setdefault(key, rtt)
+
+    # next job: the client with the fewest running jobs, on a tie the first one in the round;
+    # the client goes to the end of the round. called with the lock held
+    def next_job(self):
+        while self.queues:
+            client = min(self.queues, key=lambda name: self.active[name])
+            waiting = self.queues[client]
+            job = waiting.popleft()
+            if waiting:
+                self.queues.move_to_end(client)
+            else:
+                del self.queues[client]
+            if job.state == QUEUED:
+                return job
+        return None
+
+    def work(self):
+        while True:
+            with self.lock:
+                job = self.next_job()
+                while job is None and not self.closed:
+                    self.lock.wait()
+                    job = self.next_job()
+                if job is None:
+                    return
+                self.active[job.client] += 1
+            try:
+                job.run(self.share_rtt)
+            finally:
+                shared_resolver.cache.save()
+                with self.lock:
+                    self.active[job.client] -= 1
+                    if not self.active[job.client]:
+                        del self.active[job.client]
+
+    # called with the lock held
+    def forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def remove(self, job_id):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job is not None:
+            job.stop()
+        return job
+
+    def status(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return {
+            "running": sum(1 for job in jobs if job.state == RUNNING),
+            "queued": sum(1 for job in jobs if job.state == QUEUED),
+            "max_jobs": self.max_jobs,
+            "limiter": shared_limiter.snapshot(),
+        }
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            jobs = list(self.jobs.values())
+            self.lock.notify_all()
+        for job in jobs:
+            if not job.done:
+                job.stop()
+        for worker in self.workers:
+            worker.join()
+        shared_resolver.cache.save()
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# HTTP front end of `daemon` on 127.0.0.1:port, or on a Unix socket when `path` is given (only for this user)
+# token: every request has to send "Authorization: Bearer TOKEN" (None = no check, e.g. for the Unix socket)
+def serve_daemon(daemon, port=DAEMON_PORT, path=None, token=None):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def allowed(self):
+            if token is None:
+                return True
+            sent = self.headers.get("Authorization", "")
+            if hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+                return True
+            self.reply(401, {"error": "missing or wrong token"})
+            return False
+
+        def reply(self, status, data):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # "/jobs/7/results?offset=10" -> (["jobs", "7", "results"], {"offset": ["10"]})
+        def route(self):
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            return parts, parse_qs(url.query)
+
+        def find(self, parts):
+            job = daemon.get(parts[1])
+            if job is None:
+                self.reply(404, {"error": f"no job {parts[1]}"})
+            return job
+
+        def do_GET(self):
+            if not self.allowed():
+                return
+            parts, query = self.route()
+            if parts == ["status"]:
+                self.reply(200, daemon.status())
+            elif parts == ["jobs"]:
+                with daemon.lock:
+                    jobs = list(daemon.jobs.values())
+                self.reply(200, [job.summary() for job in jobs])
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job = self.find(parts)
+                if job is not None:
+                    self.reply(200, job.summary())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "results":
+                job = self.find(parts)
+                if job is None:
+                    return
+                try:
+                    offset = max(0, int(query.get("offset", ["0"])[0]))
+                    wait = min(MAX_WAIT, max(0.0, float(query.get("wait", ["0"])[0])))
+                except ValueError:
+                    self.reply(400, {"error": "offset and wait must be numbers"})
+                    return
+                results, offset, done = job.wait_results(offset, wait)
+                self.reply(200, {"results": results, "next": offset, "state": job.state, "done": done})
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stream":
+                job = self.find(parts)
+                if job is not None:
+                    self.stream(job)
+            else:
+                self.reply(404, {"error": "unknown path"})
+
+        # JSON lines until the job is done, no Content-Length: the end of the connection ends the results
+        def stream(self, job):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            offset = 0
+            try:
+                while True:
+                    results, offset, done = job.wait_results(offset, 1.0)
+                    if results:
+                        self.wfile.write("".join(json.dumps(record) + "\n" for record in results).encode())
+                        self.wfile.flush()
+                    elif done:
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away, the job keeps running
+
+        def do_POST(self):
+            if not self.allowed():
+                return
+            parts, _ = self.route()
+            if parts == ["jobs"]:
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    job = daemon.submit(request.get("args"), request.get("client", "default"))
+                except (ValueError, KeyError, OSError, AttributeError) as e:
+                    self.reply(400, {"error": str(e)})
+                    return
+                self.reply(201, job.summary())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stop":
+                job = self.find(parts)
+                if job is not None:
+                    job.stop()
+                    self.reply(200, job.summary())
+            else:
+                self.reply(404, {"error": "unknown path"})
+
+        def do_DELETE(self):
+            if not self.allowed():
+                return
+            parts, _ = self.route()
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = daemon.remove(parts[1])
+                if job is None:
+                    self.reply(404, {"error": f"no job {parts[1]}"})
+                else:
+                    self.reply(200, job.summary())
+            else:
+                self.reply(404, {"error": "unknown path"})
+
+        def log_message(self, format, *args):
+            pass  # no access log on the console
+
+    if path:
+        if os.path.exists(path):
+            # left over from a daemon that did not shut down cleanly
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise OSError(f"daemon already running on {path}")
+            except ConnectionRefusedError:
+                os.remove(path)
+            finally:
+                probe.close()
+        umask = os.umask(0o177)  # the socket is created with mode 600
+        try:
+            server = _UnixHTTPServer(path, Handler)
+        finally:
+            os.umask(umask)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,153 @@
+"""
+Delta scans: compare with the last finished run of the same target from the scan history
+and report only what changed
+
+    ("new", host, port)   port open now, not open last time
+    ("gone", host, port)  port was open last time, not any more
+    port is None for host scans
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import ipaddress
+import threading
+
+from .tcp import iter_connect_targets
+from .stream import iterate_async
+from .history import ScanHistory
+from .metrics import ScanMetrics
+from .rtt import RttTable, MIN_TIMEOUT
+from .targets import TargetSpec
+from .scanners import NetworkScan, default_per_host
+
+NEW = "new"
+GONE = "gone"
+
+
+def _no_progress(percent):
+    pass
+
+
+# key of a target in the history: the specs as given ("192.168.1.0/24|top100")
+def target_key(hosts, ports=None):
+    def spec(value):
+        return value if isinstance(value, str) else ",".join(str(v) for v in value)
+
+    return spec(hosts) if ports is None else f"{spec(hosts)}|{spec(ports)}"
+
+
+# Port scan that checks the ports that were open last time first, then the rest
+# quick=True only checks the known ports (finds what went away, not what is new)
+class DeltaScan:
+
+    def __init__(self, hosts, ports="top100", history=None, quick=False, timeout=0.5, concurrency=1000,
+                 per_host="auto", progress=None, metrics=None, rtt=None, min_timeout=MIN_TIMEOUT, max_timeout=2.0,
+                 retries=1):
+        self.targets = TargetSpec(hosts, ports)
+        self.target = target_key(hosts, ports)
+        self.history = history or ScanHistory()
+        self.quick = quick
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.per_host = default_per_host(self.targets.hosts, concurrency) if per_host == "auto" else per_host
+        self.progress = progress or _no_progress
+        self.metrics = metrics or ScanMetrics("delta")
+        self.rtt = rtt or RttTable(initial=timeout, min_timeout=min_timeout, max_timeout=max_timeout)
+        self.retries = retries
+        self.stop_event = threading.Event()
+
+    def connect(self, targets, total, progress):
+        return iter_connect_targets(targets, total, timeout=self.timeout, concurrency=self.concurrency,
+                                    stop_event=self.stop_event, progress=progress, metrics=self.metrics,
+                                    rtt=self.rtt, retries=self.retries, per_host=self.per_host)
+
+    async def aiter_results(self):
+        baseline = self.history.last_run("ports", self.target)
+        before = self.history.results(baseline) if baseline is not None else set()
+        hosts, ports = self.targets.hosts, set(self.targets.ports)
+        known = sorted((host, port) for host, port in before if host in hosts and port in ports)
+        rest = 0 if self.quick else self.targets.count - len(known)
+        total = (len(known) + rest) or 1
+        run = self.history.start_run("ports", self.target)
+        found = set()
+
+        # 1) ports that were open last time -> what went away is known after a few probes
+        with self.metrics.phase("known"):
+            async for host, port in self.connect(known, len(known),
+                                                 lambda p: self.progress(int(p * len(known) / total))):
+                self.history.record(run, host, port)
+                found.add((host, port))
+        if self.stop_event.is_set():
+            return
+        for host, port in known:
+            if (host, port) not in found:
+                yield GONE, host, port
+
+        # 2) all other targets, only newly opened ports are reported
+        if rest:
+            targets = ((host, port) for host, port in self.targets if (host, port) not in before)
+            with self.metrics.phase("connect"):
+                async for host, port in self.connect(targets, rest,
+                                                     lambda p: self.progress(int((len(known) + p * rest / 100)
+                                                                                 / total * 100))):
+                    self.history.record(run, host, port)
+                    yield NEW, host, port
+        if not self.stop_event.is_set():
+            self.history.finish_run(run)
+
+    def iter_results(self):
+        try:
+            yield from iterate_async(self.aiter_results())
+        except Exception as e:
+            print(f"Delta scan error: {e}")
+
+    def run(self):
+        return list(self.iter_results())
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# Host scan (ping or ARP) that probes the hosts seen last time first and reports new and vanished hosts
+class DeltaHostScan:
+
+    def __init__(self, network, mode="ping", history=None, timeout=1.0, retries=1, progress=None, metrics=None,
+                 rtt=None, resolver=None):
+        if mode not in ("ping", "arp"):
+            raise ValueError(f"delta host scan needs mode ping or arp, not {mode}")
+        self.target = target_key(network)
+        self.history = history or ScanHistory()
+        self.scan = NetworkScan(mode=mode, network=network, resolver=resolver, progress=progress,
+                                metrics=metrics or ScanMetrics(f"delta-{mode}"), rtt=rtt, timeout=timeout,
+                                retries=retries)
+
+    @property
+    def stop_event(self):
+        return self.scan.stop_event
+
+    @property
+    def metrics(self):
+        return self.scan.metrics
+
+    def iter_results(self):
+        baseline = self.history.last_run("hosts", self.target)
+        before = {host for host, _ in self.history.results(baseline)} if baseline is not None else set()
+        self.scan.priority = sorted(before, key=ipaddress.ip_address)
+        run = self.history.start_run("hosts", self.target)
+        found = set()
+
+        for ip, _ in self.scan.iter_pairs():
+            self.history.record(run, ip)
+            found.add(ip)
+            if ip not in before:
+                yield NEW, ip, None
+        if self.stop_event.is_set():
+            return
+        for ip in sorted(before - found, key=ipaddress.ip_address):
+            yield GONE, ip, None
+        self.history.finish_run(run)
+
+    def run(self):
+        return list(self.iter_results())
+
+    def stop(self):
+        self.scan.stop()
@@ -0,0 +1,232 @@
+"""
+Exporters: results go to a file while the scan is running, one record at a time
+
+    jsonl  one JSON object per line
+    csv    header and one row per result
+    xml    nmap -oX layout, one <host> per result (like masscan), for tools that read nmap XML
+
+Writes are buffered and "FILE.gz" is written gzip-compressed. Nothing is kept per result,
+so a scan of any size costs the same memory.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import io
+import csv
+import gzip
+import json
+import time
+import ipaddress
+from xml.sax.saxutils import quoteattr
+
+BUFFER_SIZE = 256 * 1024
+
+# columns of the CSV file, keys of the JSON objects
+FIELDS = ("host", "port", "protocol", "state", "service", "version", "hostname", "mac", "change")
+
+# nmap reason of a port state
+REASONS = {("tcp", "open"): "syn-ack", ("tcp", "closed"): "reset", ("udp", "open"): "udp-response"}
+
+
+# text file for the exporter, buffered; gzip compresses whole buffers instead of every single record
+def open_output(path, compress=None, buffer_size=BUFFER_SIZE):
+    if compress is None:
+        compress = str(path).endswith(".gz")
+    if compress:
+        binary = io.BufferedWriter(gzip.GzipFile(path, "wb", compresslevel=6), buffer_size)
+        return io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="", buffering=buffer_size)
+
+
+# any result of the scans -> dict with the keys of FIELDS (missing ones are None)
+#   (host, port)          port scans, port None = host found by the pipeline
+#   (change, host, port)  delta scans
+#   int                   port of a single host / free port of this system (host = `host`)
+#   dict                  ARP (ip, mac, hostname)
+#   "hostname: ip", "ip"  ping / DNS
+# service: (name, detail) of the ServiceTable
+def result_record(item, protocol="tcp", state="open", host=None, service=None):
+    record = dict.fromkeys(FIELDS)
+    record["protocol"] = protocol
+    if isinstance(item, tuple) and len(item) == 3:
+        change, item_host, port = item
+        record.update(change=change, host=item_host, port=port)
+        if port is None:
+            record["state"] = "up" if change == "new" else "down"
+        else:
+            record["state"] = "open" if change == "new" else "closed"
+    elif isinstance(item, tuple):
+        record["host"], record["port"] = item
+        record["state"] = "up" if record["port"] is None else state
+    elif isinstance(item, int):
+        record.update(host=host, port=item, state=state)
+    elif isinstance(item, dict):
+        hostname = item.get("hostname")
+        record.update(host=item["ip"], mac=item.get("mac"), state="up",
+                      hostname=hostname if hostname != "unknown" else None)
+    else:
+        first, _, second = str(item).partition(": ")
+        if not second or second == "no hostname":
+            record.update(host=first, state="up")
+        else:
+            record.update(host=second, hostname=first, state="up")
+    if record["port"] is None:
+        record["protocol"] = None
+    if service is not None:
+        record["service"], record["version"] = service
+        record["version"] = record["version"] or None
+    return record
+
+
+# Writes results of a scan to `path` as they come: write(item) for every result, close() at the end
+# (or use it as context manager). protocol / state / host: for results that do not carry them
+class ResultWriter:
+
+    def __init__(self, path, protocol="tcp", state="open", host=None, compress=None, buffer_size=BUFFER_SIZE):
+        self.path = path
+        self.protocol = protocol
+        self.state = state
+        self.host = host
+        self.file = open_output(path, compress, buffer_size)
+        self.count = 0
+        self.start()
+
+    def write(self, item, service=None):
+        self.write_record(result_record(item, self.protocol, self.state, self.host, service))
+        self.count += 1
+
+    def start(self):
+        pass
+
+    def write_record(self, record):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.finish()
+        finally:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlWriter(ResultWriter):
+
+    # only the fields a result has
+    def write_record(self, record):
+        self.file.write(json.dumps({key: value for key, value in record.items() if value is not None}))
+        self.file.write("\n")
+
+
+class CsvWriter(ResultWriter):
+
+    def start(self):
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDS)
+
+    def write_record(self, record):
+        self.writer.writerow(["" if record[key] is None else record[key] for key in FIELDS])
+
+
+# nmap XML: scan_type "connect" / "syn" / "udp", services = the ports spec ("1-1024"), args = the command line
+# the hosts in runstats are the <host> elements - counting distinct hosts would mean keeping all of them
+class NmapXmlWriter(ResultWriter):
+
+    def __init__(self, path, protocol="tcp", state="open", host=None, compress=None, buffer_size=BUFFER_SIZE,
+                 scan_type="connect", services="", args="portscanner"):
+        self.scan_type = scan_type
+        self.services = services
+        self.args = args
+        self.started = time.time()
+        self.up = 0
+        self.down = 0
+        super().__init__(path, protocol, state, host, compress, buffer_size)
+
+    def start(self):
+        started = int(self.started)
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE nmaprun>\n')
+        self.file.write(f'<nmaprun scanner="portscanner" args={quoteattr(self.args)} start="{started}" '
+                        f'startstr={quoteattr(time.ctime(started))} version="1.0" xmloutputversion="1.05">\n')
+        if self.services:
+            numservices = sum(end - start + 1 for start, end in port_ranges(self.services))
+            self.file.write(f'<scaninfo type={quoteattr(self.scan_type)} protocol={quoteattr(self.protocol)} '
+                            f'numservices="{numservices}" services={quoteattr(self.services)}/>\n')
+
+    def write_record(self, record):
+        now = int(time.time())
+        host = str(record["host"])
+        status = "down" if record["state"] == "down" else "up"
+        if status == "up":
+            self.up += 1
+        else:
+            self.down += 1
+        parts = [f'<host starttime="{now}" endtime="{now}"><status state="{status}" reason="user-set"/>']
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            address = None
+        if address is not None:
+            parts.append(f'<address addr={quoteattr(host)} addrtype="ipv{address.version}"/>')
+        if record["mac"]:
+            parts.append(f'<address addr={quoteattr(str(record["mac"]).upper())} addrtype="mac"/>')
+        if address is None:
+            parts.append(f'<hostnames><hostname name={quoteattr(host)} type="user"/></hostnames>')
+        elif record["hostname"]:
+            parts.append(f'<hostnames><hostname name={quoteattr(record["hostname"])} type="PTR"/></hostnames>')
+        if record["port"] is not None:
+            reason = REASONS.get((record["protocol"], record["state"]), "unknown")
+            parts.append(f'<ports><port protocol={quoteattr(record["protocol"])} portid="{record["port"]}">'
+                         f'<state state={quoteattr(record["state"])} reason="{reason}" reason_ttl="0"/>')
+            if record["service"]:
+                version = f' version={quoteattr(record["version"])}' if record["version"] else ""
+                parts.append(f'<service name={quoteattr(record["service"])}{version} method="probed" conf="10"/>')
+            parts.append("</port></ports>")
+        parts.append("</host>\n")
+        self.file.write("".join(parts))
+
+    def finish(self):
+        finished = time.time()
+        self.file.write(f'<runstats><finished time="{int(finished)}" timestr={quoteattr(time.ctime(finished))} '
+                        f'elapsed="{finished - self.started:.2f}" exit="success"/>'
+                        f'<hosts up="{self.up}" down="{self.down}" total="{self.up + self.down}"/>'
+                        f'</runstats>\n</nmaprun>\n')
+
+
+# "22,80,1000-1002" -> [(22, 22), (80, 80), (1000, 1002)]
+def port_ranges(spec):
+    ranges = []
+    for part in spec.split(","):
+        start, _, end = part.partition("-")
+        ranges.append((int(start), int(end or start)))
+    return ranges
+
+
+EXPORTERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "xml": NmapXmlWriter}
+
+
+# format from the file name: scan.jsonl, scan.csv.gz, scan.xml, ...
+def export_format(path):
+    name = str(path).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for extension, fmt in ((".jsonl", "jsonl"), (".json", "jsonl"), (".csv", "csv"), (".xml", "xml")):
+        if name.endswith(extension):
+            return fmt
+    raise ValueError(f"unknown export format of {path} (.jsonl, .csv or .xml, optional .gz)")
+
+
+# exporter for `path`, fmt None = from the file name; options go to the writer (scan_type etc. only for xml)
+def open_exporter(path, fmt=None, **options):
+    fmt = fmt or export_format(path)
+    if fmt != "xml":
+        for key in ("scan_type", "services", "args"):
+            options.pop(key, None)
+    return EXPORTERS[fmt](path, **options)
@@ -0,0 +1,99 @@
+"""
+Scan history in SQLite: every run with its results, as baseline for delta scans
+
+    runs:    id, kind ("ports" / "hosts"), target, started, finished (NULL = stopped / still running)
+    results: run, host, port (NULL for a host that was found)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import time
+import sqlite3
+import threading
+
+HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".portscanner_history.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    host TEXT NOT NULL,
+    port INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_target ON runs (kind, target, finished);
+CREATE INDEX IF NOT EXISTS results_run ON results (run);
+"""
+
+
+# one connection for all threads of the program, every access under the lock
+class ScanHistory:
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # new run -> id, results are added with record() while scanning
+    def start_run(self, kind, target):
+        with self.lock, self.db:
+            cursor = self.db.execute("INSERT INTO runs (kind, target, started) VALUES (?, ?, ?)",
+                                     (kind, target, time.time()))
+            return cursor.lastrowid
+
+    def record(self, run, host, port=None):
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO results (run, host, port) VALUES (?, ?, ?)", (run, host, port))
+
+    # only finished runs are used as baseline
+    def finish_run(self, run):
+        with self.lock, self.db:
+            self.db.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run))
+
+    # a whole run at once (e.g. from the GUI after the scan) -> id
+    def save_run(self, kind, target, results):
+        run = self.start_run(kind, target)
+        with self.lock, self.db:
+            self.db.executemany("INSERT INTO results (run, host, port) VALUES (?, ?, ?)",
+                                [(run, host, port) for host, port in results])
+        self.finish_run(run)
+        return run
+
+    # id of the newest finished run for this target, or None
+    def last_run(self, kind, target):
+        with self.lock:
+            row = self.db.execute("SELECT id FROM runs WHERE kind = ? AND target = ? AND finished IS NOT NULL "
+                                  "ORDER BY finished DESC LIMIT 1", (kind, target)).fetchone()
+        return row[0] if row else None
+
+    # {(host, port), ...} of one run (port None for hosts)
+    def results(self, run):
+        with self.lock:
+            return set(self.db.execute("SELECT host, port FROM results WHERE run = ?", (run,)))
+
+    # [(id, kind, target, started, finished, number of results), ...], newest first
+    def runs(self, kind=None, target=None, limit=50):
+        query = ("SELECT runs.id, kind, target, started, finished, COUNT(results.run) FROM runs "
+                 "LEFT JOIN results ON results.run = runs.id WHERE (? IS NULL OR kind = ?) AND (? IS NULL OR target = ?) "
+                 "GROUP BY runs.id ORDER BY started DESC LIMIT ?")
+        with self.lock:
+            return self.db.execute(query, (kind, kind, target, target, limit)).fetchall()
+
+
+# difference of two result sets -> (new, gone), both sorted
+def diff_results(before, after):
+    def order(item):
+        return item[0], item[1] or 0
+
+    return sorted(after - before, key=order), sorted(before - after, key=order)
@@ -0,0 +1,181 @@
+"""
+ICMP echo sweep for host discovery, ping processes as fallback
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import math
+import socket
+import struct
+import itertools
+import time
+import platform
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import OPEN, TIMEOUT, ERROR
+from .sweep import iter_sweep, iter_window, total_of, WINDOW
+
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+# family -> (protocol, echo request type, echo reply type)
+ICMP_FAMILIES = {
+    socket.AF_INET: (socket.IPPROTO_ICMP, ICMP_ECHO_REQUEST, ICMP_ECHO_REPLY),
+    socket.AF_INET6: (socket.IPPROTO_ICMPV6, ICMPV6_ECHO_REQUEST, ICMPV6_ECHO_REPLY),
+}
+
+
+# internet checksum (RFC 1071) for the ICMP header
+def icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+# ICMPv6: the checksum covers a pseudo header with the source address, the kernel fills it in
+def build_echo_request(ident, seq, payload=b"portscanner", family=socket.AF_INET):
+    icmp_type = ICMP_FAMILIES[family][1]
+    header = struct.pack("!BBHHH", icmp_type, 0, 0, ident, seq)
+    if family == socket.AF_INET6:
+        return header + payload
+    checksum = icmp_checksum(header + payload)
+    return struct.pack("!BBHHH", icmp_type, 0, checksum, ident, seq) + payload
+
+
+# unprivileged ping socket (Linux, ping_group_range) first, then raw socket (root / admin)
+# returns (socket, is_raw) or (None, False)
+def open_icmp_socket(family=socket.AF_INET):
+    protocol = ICMP_FAMILIES[family][0]
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            s = socket.socket(family, kind, protocol)
+            s.setblocking(False)
+            return s, kind == socket.SOCK_RAW
+        except (PermissionError, OSError):
+            continue
+    return None, False
+
+
+# Parse an echo reply -> (ident, seq) or None
+# raw IPv4 sockets deliver the IP header as well, ping sockets and IPv6 only the ICMP part
+def parse_echo_reply(packet, is_raw, family=socket.AF_INET):
+    if is_raw and family == socket.AF_INET:
+        if len(packet) < 20:
+            return None
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _, _, ident, seq = struct.unpack("!BBHHH", packet[:8])
+    if icmp_type != ICMP_FAMILIES[family][2]:
+        return None
+    return ident, seq
+
+
+# Send echo requests for all addresses at `rate` packets/s and read replies while sending
+# generator: yields every answering address as soon as its reply arrives
+# timeout / retries / limiter / answered: see sweep.iter_sweep
+# family: AF_INET6 for IPv6 addresses (ICMPv6 echo), one family per sweep
+# raises PermissionError if neither a ping socket nor a raw socket can be opened
+def iter_icmp_sweep(addresses, timeout=1.0, rate=1000, stop_event=None, progress=None, metrics=None,
+                    rtt=None, retries=0, limiter=None, answered=None, family=socket.AF_INET):
+    sock, is_raw = open_icmp_socket(family)
+    if sock is None:
+        raise PermissionError("no ICMP socket available")
+    ident = os.getpid() & 0xFFFF
+    counter = itertools.count()
+
+    def send(ip):
+        seq = next(counter) & 0xFFFF
+        sock.sendto(build_echo_request(ident, seq, family=family), (ip, 0))
+        return seq
+
+    def replies():
+        while True:
+            try:
+                packet, address = sock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            src = address[0]
+            reply = parse_echo_reply(packet, is_raw, family)
+            # the kernel rewrites the id of ping sockets -> only check it on raw sockets
+            if reply is not None and (not is_raw or reply[0] == ident):
+                yield src, reply[1], src
+
+    try:
+        yield from iter_sweep(addresses, sock, send, replies, timeout, rate, stop_event, progress, metrics,
+                              rtt, retries, limiter, answered)
+    finally:
+        sock.close()
+
+
+# returns the answering addresses in the order of `addresses`, or None if no ICMP socket is available
+def icmp_sweep(addresses, timeout=1.0, rate=1000, stop_event=None, progress=None, metrics=None, rtt=None,
+               retries=0):
+    addresses = [str(ip) for ip in addresses]
+    alive = set()
+    try:
+        for family in (socket.AF_INET, socket.AF_INET6):
+            part = [ip for ip in addresses if (":" in ip) == (family == socket.AF_INET6)]
+            if part:
+                alive.update(iter_icmp_sweep(part, timeout, rate, stop_event, progress, metrics, rtt, retries,
+                                             family=family))
+    except PermissionError:
+        return None
+    return [ip for ip in addresses if ip in alive]
+
+
+# Fallback without ICMP socket: ping processes, but many at once
+# generator: yields every answering address when its ping process is done
+# the addresses are read only as far as needed for `workers` * WINDOW queued pings
+def iter_ping_sweep(addresses, workers=64, stop_event=None, progress=None, metrics=None, timeout=1.0, rtt=None):
+    total = total_of(addresses)
+    is_win = platform.system().lower().startswith("win")
+    if rtt is not None and rtt.network.samples:
+        timeout = rtt.network_timeout()
+
+    def ping(ip):
+        if stop_event is not None and stop_event.is_set():
+            return False
+        if metrics is not None:
+            metrics.probe_sent()
+        start = time.monotonic()
+        cmd = ["ping", "-n" if is_win else "-c", "1", ip]
+        if is_win:
+            cmd += ["-w", str(max(1, int(timeout * 1000)))]  # Timeout in ms unter Windows
+        else:
+            cmd += ["-W", str(max(1, math.ceil(timeout)))]  # whole seconds only
+        try:
+            subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
+            if metrics is not None:
+                metrics.probe_done(OPEN, time.monotonic() - start)
+            return True
+        except subprocess.CalledProcessError:
+            if metrics is not None:
+                metrics.probe_done(TIMEOUT)
+            return False
+        except OSError:
+            if metrics is not None:
+                metrics.probe_done(ERROR)
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, (ip, answered) in enumerate(iter_window(pool, ping, map(str, addresses), workers * WINDOW),
+                                           start=1):
+            if answered:
+                yield ip
+            if progress is not None and total:
+                progress(int(i / total * 100))
+
+
+# returns the answering addresses in the order of `addresses`
+def ping_sweep(addresses, workers=64, stop_event=None, progress=None, metrics=None, timeout=1.0, rtt=None):
+    addresses = [str(ip) for ip in addresses]
+    alive = set(iter_ping_sweep(addresses, workers, stop_event, progress, metrics, timeout, rtt))
+    return [ip for ip in addresses if ip in alive]
@@ -0,0 +1,180 @@
+"""
+Telemetry for one scan run: probes, outcomes, in-flight, RTT histogram, phase timings
+
+Readable while the scan runs (snapshot / summary), as JSON at the end,
+or in Prometheus text format on a local port.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPEN = "open"
+CLOSED = "closed"
+FILTERED = "filtered"
+TIMEOUT = "timeout"
+ERROR = "error"
+OUTCOMES = (OPEN, CLOSED, FILTERED, TIMEOUT, ERROR)
+
+# upper bounds of the RTT buckets in seconds (last bucket = everything above)
+RTT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class ScanMetrics:
+
+    def __init__(self, name="scan"):
+        self.name = name
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.probes_sent = 0
+        self.in_flight = 0
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.rtt_counts = [0] * (len(RTT_BUCKETS) + 1)
+        self.rtt_sum = 0.0
+        self.phases = {}  # name -> seconds
+
+    # one probe has left, the answer comes later with probe_done()
+    def probe_sent(self):
+        with self.lock:
+            self.probes_sent += 1
+            self.in_flight += 1
+
+    def probe_done(self, outcome, rtt=None):
+        with self.lock:
+            self.in_flight -= 1
+            self.outcomes[outcome] += 1
+            if rtt is not None:
+                self.rtt_counts[bisect.bisect_left(RTT_BUCKETS, rtt)] += 1
+                self.rtt_sum += rtt
+
+    # with metrics.phase("connect"): ...  -> wall time of the block
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.monotonic() - start
+
+    # raw counters, e.g. to send them from a worker process to the parent
+    def counters(self):
+        with self.lock:
+            return {
+                "probes_sent": self.probes_sent,
+                "in_flight": self.in_flight,
+                "outcomes": dict(self.outcomes),
+                "rtt_counts": list(self.rtt_counts),
+                "rtt_sum": self.rtt_sum,
+            }
+
+    # add counters of another run, minus `previous` counters of it that were already added
+    def merge(self, counters, previous=None):
+        def diff(key):
+            return counters[key] - (previous[key] if previous else 0)
+
+        with self.lock:
+            self.probes_sent += diff("probes_sent")
+            self.in_flight += diff("in_flight")
+            self.rtt_sum += diff("rtt_sum")
+            for outcome, count in counters["outcomes"].items():
+                self.outcomes[outcome] += count - (previous["outcomes"][outcome] if previous else 0)
+            for i, count in enumerate(counters["rtt_counts"]):
+                self.rtt_counts[i] += count - (previous["rtt_counts"][i] if previous else 0)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = self.elapsed()
+            answered = sum(self.outcomes.values())
+            return {
+                "name": self.name,
+                "elapsed": round(elapsed, 3),
+                "probes_sent": self.probes_sent,
+                "probes_per_sec": round(self.probes_sent / elapsed, 1) if elapsed > 0 else 0.0,
+                "in_flight": self.in_flight,
+                "outcomes": dict(self.outcomes),
+                "rtt_histogram": {
+                    **{str(bound): count for bound, count in zip(RTT_BUCKETS, self.rtt_counts)},
+                    "+Inf": self.rtt_counts[-1],
+                },
+                "rtt_avg": round(self.rtt_sum / sum(self.rtt_counts), 6) if sum(self.rtt_counts) else None,
+                "answered": answered,
+                "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            }
+
+    # short text for a status bar
+    def summary(self):
+        snap = self.snapshot()
+        outcomes = snap["outcomes"]
+        return (f"{snap['probes_sent']} probes, {snap['probes_per_sec']:.0f}/s, "
+                f"{snap['in_flight']} in flight, {outcomes[OPEN]} open, "
+                f"{outcomes[CLOSED]} closed, {outcomes[TIMEOUT] + outcomes[FILTERED]} no answer")
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        label = f'scan="{self.name}"'
+        lines = [
+            "# TYPE portscanner_probes_sent_total counter",
+            f"portscanner_probes_sent_total{{{label}}} {snap['probes_sent']}",
+            "# TYPE portscanner_in_flight gauge",
+            f"portscanner_in_flight{{{label}}} {snap['in_flight']}",
+            "# TYPE portscanner_responses_total counter",
+        ]
+        for outcome, count in snap["outcomes"].items():
+            lines.append(f'portscanner_responses_total{{{label},outcome="{outcome}"}} {count}')
+
+        lines.append("# TYPE portscanner_rtt_seconds histogram")
+        with self.lock:
+            counts = list(self.rtt_counts)
+            rtt_sum = self.rtt_sum
+        cumulative = 0
+        for bound, count in zip(RTT_BUCKETS, counts):
+            cumulative += count
+            lines.append(f'portscanner_rtt_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'portscanner_rtt_seconds_bucket{{{label},le="+Inf"}} {cumulative}')
+        lines.append(f"portscanner_rtt_seconds_sum{{{label}}} {rtt_sum}")
+        lines.append(f"portscanner_rtt_seconds_count{{{label}}} {cumulative}")
+
+        lines.append("# TYPE portscanner_phase_seconds gauge")
+        for name, seconds in snap["phases"].items():
+            lines.append(f'portscanner_phase_seconds{{{label},phase="{name}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+
+# /metrics on 127.0.0.1:port in a background thread, returns the server (call shutdown() to stop)
+def serve_prometheus(metrics, port, host="127.0.0.1"):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # no access log on the console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
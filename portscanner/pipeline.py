@@ -0,0 +1,144 @@
+"""
+Pipeline: host discovery and port scan at the same time
+
+Every host is queued for the port scan as soon as the discovery finds it,
+so a subnet audit takes about as long as the longer stage, not both together.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import asyncio
+import threading
+import ipaddress
+from collections import deque
+
+from .tcp import iter_connect_targets
+from .targets import parse_ports
+from .metrics import ScanMetrics
+from .rtt import RttTable, MIN_TIMEOUT
+from .scanners import NetworkScan
+from .stream import iterate_async
+
+
+# round-robin over all hosts found so far, new hosts join while the scan runs
+# host_queue delivers addresses and None at the end of the discovery
+async def interleave_hosts(host_queue, ports):
+    active = deque()  # (host, iterator over its ports)
+    discovery_done = False
+
+    while True:
+        # take every host that is already waiting
+        while not discovery_done:
+            try:
+                host = host_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if host is None:
+                discovery_done = True
+            else:
+                active.append((host, iter(ports)))
+
+        if not active:
+            if discovery_done:
+                return
+            host = await host_queue.get()  # nothing to probe -> wait for the discovery
+            if host is None:
+                discovery_done = True
+            else:
+                active.append((host, iter(ports)))
+            continue
+
+        host, port_iter = active.popleft()
+        port = next(port_iter, None)
+        if port is None:
+            continue  # all ports of this host are done
+        active.append((host, port_iter))
+        yield host, port
+
+
+# results: (host, None) when a host is found, (host, port) for every open port
+class PipelineScan:
+
+    # mode = discovery with "ping" or "arp", queue_size = hosts waiting between the stages
+    def __init__(self, network, ports="top100", mode="ping", timeout=0.5, concurrency=1000, per_host=100,
+                 queue_size=256, progress=None, metrics=None, rtt=None, resolver=None, retries=1):
+        if mode not in ("ping", "arp"):
+            raise ValueError(f"discovery mode must be ping or arp, not {mode}")
+        self.ports = parse_ports(ports) if isinstance(ports, str) else list(ports)
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.queue_size = queue_size
+        self.metrics = metrics or ScanMetrics("pipeline")
+        # discovery replies give the port scan its first timeouts
+        self.rtt = rtt or RttTable(initial=timeout, min_timeout=MIN_TIMEOUT)
+        self.retries = retries
+        self.stop_event = threading.Event()
+        self.discovery = NetworkScan(mode=mode, network=network, stop_event=self.stop_event, resolver=resolver,
+                                     progress=progress, metrics=self.metrics, rtt=self.rtt)
+
+    async def aiter_results(self):
+        loop = asyncio.get_running_loop()
+        host_queue = asyncio.Queue(maxsize=self.queue_size)
+        events = asyncio.Queue()
+        finished = False
+
+        # stage 1 in a thread (blocking sockets), blocks when the port scan falls behind
+        def discover():
+            try:
+                for ip, _ in self.discovery.iter_pairs():
+                    loop.call_soon_threadsafe(events.put_nowait, (ip, None))
+                    asyncio.run_coroutine_threadsafe(host_queue.put(ip), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(host_queue.put(None), loop).result()
+
+        # stage 2 on this event loop
+        async def scan_ports():
+            targets = interleave_hosts(host_queue, self.ports)
+            async for host, port in iter_connect_targets(targets, 0, timeout=self.timeout,
+                                                         concurrency=self.concurrency, stop_event=self.stop_event,
+                                                         metrics=self.metrics, rtt=self.rtt, retries=self.retries,
+                                                         per_host=self.per_host):
+                events.put_nowait((host, port))
+
+        discovery = loop.run_in_executor(None, discover)
+        port_scan = asyncio.ensure_future(scan_ports())
+        both = asyncio.gather(discovery, port_scan)
+        both.add_done_callback(lambda _: events.put_nowait(None))  # end marker
+
+        try:
+            with self.metrics.phase("pipeline"):
+                while True:
+                    event = await events.get()
+                    if event is None:
+                        break
+                    yield event
+                both.result()  # raise errors of the stages
+            finished = True
+        finally:
+            if not finished:
+                # consumer stopped early -> stop the discovery and free its queue slot
+                self.stop_event.set()
+                port_scan.cancel()
+                while not discovery.done():
+                    while not host_queue.empty():
+                        host_queue.get_nowait()
+                    await asyncio.sleep(0.01)
+                await asyncio.gather(both, return_exceptions=True)
+
+    def iter_results(self):
+        try:
+            yield from iterate_async(self.aiter_results())
+        except Exception as e:
+            print(f"Pipeline scan error: {e}")
+
+    # [(host, [open ports]), ...] sorted by address
+    def run(self):
+        hosts = {}
+        for host, port in self.iter_results():
+            ports = hosts.setdefault(host, [])
+            if port is not None:
+                ports.append(port)
+        return [(host, sorted(hosts[host])) for host in sorted(hosts, key=ipaddress.ip_address)]
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,268 @@
+"""
+Compact scan state: 2 bits per port and host, 1 bit per address of a network
+
+A host starts with a dict of its few known ports and gets two port bitmaps of 8 KB (same layout
+as porttable) once it has more than DENSE_PORTS: bit `port` of `low` and of `high` together give
+the state. Set operations run on whole bitmaps as Python ints, the bytearrays can be exported
+without copying (memoryview).
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import ipaddress
+
+from .metrics import OPEN, CLOSED, FILTERED
+from .porttable import new_port_bitmap
+
+# state = low bit + 2 * high bit, UNKNOWN = never answered / not probed
+PORT_UNKNOWN = 0
+PORT_OPEN = 1
+PORT_CLOSED = 2
+PORT_FILTERED = 3
+
+# outcome of a probe (metrics) -> state, timeouts stay unknown
+STATE_OF_OUTCOME = {OPEN: PORT_OPEN, CLOSED: PORT_CLOSED, FILTERED: PORT_FILTERED}
+
+
+def bitmap_to_int(bitmap):
+    return int.from_bytes(bitmap, "little")
+
+
+def int_to_bitmap(value, size=65536 // 8):
+    return bytearray(value.to_bytes(size, "little"))
+
+
+# set bits of a bitmap (bytearray or int) -> port numbers, ascending
+def iter_bits(bitmap):
+    if isinstance(bitmap, int):
+        bitmap = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(bitmap):
+        if not byte:
+            continue  # most bytes are empty
+        base = index << 3
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield base + bit
+
+
+# known ports of a host from which on the bitmaps are smaller than the dict
+DENSE_PORTS = 256
+
+FULL_MASK = (1 << 65536) - 1
+
+
+# state of all 65536 ports of one host
+class PortStates:
+
+    def __init__(self):
+        self.low = new_port_bitmap()
+        self.high = new_port_bitmap()
+
+    def set(self, port, state):
+        index, bit = port >> 3, 1 << (port & 7)
+        if state & 1:
+            self.low[index] |= bit
+        else:
+            self.low[index] &= ~bit
+        if state & 2:
+            self.high[index] |= bit
+        else:
+            self.high[index] &= ~bit
+
+    def get(self, port):
+        index, shift = port >> 3, port & 7
+        return (self.low[index] >> shift & 1) | (self.high[index] >> shift & 1) << 1
+
+    # all ports with `state` as int bitset (bit n = port n)
+    def mask(self, state=PORT_OPEN):
+        low, high = bitmap_to_int(self.low), bitmap_to_int(self.high)
+        return ((low if state & 1 else ~low) & (high if state & 2 else ~high)) & FULL_MASK
+
+    def ports(self, state=PORT_OPEN):
+        return list(iter_bits(self.mask(state)))
+
+    def count(self, state=PORT_OPEN):
+        return bin(self.mask(state)).count("1")
+
+    # without copy, e.g. to write them to a file
+    def views(self):
+        return memoryview(self.low), memoryview(self.high)
+
+
+# same interface as PortStates for a host with only a few known ports: port -> state
+class SparsePortStates:
+
+    def __init__(self):
+        self.states = {}
+
+    def __len__(self):
+        return len(self.states)
+
+    def set(self, port, state):
+        if state == PORT_UNKNOWN:
+            self.states.pop(port, None)
+        else:
+            self.states[port] = state
+
+    def get(self, port):
+        return self.states.get(port, PORT_UNKNOWN)
+
+    def mask(self, state=PORT_OPEN):
+        if state == PORT_UNKNOWN:
+            known = 0
+            for port in self.states:
+                known |= 1 << port
+            return FULL_MASK & ~known
+        result = 0
+        for port, port_state in self.states.items():
+            if port_state == state:
+                result |= 1 << port
+        return result
+
+    def ports(self, state=PORT_OPEN):
+        if state == PORT_UNKNOWN:
+            return list(iter_bits(self.mask(state)))
+        return sorted(port for port, port_state in self.states.items() if port_state == state)
+
+    def count(self, state=PORT_OPEN):
+        return len(self.ports(state))
+
+    def dense(self):
+        states = PortStates()
+        for port, state in self.states.items():
+            states.set(port, state)
+        return states
+
+    def views(self):
+        return self.dense().views()
+
+
+# port states per host; only the states in `keep` are stored (e.g. open and filtered for a scan that
+# needs nothing else), a host gets an entry once it has one of them - few ports in a dict, many in bitmaps
+class PortStateTable:
+
+    def __init__(self, keep=(PORT_OPEN, PORT_CLOSED, PORT_FILTERED)):
+        self.keep = frozenset(keep)
+        self.hosts = {}
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def __contains__(self, host):
+        return host in self.hosts
+
+    def __getitem__(self, host):
+        return self.hosts[host]
+
+    # called for every finished probe with the outcome from metrics
+    def record(self, host, port, outcome):
+        state = STATE_OF_OUTCOME.get(outcome)
+        if state is None:
+            return
+        states = self.hosts.get(host)
+        if state not in self.keep:
+            if states is not None:
+                states.set(port, PORT_UNKNOWN)  # an older state of the port is no longer true
+            return
+        if states is None:
+            states = self.hosts[host] = SparsePortStates()
+        states.set(port, state)
+        if isinstance(states, SparsePortStates) and len(states) > DENSE_PORTS:
+            self.hosts[host] = states.dense()
+
+    def get(self, host, port):
+        states = self.hosts.get(host)
+        return states.get(port) if states is not None else PORT_UNKNOWN
+
+    # int bitset of ports that are open on at least one host
+    def open_on_any(self):
+        result = 0
+        for states in self.hosts.values():
+            result |= states.mask(PORT_OPEN)
+        return result
+
+    # int bitset of ports that are open on every host of the table
+    def open_on_all(self):
+        result = None
+        for states in self.hosts.values():
+            mask = states.mask(PORT_OPEN)
+            result = mask if result is None else result & mask
+        return result or 0
+
+    # hosts where `port` has `state`
+    def hosts_with(self, port, state=PORT_OPEN):
+        return [host for host, states in self.hosts.items() if states.get(port) == state]
+
+    # {host: [ports]} open here but not in `other` (e.g. the previous scan)
+    def opened_since(self, other):
+        changes = {}
+        for host, states in self.hosts.items():
+            mask = states.mask(PORT_OPEN)
+            if host in other:
+                mask &= ~other[host].mask(PORT_OPEN)
+            if mask:
+                changes[host] = list(iter_bits(mask))
+        return changes
+
+    # (host, port) of every open port, sorted by address and port
+    def iter_open(self):
+        for host in sorted(self.hosts, key=_address_key):
+            for port in self.hosts[host].ports(PORT_OPEN):
+                yield host, port
+
+
+def _address_key(host):
+    try:
+        return 0, ipaddress.ip_address(host)
+    except ValueError:
+        return 1, host  # hostnames after the addresses
+
+
+# 1 bit per address of a network (a /16 needs 8 KB) for found hosts
+class AddressBitmap:
+
+    def __init__(self, network):
+        self.network = ipaddress.ip_network(network, strict=False)
+        self.first = int(self.network.network_address)
+        self.bits = bytearray((self.network.num_addresses + 7) // 8)
+
+    def index(self, ip):
+        offset = int(ipaddress.ip_address(ip)) - self.first
+        if not 0 <= offset < self.network.num_addresses:
+            raise ValueError(f"{ip} is not in {self.network}")
+        return offset
+
+    def add(self, ip):
+        offset = self.index(ip)
+        self.bits[offset >> 3] |= 1 << (offset & 7)
+
+    def __contains__(self, ip):
+        try:
+            offset = self.index(ip)
+        except ValueError:
+            return False
+        return bool(self.bits[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self):
+        return bin(bitmap_to_int(self.bits)).count("1")
+
+    def __iter__(self):
+        for offset in iter_bits(self.bits):
+            yield str(ipaddress.ip_address(self.first + offset))
+
+    # set operations with another bitmap of the same network -> new bitmap
+    def combine(self, other, operation):
+        if other.network != self.network:
+            raise ValueError("bitmaps of different networks")
+        result = AddressBitmap(self.network)
+        value = operation(bitmap_to_int(self.bits), bitmap_to_int(other.bits))
+        result.bits = int_to_bitmap(value & ((1 << len(self.bits) * 8) - 1), len(self.bits))
+        return result
+
+    def __or__(self, other):
+        return self.combine(other, lambda a, b: a | b)
+
+    def __and__(self, other):
+        return self.combine(other, lambda a, b: a & b)
+
+    def __sub__(self, other):
+        return self.combine(other, lambda a, b: a & ~b)
@@ -0,0 +1,59 @@
+"""
+Used ports from the kernel socket tables (/proc/net/tcp, tcp6, udp, udp6)
+
+One pass over the tables instead of one bind() per port. Linux only,
+everywhere else the free-ports scan falls back to bind().
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+
+PROC_NET = "/proc/net"
+UNPRIVILEGED_PORT_START = "/proc/sys/net/ipv4/ip_unprivileged_port_start"
+
+
+def table_available(protocol="tcp"):
+    return os.path.exists(os.path.join(PROC_NET, protocol))
+
+
+# bitmap with one bit per port (65536 bits = 8 KB)
+def new_port_bitmap():
+    return bytearray(65536 // 8)
+
+
+def set_port(bitmap, port):
+    bitmap[port >> 3] |= 1 << (port & 7)
+
+
+def port_is_set(bitmap, port):
+    return bool(bitmap[port >> 3] & (1 << (port & 7)))
+
+
+# every local port that appears in the IPv4 and IPv6 table of `protocol` ("tcp" or "udp")
+# a wildcard bind() fails for all of them, whatever state the socket is in
+def read_used_ports(protocol="tcp"):
+    bitmap = new_port_bitmap()
+    for name in (protocol, protocol + "6"):
+        try:
+            with open(os.path.join(PROC_NET, name), "r") as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 2:
+                        continue
+                    # local_address is "ADDR:PORT" in hex
+                    set_port(bitmap, int(fields[1].rsplit(":", 1)[1], 16))
+        except FileNotFoundError:
+            continue  # e.g. no IPv6 in the kernel
+    return bitmap
+
+
+# ports below this limit need root for bind() (default 1024)
+def unprivileged_port_start():
+    if not hasattr(os, "geteuid") or os.geteuid() == 0:
+        return 0
+    try:
+        with open(UNPRIVILEGED_PORT_START, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return 1024
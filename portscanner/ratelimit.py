@@ -0,0 +1,224 @@
+"""
+Global packet-rate limiter shared by all scans of the process (token bucket + in-flight budget)
+
+    rate       packets/s of all scanners together, 0 = no limit until the first congestion
+    in_flight  probes waiting for an answer at the same time, default = what RLIMIT_NOFILE allows
+               (looked up, and the soft limit raised, when the first scan needs it - not on import)
+
+Congestion halves the rate and the in-flight budget (at most once per window):
+    EMFILE / ENFILE / ENOBUFS / ENOMEM / EADDRNOTAVAIL from the kernel
+    the share of lost probes of a window jumps above the usual share; lost = a retry got the answer
+    the first probe did not get, or an ICMP unreachable came back (ports that stay silent are filtered,
+    not congestion)
+Every clean window raises both again by 1/8, up to the configured values.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import time
+import errno
+import asyncio
+import threading
+
+from .metrics import TIMEOUT, FILTERED
+
+# keep some file descriptors free for the GUI / resolver
+FD_RESERVE = 64
+
+# soft limit that is asked for when the hard limit allows it
+FD_WANTED = 65536
+
+# the machine is out of sockets / buffers / local ports, the target did not answer anything
+RESOURCE_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM, errno.EADDRNOTAVAIL}
+
+
+# raises the soft RLIMIT_NOFILE up to `wanted` (at most the hard limit) -> new soft limit, None on Windows
+def raise_fd_limit(wanted=FD_WANTED):
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return None
+    if hard != resource.RLIM_INFINITY:
+        wanted = min(wanted, hard)
+    if wanted > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+            soft = wanted
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+# sockets a scan may have open at the same time, None = no limit known
+def fd_budget():
+    soft = raise_fd_limit()
+    return None if soft is None else max(1, soft - FD_RESERVE)
+
+
+# Token bucket for the packets/s of all scanners plus a budget for the probes in flight.
+# Thread-safe: every scan runs its own event loop in its own thread and shares shared_limiter.
+class RateLimiter:
+
+    # window: seconds per measurement window, loss_jump: how far the share of lost probes
+    # may rise above its average before that counts as congestion
+    def __init__(self, rate=0, in_flight=None, min_rate=10, min_in_flight=8, window=0.5, loss_jump=0.3,
+                 min_window_probes=20):
+        self.min_rate = min_rate
+        self.min_in_flight = min_in_flight
+        self.window = window
+        self.loss_jump = loss_jump
+        self.min_window_probes = min_window_probes
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.configure(rate, in_flight)
+
+    # new limits (e.g. from the command line), resets the backoff state
+    def configure(self, rate=0, in_flight=None):
+        with self.lock:
+            self.max_rate = rate
+            self.rate = rate or None  # None = not limited
+            self.wanted_in_flight = in_flight
+            self.max_in_flight = self.limit = None
+            self.sized = False
+            self.tokens = 1.0
+            self.refilled = time.monotonic()
+            self.window_start = self.refilled
+            self.sent = 0
+            self.answered = 0
+            self.lost = 0
+            self.loss_share = None  # average share of lost probes per window
+            self.peak_rate = 0.0  # highest packets/s of a window so far
+            self.last_backoff = 0.0
+            self.backoffs = 0
+            self.reason = None
+
+    # in-flight budget from the configuration or RLIMIT_NOFILE on first use; called with the lock held
+    def size(self):
+        if not self.sized:
+            self.sized = True
+            self.max_in_flight = self.wanted_in_flight or fd_budget()
+            self.limit = self.max_in_flight
+
+    # configured packets/s (0 = none) and in-flight budget (None = no limit known)
+    def limits(self):
+        with self.lock:
+            self.size()
+            return self.max_rate, self.max_in_flight
+
+    # 0 if the packet may go now, else the seconds to wait
+    # hold: the probe counts as in flight until release(), else it has to be reported with done()
+    def try_acquire(self, hold=True):
+        with self.lock:
+            self.size()
+            now = time.monotonic()
+            if hold and self.limit is not None and self.in_flight >= self.limit:
+                return 0.005  # a probe has to finish first
+            if self.rate is not None:
+                burst = max(1.0, self.rate / 20)  # at most 50 ms worth of packets at once
+                self.tokens = min(burst, self.tokens + (now - self.refilled) * self.rate)
+                self.refilled = now
+                if self.tokens < 1.0:
+                    return (1.0 - self.tokens) / self.rate
+                self.tokens -= 1.0
+            if hold:
+                self.in_flight += 1
+            self.sent += 1
+            return 0
+
+    async def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    # the probe is finished: outcome from metrics and its attempt (0 = first try, 1.. = retries),
+    # or the errno when it failed locally (both None when cancelled)
+    def release(self, outcome=None, error=None, attempt=0):
+        with self.lock:
+            self.in_flight -= 1
+            self.account(outcome, error, attempt)
+
+    # like release() for a probe sent with try_acquire(hold=False): answered or timed out
+    def done(self, outcome=None, attempt=0):
+        with self.lock:
+            self.account(outcome, None, attempt)
+
+    # a finished probe into the loss window; called with the lock held
+    def account(self, outcome, error, attempt):
+        now = time.monotonic()
+        if error in RESOURCE_ERRNOS:
+            self.backoff(now, _error_name(error))
+        elif outcome == FILTERED or (attempt > 0 and outcome not in (None, TIMEOUT)):
+            self.lost += 1
+        elif outcome is not None and outcome != TIMEOUT:
+            self.answered += 1
+        if now - self.window_start >= self.window:
+            self.end_window(now)
+
+    # the kernel refused a packet for lack of resources (senders that use try_acquire(hold=False))
+    def congested(self, error):
+        with self.lock:
+            self.backoff(time.monotonic(), _error_name(error))
+
+    # lost probes spike -> back off, a clean window -> speed up again
+    def end_window(self, now):
+        finished = self.answered + self.lost
+        if finished < self.min_window_probes:
+            return  # too few probes to tell anything, keep collecting
+        self.peak_rate = max(self.peak_rate, self.sent / (now - self.window_start))
+        share = self.lost / finished
+        if self.loss_share is not None and share > self.loss_share + self.loss_jump:
+            self.backoff(now, "packet loss")
+        elif now - self.last_backoff >= self.window:
+            self.increase()
+        # a new normal (e.g. a filtered network) becomes the average after a few windows
+        self.loss_share = share if self.loss_share is None else (self.loss_share + share) / 2
+        self.sent = self.answered = self.lost = 0
+        self.window_start = now
+
+    # halve rate and in-flight budget, at most once per window; called with the lock held
+    def backoff(self, now, reason):
+        if now - self.last_backoff < self.window:
+            return
+        if self.rate is None:
+            # not limited so far -> start from the fastest window so far
+            elapsed = max(now - self.window_start, 0.001)
+            self.rate = max(self.peak_rate, self.sent / elapsed, self.min_rate * 2)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 1.0)
+        if self.limit is not None:
+            self.limit = max(self.min_in_flight, min(self.limit, self.in_flight + 1) // 2)
+        self.last_backoff = now
+        self.backoffs += 1
+        self.reason = reason
+
+    # additive increase; called with the lock held
+    def increase(self):
+        if self.rate is not None:
+            self.rate += max(1.0, self.rate / 8)
+            if self.max_rate and self.rate >= self.max_rate:
+                self.rate = float(self.max_rate)
+        if self.limit is not None and self.max_in_flight is not None:
+            self.limit = min(self.max_in_flight, self.limit + max(1, self.limit // 8))
+
+    # current state, e.g. for the end of a scan
+    def snapshot(self):
+        with self.lock:
+            return {
+                "rate": None if self.rate is None else round(self.rate, 1),
+                "in_flight": self.in_flight,
+                "in_flight_limit": self.limit,
+                "backoffs": self.backoffs,
+                "reason": self.reason,
+            }
+
+
+def _error_name(error):
+    return errno.errorcode.get(error, str(error))
+
+
+# one limiter for all scanners of the process
+shared_limiter = RateLimiter()
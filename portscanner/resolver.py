@@ -0,0 +1,158 @@
+"""
+Reverse-DNS resolver with bounded thread pool and TTL/LRU cache
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import json
+import time
+import queue
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .sweep import total_of, WINDOW
+
+
+# File for keeping reverse-DNS answers between runs
+DNS_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".portscanner_dns_cache.json")
+
+
+# LRU cache for reverse-DNS answers, entries expire after `ttl` seconds
+# (failed lookups are cached as None with the shorter `negative_ttl`)
+class HostnameCache:
+
+    def __init__(self, maxsize=4096, ttl=3600, negative_ttl=300, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self.entries = OrderedDict()  # ip -> (hostname, expires)
+        self.lock = threading.Lock()
+        if path:
+            self.load()
+
+    # returns (True, hostname) on a hit, (False, None) on a miss
+    def get(self, ip):
+        with self.lock:
+            entry = self.entries.get(ip)
+            if entry is None:
+                return False, None
+            hostname, expires = entry
+            if expires < time.time():
+                del self.entries[ip]
+                return False, None
+            self.entries.move_to_end(ip)
+            return True, hostname
+
+    def put(self, ip, hostname):
+        ttl = self.ttl if hostname is not None else self.negative_ttl
+        with self.lock:
+            self.entries[ip] = (hostname, time.time() + ttl)
+            self.entries.move_to_end(ip)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self.lock:
+            for ip, (hostname, expires) in data.items():
+                if expires > now:
+                    self.entries[ip] = (hostname, expires)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {ip: [hostname, expires] for ip, (hostname, expires) in self.entries.items()}
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except OSError as e:
+            print(f"DNS cache error: {e}")
+
+
+# Reverse-DNS lookups with a bounded thread pool, shared by the DNS and ARP scan
+class ReverseResolver:
+
+    def __init__(self, workers=32, cache=None, lookup=None):
+        self.workers = workers
+        self.cache = cache if cache is not None else HostnameCache()
+        self.lookup = lookup or socket.gethostbyaddr
+
+    def _lookup(self, ip):
+        try:
+            return self.lookup(ip)[0]
+        except (socket.herror, socket.gaierror, OSError):
+            return None
+
+    # generator: yields (ip, hostname or None), cache hits at once, lookups as they finish
+    # slow lookups do not block the others; `ips` is read only as far as needed for workers * WINDOW
+    # queued lookups, so a /8 costs no more memory than a /24
+    def iter_resolve(self, ips, stop_event=None, progress=None):
+        total = total_of(ips)
+        last_percent = -1
+        for done, (ip, _, hostname) in enumerate(self.iter_resolve_stream(((str(ip), None) for ip in ips),
+                                                                          stop_event), start=1):
+            yield ip, hostname
+            percent = int(done / total * 100) if total else 0
+            if progress is not None and percent != last_percent:
+                last_percent = percent
+                progress(percent)
+
+    # like iter_resolve, for addresses that still arrive from a running generator (e.g. an ARP sweep)
+    # pairs: (ip, data) -> yields (ip, data, hostname or None) as soon as the name is known
+    def iter_resolve_stream(self, pairs, stop_event=None):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            completed = queue.SimpleQueue()  # futures that are done, in this order
+
+            def finished(future):
+                ip, data = futures.pop(future)
+                hostname = future.result()
+                self.cache.put(ip, hostname)
+                return ip, data, hostname
+
+            try:
+                for ip, data in pairs:
+                    hit, hostname = self.cache.get(ip)
+                    if hit:
+                        yield ip, data, hostname
+                    else:
+                        future = pool.submit(self._lookup, ip)
+                        futures[future] = (ip, data)
+                        future.add_done_callback(completed.put)
+                    # names that were found in the meantime, wait for one when the window is full
+                    while futures:
+                        try:
+                            future = completed.get(block=len(futures) >= self.workers * WINDOW)
+                        except queue.Empty:
+                            break
+                        yield finished(future)
+                    if stop_event is not None and stop_event.is_set():
+                        return
+
+                while futures:
+                    yield finished(completed.get())
+                    if stop_event is not None and stop_event.is_set():
+                        return
+            finally:
+                for f in futures:
+                    f.cancel()
+
+    # returns {ip: hostname or None}
+    def resolve_many(self, ips, stop_event=None, progress=None):
+        return dict(self.iter_resolve(ips, stop_event, progress))
+
+    def resolve(self, ip):
+        return self.resolve_many([ip]).get(str(ip))
+
+
+# resolver used when a scanner gets none of its own
+shared_resolver = ReverseResolver()
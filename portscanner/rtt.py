@@ -0,0 +1,104 @@
+"""
+Adaptive timeouts from measured round trip times (like the TCP RTO, RFC 6298)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import threading
+
+# gains from RFC 6298
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+
+# lower bound for timeouts: with a thousand connects in flight the event loop itself
+# adds up to ~100 ms before an answer is seen, below this the scan produces false timeouts
+MIN_TIMEOUT = 0.25
+MAX_TIMEOUT = 3.0
+
+
+# smoothed RTT + variance for one target -> timeout for the next probe
+class RttEstimator:
+
+    def __init__(self, initial=1.0, min_timeout=MIN_TIMEOUT, max_timeout=MAX_TIMEOUT):
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def update(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - sample)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * sample
+        self.samples += 1
+
+    def clamp(self, value):
+        return max(self.min_timeout, min(self.max_timeout, value))
+
+    # without any sample the configured start value is used
+    def timeout(self):
+        if self.srtt is None:
+            return self.clamp(self.initial)
+        return self.clamp(self.srtt + K * self.rttvar)
+
+    # timeout for the n-th retransmission (doubled each time)
+    def retry_timeout(self, attempt):
+        return self.clamp(self.timeout() * (2 ** attempt))
+
+
+# estimators per host, plus one for the whole network as start value for unknown hosts
+class RttTable:
+
+    def __init__(self, initial=1.0, min_timeout=MIN_TIMEOUT, max_timeout=MAX_TIMEOUT):
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.hosts = {}
+        self.network = self.new_estimator()
+        self.lock = threading.Lock()
+
+    def new_estimator(self):
+        return RttEstimator(self.initial, self.min_timeout, self.max_timeout)
+
+    # new estimator that starts with what the rest of the network looks like; called with the lock held
+    def seeded(self):
+        estimator = self.new_estimator()
+        if self.network.srtt is not None:
+            estimator.srtt = self.network.srtt
+            estimator.rttvar = self.network.rttvar
+        return estimator
+
+    # estimator of the host; hosts without any sample are not stored (most hosts of a sweep never
+    # answer), they get a fresh seeded one
+    def get(self, host):
+        with self.lock:
+            estimator = self.hosts.get(host)
+            return estimator if estimator is not None else self.seeded()
+
+    # a real answer -> the host gets its own entry
+    def update(self, host, sample):
+        with self.lock:
+            estimator = self.hosts.get(host)
+            if estimator is None:
+                estimator = self.hosts[host] = self.seeded()
+            estimator.update(sample)
+            self.network.update(sample)
+
+    def timeout(self, host):
+        return self.get(host).timeout()
+
+    def retry_timeout(self, host, attempt):
+        return self.get(host).retry_timeout(attempt)
+
+    # True if the host ever answered -> a timeout might be packet loss, worth a retry
+    def responsive(self, host):
+        with self.lock:
+            return host in self.hosts
+
+    # timeout for the whole network (e.g. how long to wait after a sweep)
+    def network_timeout(self):
+        return self.network.timeout()
@@ -0,0 +1,494 @@
+"""
+Scanners without Qt - usable from the GUI, the command line or as a library
+
+progress is a callback with the percentage (int), run() returns the results.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import socket
+import ipaddress
+import threading
+from functools import partial
+
+from .tcp import iter_connect_targets, tcp_connect_probe
+from .syn import SynProber
+from .udp import udp_probe, UdpPacing
+from .service import ServiceTable, BANNER_TIMEOUT
+from .icmp import iter_icmp_sweep, iter_ping_sweep
+from .stream import iterate_async
+from .resolver import shared_resolver
+from .arp import scapy_available, arp_request, packet_socket_available, read_neighbors, iter_arp_sweep
+from .metrics import ScanMetrics, OPEN, CLOSED, FILTERED, TIMEOUT
+from .rtt import RttTable, MIN_TIMEOUT
+from .targets import TargetSpec, HostRange, HostOrder, format_ports
+from .checkpoint import Watermark, Checkpointer, load_checkpoint, CHECKPOINT_INTERVAL
+from .portstate import PortStateTable, AddressBitmap, PORT_OPEN, PORT_FILTERED
+from .porttable import table_available, read_used_ports, port_is_set, unprivileged_port_start
+
+
+ARP_TIMEOUT = 2
+
+# found hosts of larger networks (IPv6 prefixes) go into a set instead of 1 bit per address
+MAX_BITMAP_ADDRESSES = 1 << 24
+
+# connects in flight to one host of several, at least (per_host="auto")
+PER_HOST = 100
+
+
+def _no_progress(percent):
+    pass
+
+
+# per_host="auto": a single host is only limited by concurrency (a filtered host would otherwise
+# take minutes), several hosts share concurrency evenly, at least PER_HOST each
+def default_per_host(hosts, concurrency):
+    if hosts.count == 1:
+        return None
+    return max(PER_HOST, concurrency // hosts.count)
+
+
+# Network-scan for hosts (ping, DNS or ARP)
+class NetworkScan:
+
+    # timeout = wait for replies as long as nothing was measured yet, retries = extra rounds for silent hosts
+    # rtt: RttTable that learns from the replies (share it with OpenPortsScan to start with good timeouts)
+    # priority: addresses that are probed first (e.g. hosts seen by the last scan)
+    # shuffle: the other addresses in random order, spread over all subnets of the network
+    def __init__(self, mode="ping", network="192.168.1.0/24", stop_event=None, resolver=None, progress=None,
+                 metrics=None, rtt=None, timeout=1.0, retries=1, priority=None, shuffle=False, seed=None):
+        self.network = network
+        self.mode = mode
+        self.stop_event = stop_event or threading.Event()
+        self.resolver = resolver or shared_resolver
+        self.progress = progress or _no_progress
+        self.metrics = metrics or ScanMetrics(f"hosts-{mode}")
+        self.rtt = rtt or RttTable(initial=timeout)
+        self.timeout = timeout
+        self.retries = retries
+        self.priority = priority or []
+        self.shuffle = shuffle
+        self.seed = seed
+        self.found_hosts = []
+        self.alive = self.address_set()
+
+    # set for addresses of the network: 1 bit per address up to MAX_BITMAP_ADDRESSES
+    def address_set(self):
+        if ipaddress.ip_network(self.network, strict=False).num_addresses <= MAX_BITMAP_ADDRESSES:
+            return AddressBitmap(self.network)
+        return set()
+
+    # generator: yields every host as soon as it is found
+    # (ping/DNS: "ip" / "hostname: ip" strings, ARP: dicts with ip, mac and hostname)
+    def iter_results(self):
+        for _, item in self.iter_pairs():
+            yield item
+
+    # all results, sorted by address
+    def run(self):
+        return self.collect(self.iter_pairs())
+
+    def iter_pairs(self):
+        if self.mode == "ping":
+            pairs = self.iter_ping()
+        elif self.mode == "dns":
+            pairs = self.iter_dns()
+        elif self.mode == "arp":
+            pairs = self.iter_arp()
+        else:
+            return
+        for ip, item in pairs:
+            self.alive.add(ip)
+            yield ip, item
+
+    # all addresses of the network as strings, the priority ones first - built one by one while sending
+    def addresses(self):
+        return HostOrder(HostRange(self.network, every=True), self.priority, self.shuffle, self.seed)
+
+    def family(self):
+        version = ipaddress.ip_network(self.network, strict=False).version
+        return socket.AF_INET6 if version == 6 else socket.AF_INET
+
+    @staticmethod
+    def collect(pairs):
+        pairs = sorted(pairs, key=lambda pair: ipaddress.ip_address(pair[0]))
+        return [item for _, item in pairs]
+
+    # 1) Ping-Scan: own ICMP echo engine, ping processes only as fallback
+    def scan_with_ping(self):
+        self.found_hosts = self.collect(self.iter_ping())
+        return self.found_hosts
+
+    def iter_ping(self):
+        try:
+            all_ips = self.addresses()
+            with self.metrics.phase("discovery"):
+                try:
+                    for ip in iter_icmp_sweep(all_ips, timeout=self.timeout, stop_event=self.stop_event,
+                                              progress=self.progress, metrics=self.metrics, rtt=self.rtt,
+                                              retries=self.retries, answered=self.address_set(),
+                                              family=self.family()):
+                        yield ip, ip
+                except PermissionError:
+                    for ip in iter_ping_sweep(all_ips, stop_event=self.stop_event, progress=self.progress,
+                                              metrics=self.metrics, timeout=self.timeout, rtt=self.rtt):
+                        yield ip, ip
+        except Exception as e:
+            print(f"Ping scan error: {e}")
+
+    # 2) DNS Scan
+    def scan_with_dns(self):
+        return self.collect(self.iter_dns())
+
+    def iter_dns(self):
+        if self.stop_event.is_set():
+            return
+
+        try:
+            all_ips = self.addresses()
+            with self.metrics.phase("resolve"):
+                for ip, hostname in self.resolver.iter_resolve(all_ips, stop_event=self.stop_event,
+                                                               progress=self.progress):
+                    yield ip, f"{hostname}: {ip}" if hostname else f"{ip}: no hostname"
+
+        except Exception as e:
+            print(f"DNS scan error: {e}")
+
+    # 3) ARP Scan
+    # fixed 2 s only as long as nothing about the network is known
+    def arp_timeout(self):
+        if self.rtt.network.samples:
+            return self.rtt.network_timeout()
+        return ARP_TIMEOUT
+
+    def scan_with_arp(self):
+        return self.collect(self.iter_arp())
+
+    def iter_arp(self):
+        if self.stop_event.is_set():
+            return
+
+        with self.metrics.phase("discovery"):
+            # hostnames are looked up while the sweep is still running
+            for ip, mac, hostname in self.resolver.iter_resolve_stream(self.iter_arp_answers(),
+                                                                       stop_event=self.stop_event):
+                yield ip, {"ip": ip, "mac": mac, "hostname": hostname or "unknown"}
+
+    # (ip, mac): neighbor cache of the kernel first (no packet at all), then the active sweep
+    # adds the hosts the cache did not know
+    def iter_arp_answers(self):
+        seen = set()
+        for ip, mac in read_neighbors(self.network):
+            seen.add(ip)
+            yield ip, mac
+
+        all_ips = self.addresses()
+        try:
+            if packet_socket_available():
+                answers = iter_arp_sweep(all_ips, timeout=self.arp_timeout(), stop_event=self.stop_event,
+                                         progress=self.progress, metrics=self.metrics, rtt=self.rtt,
+                                         retries=self.retries, answered=self.address_set())
+            elif scapy_available():
+                answers = arp_request(self.network, timeout=self.arp_timeout())
+            else:
+                print("ARP sweep needs Linux or scapy - only the neighbor cache is shown")
+                return
+            for ip, mac in answers:
+                if ip not in seen:
+                    seen.add(ip)
+                    yield ip, mac
+        except PermissionError:
+            print("ARP sweep needs admin rights - only the neighbor cache is shown")
+        except Exception as e:
+            print(f"ARP Scan Error: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# Scan for open TCP ports on several hosts and ports (TargetSpec or host/port spec strings)
+# probes go round-robin over the hosts, at most per_host connects to the same host at once
+# (None = no limit, "auto" = see default_per_host)
+class TargetScan:
+
+    # concurrency = number of connects in flight at the same time
+    # adaptive: timeout is only the start value, then every probe waits as long as the measured
+    # RTT of the host needs (between min_timeout and max_timeout); silent ports get `retries` more tries
+    # (without adaptive each of them waits `timeout`)
+    # services: read banner / send a probe on every open port before closing it (self.services)
+    # shuffle: walk hosts x ports in random order (same seed -> same order), spread over all subnets
+    # syn: half-open SYN scan on a raw socket (root), connect scan without the rights or with services
+    # checkpoint: file for the position and the results so far, every checkpoint_interval seconds and when
+    # the scan is stopped -> TargetScan.resume(file); removed when the scan is complete
+    kind = "tcp"
+
+    def __init__(self, hosts, ports="top100", timeout=0.5, concurrency=1000, per_host="auto", progress=None,
+                 metrics=None, adaptive=True, rtt=None, min_timeout=MIN_TIMEOUT, max_timeout=2.0, retries=1,
+                 services=False, banner_timeout=BANNER_TIMEOUT, shuffle=False, seed=None, syn=False,
+                 checkpoint=None, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.targets = hosts if isinstance(hosts, TargetSpec) else TargetSpec(hosts, ports, shuffle, seed)
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.per_host = default_per_host(self.targets.hosts, concurrency) if per_host == "auto" else per_host
+        self.progress = progress or _no_progress
+        self.metrics = metrics or ScanMetrics("targets")
+        self.rtt = None
+        if adaptive:
+            self.rtt = rtt or RttTable(initial=timeout, min_timeout=min_timeout, max_timeout=max_timeout)
+        self.retries = retries
+        self.stop_event = threading.Event()
+        # open / filtered ports of the hosts that have any (closed ones are not needed, only counted)
+        self.states = PortStateTable(keep=(PORT_OPEN, PORT_FILTERED))
+        self.probe_func = tcp_connect_probe
+        self.pacing = None
+        self.services = ServiceTable(banner_timeout) if services else None
+        self.syn = None
+        if self.services is not None:
+            self.probe_func = partial(tcp_connect_probe, on_open=self.services.grab)
+        elif syn:
+            try:
+                self.syn = SynProber()
+                self.probe_func = self.syn.probe
+            except OSError:
+                print("SYN scan needs root / CAP_NET_RAW - connect scan instead")
+        # everything resume() needs to build the same scan again
+        self.options = {"timeout": timeout, "concurrency": concurrency, "per_host": per_host, "adaptive": adaptive,
+                        "min_timeout": min_timeout, "max_timeout": max_timeout, "retries": retries, "syn": syn,
+                        "services": services, "banner_timeout": banner_timeout}
+        self.watermark = Watermark()
+        self.restored = []  # results of the run before a resume
+        self.checkpoint = None
+        if checkpoint:
+            self.checkpoint = Checkpointer(checkpoint, self.checkpoint_state, checkpoint_interval)
+
+    # continue a stopped scan from its checkpoint file (TCP or UDP, as it was started)
+    @classmethod
+    def resume(cls, path, progress=None, metrics=None, checkpoint_interval=CHECKPOINT_INTERVAL):
+        state = load_checkpoint(path)
+        seed = state["seed"]
+        targets = TargetSpec(state["hosts"], state["ports"], shuffle=seed is not None, seed=seed)
+        scan_class = SCAN_KINDS[state["kind"]]
+        scan = scan_class(targets.sliced(range(*state["span"])), progress=progress, metrics=metrics,
+                          checkpoint=path, checkpoint_interval=checkpoint_interval, **state["options"])
+        scan.restore(state["results"])
+        return scan
+
+    # open ports of the run before a resume: yielded first, and not probed again - the ones that
+    # finished after the saved position (while a target before it was still in flight) are in the span too
+    def restore(self, results):
+        for host, port in results:
+            self.states.record(host, port, OPEN)
+            self.restored.append((host, port))
+
+    # position (not finished targets) and results so far, for the checkpoint file
+    def checkpoint_state(self):
+        span = self.targets.span[self.watermark.position:]
+        return {
+            "kind": self.kind,
+            "hosts": self.targets.hosts.parts,
+            "ports": format_ports(self.targets.ports),
+            "seed": self.targets.seed,
+            "span": [span.start, span.stop, span.step],
+            "options": self.options,
+            "results": [list(target) for target in self.states.iter_open()],
+        }
+
+    # outcome of every probe -> states
+    def record(self, host, port, outcome):
+        self.states.record(host, port, outcome)
+
+    # every finished target (after its retries)
+    def finish(self, host, port, outcome):
+        self.record(host, port, outcome)
+        self.watermark.done((host, port))
+        if self.checkpoint is not None:
+            self.checkpoint.tick()
+
+    # targets in the order of the target space, the watermark knows which ones are in flight
+    def issue_targets(self):
+        for target in self.targets:
+            self.watermark.issue(target)
+            if self.restored and self.states.get(*target) == PORT_OPEN:
+                self.watermark.done(target)  # restored, nothing else records a port before it is issued
+                continue
+            yield target
+
+    # async generator: yields open (host, port) as soon as they answer (library use inside an event loop)
+    # after a resume the results of the run before come first
+    async def aiter_results(self):
+        for target in self.restored:
+            yield target
+        results = self.connect()
+        complete = False
+        try:
+            async for target in results:
+                yield target
+            complete = not self.stop_event.is_set()
+        finally:
+            await results.aclose()
+            if self.syn is not None:
+                self.syn.close()
+            if self.checkpoint is not None:
+                if complete:
+                    self.checkpoint.remove()
+                else:
+                    self.checkpoint.save()
+
+    def connect(self):
+        return iter_connect_targets(
+            self.issue_targets(),
+            self.targets.count,
+            timeout=self.timeout,
+            concurrency=self.concurrency,
+            stop_event=self.stop_event,
+            progress=self.progress,
+            metrics=self.metrics,
+            rtt=self.rtt,
+            retries=self.retries,
+            per_host=self.per_host,
+            record=self.finish,
+            probe_func=self.probe_func,
+            pacing=self.pacing,
+        )
+
+    # generator: same as aiter_results, for normal code (runs its own event loop)
+    def iter_results(self):
+        try:
+            with self.metrics.phase("connect"):
+                yield from iterate_async(self.aiter_results())
+        except Exception as e:
+            print(f"Open ports scan error: {e}")
+
+    # all results, sorted
+    def run(self):
+        return sorted(self.iter_results())
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# Scan for open TCP ports on one host, results are only the port numbers
+class OpenPortsScan(TargetScan):
+
+    def __init__(self, host="127.0.0.1", start=1, end=1024, timeout=0.5, concurrency=1000, progress=None,
+                 metrics=None, adaptive=True, rtt=None, min_timeout=MIN_TIMEOUT, max_timeout=2.0, retries=1,
+                 services=False, banner_timeout=BANNER_TIMEOUT):
+        super().__init__(TargetSpec([host], range(start, end + 1)), timeout=timeout, concurrency=concurrency,
+                         per_host=None, progress=progress, metrics=metrics or ScanMetrics("open-ports"),
+                         adaptive=adaptive, rtt=rtt, min_timeout=min_timeout, max_timeout=max_timeout,
+                         retries=retries, services=services, banner_timeout=banner_timeout)
+        self.host = host
+        self.start_port = start
+        self.end_port = end
+
+    # async generator: yields open ports as soon as they answer
+    async def aiter_results(self):
+        async for _, port in super().aiter_results():
+            yield port
+
+
+# Scan for open UDP ports on several hosts and ports, same interface as TargetScan
+# results are the ports that answered, ports without any answer are open|filtered (states: PORT_FILTERED)
+# rate = datagrams/s overall, host_rate = start value per host, lowered when the host limits its ICMP answers
+class UdpScan(TargetScan):
+
+    kind = "udp"
+
+    def __init__(self, hosts, ports="udptop20", timeout=1.0, concurrency=200, per_host=None, rate=1000,
+                 host_rate=100, progress=None, metrics=None, adaptive=True, rtt=None, min_timeout=MIN_TIMEOUT,
+                 max_timeout=3.0, retries=2, shuffle=False, seed=None, checkpoint=None,
+                 checkpoint_interval=CHECKPOINT_INTERVAL):
+        super().__init__(hosts, ports, timeout=timeout, concurrency=concurrency, per_host=per_host,
+                         progress=progress, metrics=metrics or ScanMetrics("udp"), adaptive=adaptive, rtt=rtt,
+                         min_timeout=min_timeout, max_timeout=max_timeout, retries=retries, shuffle=shuffle,
+                         seed=seed, checkpoint=checkpoint, checkpoint_interval=checkpoint_interval)
+        self.probe_func = udp_probe
+        self.pacing = UdpPacing(rate, host_rate)
+        self.options = {"timeout": timeout, "concurrency": concurrency, "per_host": per_host, "rate": rate,
+                        "host_rate": host_rate, "adaptive": adaptive, "min_timeout": min_timeout,
+                        "max_timeout": max_timeout, "retries": retries}
+
+    def record(self, host, port, outcome):
+        self.states.record(host, port, FILTERED if outcome == TIMEOUT else outcome)
+
+    # [(host, port), ...] without any answer
+    def silent_ports(self):
+        return sorted((host, port) for host, port in self.targets
+                      if self.states.get(host, port) == PORT_FILTERED)
+
+
+# kind in a checkpoint file -> scan class for resume()
+SCAN_KINDS = {TargetScan.kind: TargetScan, UdpScan.kind: UdpScan}
+
+
+# Scan for free (bindable) ports on this system
+# method: "table" reads the kernel socket tables in one pass (Linux),
+#         "bind" tries bind() on every port (slow, but works everywhere / to verify),
+#         "auto" uses the table where it exists
+class FreePortsScan:
+
+    def __init__(self, start=1, end=65535, progress=None, protocol="tcp", ipv6=False, method="auto", metrics=None):
+        self.start_port = start
+        self.end_port = end
+        self.progress = progress or _no_progress
+        self.metrics = metrics or ScanMetrics("free-ports")
+        self.protocol = protocol
+        self.ipv6 = ipv6
+        self.method = method
+        self.stop_event = threading.Event()
+
+    def use_table(self):
+        if self.method == "auto":
+            return table_available(self.protocol)
+        return self.method == "table"
+
+    # generator: yields every free port while scanning
+    def iter_results(self):
+        if self.use_table():
+            yield from self.iter_from_table()
+        else:
+            yield from self.iter_with_bind()
+
+    def iter_from_table(self):
+        with self.metrics.phase("read-table"):
+            used = read_used_ports(self.protocol)
+        first = max(self.start_port, unprivileged_port_start())
+
+        for port in range(first, self.end_port + 1):
+            if not port_is_set(used, port):
+                yield port
+
+        self.progress(100)
+
+    def iter_with_bind(self):
+        total_ports = self.end_port - self.start_port + 1
+        family = socket.AF_INET6 if self.ipv6 else socket.AF_INET
+        kind = socket.SOCK_DGRAM if self.protocol == "udp" else socket.SOCK_STREAM
+        last_percent = -1
+
+        for idx, port in enumerate(range(self.start_port, self.end_port + 1), start=1):
+
+            # check for stop is called
+            if self.stop_event.is_set():
+                break
+
+            self.metrics.probe_sent()
+            with socket.socket(family, kind) as s:
+                try:
+                    s.bind(("", port))  # if its possible -> Port is free
+                    free = True
+                except OSError:
+                    free = False  # Port not free
+            self.metrics.probe_done(OPEN if free else CLOSED)
+            if free:
+                yield port
+
+            percent = int((idx / total_ports) * 100)
+            if percent != last_percent:
+                last_percent = percent
+                self.progress(percent)
+
+    def run(self):
+        return list(self.iter_results())
+
+    def stop(self):
+        self.stop_event.set()
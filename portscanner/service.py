@@ -0,0 +1,142 @@
+"""
+Service detection on open TCP ports: banner or small protocol probe on the connection of the scan
+
+    1. servers that talk first (SSH, SMTP, FTP, POP3, IMAP, MySQL, VNC) -> read the banner
+    2. otherwise one probe: TLS ClientHello on TLS ports, HTTP HEAD on all others
+    3. the answer is matched against the signature table
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import re
+import struct
+import asyncio
+
+BANNER_TIMEOUT = 1.0
+
+HTTP_HEAD = b"HEAD / HTTP/1.0\r\nUser-Agent: portscanner\r\n\r\n"
+
+# ports where the client speaks first -> send the probe at once instead of waiting for a banner
+TLS_PORTS = {443, 465, 636, 853, 990, 993, 995, 5986, 8443, 9443}
+HTTP_PORTS = {80, 81, 3000, 5000, 8000, 8008, 8080, 8081, 8888, 9000, 9090}
+
+
+# TLS 1.2 ClientHello with the common cipher suites, enough to get a ServerHello or an alert
+def build_client_hello():
+    ciphers = [0xC02B, 0xC02F, 0xC02C, 0xC030, 0xCCA9, 0xCCA8, 0xC013, 0xC014, 0x009C, 0x009D, 0x002F, 0x0035]
+    extensions = (
+        struct.pack("!HHH", 0x000A, 6, 4) + struct.pack("!HH", 0x001D, 0x0017)             # groups x25519, P-256
+        + struct.pack("!HHB", 0x000B, 2, 1) + b"\x00"                                    # point formats
+        + struct.pack("!HHH", 0x000D, 10, 8) + struct.pack("!HHHH", 0x0403, 0x0804, 0x0401, 0x0201)  # signatures
+    )
+    body = (b"\x03\x03" + os.urandom(32) + b"\x00"
+            + struct.pack("!H", len(ciphers) * 2) + struct.pack(f"!{len(ciphers)}H", *ciphers)
+            + b"\x01\x00" + struct.pack("!H", len(extensions)) + extensions)
+    handshake = b"\x01" + struct.pack("!I", len(body))[1:] + body
+    return b"\x16\x03\x01" + struct.pack("!H", len(handshake)) + handshake
+
+
+CLIENT_HELLO = build_client_hello()
+
+TLS_VERSIONS = {b"\x03\x00": "SSL3.0", b"\x03\x01": "TLS1.0", b"\x03\x02": "TLS1.1", b"\x03\x03": "TLS1.2",
+                b"\x03\x04": "TLS1.3"}
+
+
+# TLS record -> (service, detail) or None
+def match_tls(data):
+    if len(data) >= 11 and data[0] == 0x16 and data[1] == 3 and data[5] == 2:
+        return "tls", TLS_VERSIONS.get(data[9:11], "TLS")  # ServerHello
+    if len(data) >= 7 and data[0] == 0x15 and data[1] == 3:
+        return "tls", "alert"
+    return None
+
+
+# (service, regex, group with the product / version or 0) - the first match wins
+SIGNATURES = [(name, re.compile(pattern, re.DOTALL), group) for name, pattern, group in (
+    ("ssh", rb"^SSH-[\d.]+-([^\r\n]+)", 1),
+    ("ftp", rb"^220[ -]([^\r\n]*FTP[^\r\n]*)", 1),
+    ("smtp", rb"^220[ -]([^\r\n]*(?:SMTP|Postfix|Exim|mail)[^\r\n]*)", 1),
+    ("ftp", rb"^220[ -]([^\r\n]*)", 1),
+    ("pop3", rb"^\+OK ?([^\r\n]*)", 1),
+    ("imap", rb"^\* OK ?([^\r\n]*)", 1),
+    ("http", rb"^HTTP/1\.[01] \d{3}.*?\r\nServer: ([^\r\n]+)", 1),
+    ("http", rb"^HTTP/1\.[01] (\d{3})", 1),
+    ("mysql", rb"^.\x00\x00\x00\x0a([\w.\-]+)\x00", 1),
+    ("vnc", rb"^RFB (\d{3}\.\d{3})", 1),
+    ("redis", rb"^-ERR (?:unknown command|wrong number)", 0),
+    ("telnet", rb"^\xff[\xfb-\xfe]", 0),
+)]
+
+
+def _text(value):
+    return value.decode("latin-1").strip()
+
+
+# answer of the server -> (service, detail); unknown answers give ("unknown", first line)
+def match_service(data):
+    tls = match_tls(data)
+    if tls is not None:
+        return tls
+    for name, pattern, group in SIGNATURES:
+        found = pattern.match(data)
+        if found:
+            return name, _text(found.group(group)) if group else ""
+    first_line = _text(data.split(b"\n", 1)[0][:80])
+    return "unknown", "".join(c if c.isprintable() else "." for c in first_line)
+
+
+async def read_some(sock, timeout, size=2048):
+    loop = asyncio.get_running_loop()
+    receive = asyncio.ensure_future(loop.sock_recv(sock, size))
+    try:
+        return await asyncio.wait_for(receive, timeout)
+    except (asyncio.TimeoutError, OSError):
+        return b""
+    finally:
+        if receive.done() and not receive.cancelled():
+            receive.exception()
+
+
+# Banner / probe on a connected socket -> (service, detail) or None if the server stayed silent
+async def fingerprint(sock, port, timeout=BANNER_TIMEOUT):
+    loop = asyncio.get_running_loop()
+    if port in TLS_PORTS:
+        probe = CLIENT_HELLO
+    else:
+        probe = HTTP_HEAD
+        if port not in HTTP_PORTS:
+            # most other servers greet first
+            data = await read_some(sock, timeout / 2)
+            if data:
+                return match_service(data)
+    try:
+        await loop.sock_sendall(sock, probe)
+    except OSError:
+        return None
+    data = await read_some(sock, timeout)
+    return match_service(data) if data else None
+
+
+# Collects the services of a scan: {(host, port): (service, detail)}
+# its grab() is the on_open callback for tcp_connect_probe
+class ServiceTable:
+
+    def __init__(self, timeout=BANNER_TIMEOUT):
+        self.timeout = timeout
+        self.services = {}
+
+    async def grab(self, sock, host, port):
+        result = await fingerprint(sock, port, self.timeout)
+        if result is not None:
+            self.services[(host, port)] = result
+
+    def get(self, host, port):
+        return self.services.get((host, port))
+
+    # "ssh OpenSSH_9.6" or "" when nothing is known
+    def describe(self, host, port):
+        service = self.get(host, port)
+        if service is None:
+            return ""
+        name, detail = service
+        return f"{name} {detail}".strip()
@@ -0,0 +1,235 @@
+"""
+Sharded scan: the targets are split over several processes, every process runs its own event loop
+
+One Python process saturates one core (packet handling, results, GIL) long before a fast
+network does. Results, progress and metrics of all workers come back over one queue.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .scanners import TargetScan, default_per_host
+from .targets import TargetSpec, format_ports
+from .checkpoint import Checkpointer, load_checkpoint, CHECKPOINT_INTERVAL
+from .metrics import ScanMetrics, OPEN
+from .rtt import MIN_TIMEOUT
+from .ratelimit import shared_limiter
+
+# set in every worker process by _init_worker
+_channel = None
+_stop_event = None
+
+
+# hosts x ports -> `shards` TargetSpecs of about the same size: every shard gets every n-th target
+# (dead parts of a network are spread over all shards), a shard is only a range, not a list of targets
+def shard_targets(targets, shards):
+    shards = max(1, min(shards, targets.count or 1))
+    parts = [targets.shard(i, shards) for i in range(shards)]
+    return [part for part in parts if part.count]
+
+
+# True if every shard scans its own hosts: targets go host by host and the hosts divide evenly
+def hosts_split(targets, shards):
+    return targets.order is None and targets.span.step == 1 and targets.hosts.count % shards == 0
+
+
+# limits: (packets/s, probes in flight) of this worker, its share of the limits of the parent
+def _init_worker(channel, stop_event, limits):
+    global _channel, _stop_event
+    _channel = channel
+    _stop_event = stop_event
+    shared_limiter.configure(*limits)
+
+
+# TargetScan of one shard in the worker: every open port is sent before its target counts as finished,
+# so a position that reaches the parent never covers a result that did not
+class _ShardScan(TargetScan):
+
+    def __init__(self, index, targets, **options):
+        super().__init__(targets, **options)
+        self.index = index
+
+    def finish(self, host, port, outcome):
+        if outcome == OPEN:
+            _channel.put(("result", self.index, (host, port), None, None))
+        super().finish(host, port, outcome)
+
+
+# runs in the worker process: one TargetScan with its own event loop over one shard
+# messages: (kind, shard, value, metrics counters, position = targets of the shard that are finished)
+# restored: results of the run before a resume, their targets are skipped
+def _scan_shard(index, targets, options, restored=()):
+    metrics = ScanMetrics(f"shard-{index}")
+
+    def report(percent):
+        _channel.put(("progress", index, percent, metrics.counters(), scan.watermark.position))
+
+    scan = _ShardScan(index, targets, progress=report, metrics=metrics, **options)
+    scan.stop_event = _stop_event
+    scan.restore(restored)
+    try:
+        for _ in scan.iter_results():
+            pass  # already sent by finish()
+    finally:
+        _channel.put(("done", index, 100, metrics.counters(), scan.watermark.position))
+
+
+# Scan for open TCP ports like TargetScan, but spread over `workers` processes (default: one per core)
+# concurrency and per_host are the totals, every worker gets its share (also of the limits of shared_limiter)
+# checkpoint: like TargetScan, with the position of every shard -> ShardedScan.resume(file)
+class ShardedScan:
+
+    def __init__(self, hosts, ports="top100", workers=None, timeout=0.5, concurrency=1000, per_host="auto",
+                 progress=None, metrics=None, adaptive=True, min_timeout=MIN_TIMEOUT, max_timeout=2.0, retries=1,
+                 shuffle=False, seed=None, syn=False, checkpoint=None, checkpoint_interval=CHECKPOINT_INTERVAL,
+                 shards=None):
+        self.targets = hosts if isinstance(hosts, TargetSpec) else TargetSpec(hosts, ports, shuffle, seed)
+        self.workers = workers or os.cpu_count() or 1
+        # shards: the rest of the shards of a resumed scan
+        self.shards = shards if shards is not None else shard_targets(self.targets, self.workers)
+        self.progress = progress
+        self.metrics = metrics or ScanMetrics("sharded")
+        shards = len(self.shards)
+        # the limit of the whole scan, before it is split (a single host stays without limit)
+        host_limit = default_per_host(self.targets.hosts, concurrency) if per_host == "auto" else per_host
+        self.options = {
+            "timeout": timeout,
+            "concurrency": max(1, concurrency // shards),
+            # split by ports -> every host is scanned by all workers at once
+            "per_host": (host_limit if host_limit is None or hosts_split(self.targets, shards)
+                         else max(1, host_limit // shards)),
+            "adaptive": adaptive,
+            "min_timeout": min_timeout,
+            "max_timeout": max_timeout,
+            "retries": retries,
+            "syn": syn,  # every worker gets its own raw socket and source port
+        }
+        # everything resume() needs to build the same scan again
+        self.settings = {"workers": workers, "timeout": timeout, "concurrency": concurrency, "per_host": per_host,
+                         "adaptive": adaptive, "min_timeout": min_timeout, "max_timeout": max_timeout,
+                         "retries": retries, "syn": syn}
+        self.context = multiprocessing.get_context()
+        self.stop_event = self.context.Event()
+        self.positions = [0] * len(self.shards)  # finished targets of every shard
+        self.found = []  # results so far, also the ones before a resume
+        self.restored = []
+        self.checkpoint = None
+        if checkpoint:
+            self.checkpoint = Checkpointer(checkpoint, self.checkpoint_state, checkpoint_interval)
+
+    # continue a stopped scan from its checkpoint file
+    @classmethod
+    def resume(cls, path, progress=None, metrics=None, checkpoint_interval=CHECKPOINT_INTERVAL):
+        state = load_checkpoint(path)
+        seed = state["seed"]
+        targets = TargetSpec(state["hosts"], state["ports"], shuffle=seed is not None, seed=seed)
+        shards = [targets.sliced(range(*span)) for span in state["shards"]]
+        scan = cls(targets, progress=progress, metrics=metrics, checkpoint=path,
+                   checkpoint_interval=checkpoint_interval, shards=[shard for shard in shards if shard.count],
+                   **state["options"])
+        scan.restored = [tuple(target) for target in state["results"]]
+        scan.found = list(scan.restored)
+        return scan
+
+    # what is left of every shard and the results so far, for the checkpoint file
+    def checkpoint_state(self):
+        spans = [shard.span[position:] for shard, position in zip(self.shards, self.positions)]
+        return {
+            "kind": "sharded",
+            "hosts": self.targets.hosts.parts,
+            "ports": format_ports(self.targets.ports),
+            "seed": self.targets.seed,
+            "shards": [[span.start, span.stop, span.step] for span in spans],
+            "options": self.settings,
+            "results": [list(target) for target in sorted(self.found)],
+        }
+
+    # generator: yields open (host, port) of all workers as soon as they are found
+    # after a resume the results of the run before come first
+    def iter_results(self):
+        yield from self.restored
+        channel = self.context.Queue()
+        sizes = [shard.count for shard in self.shards]
+        total = sum(sizes) or 1
+        percents = [0] * len(self.shards)
+        counters = [None] * len(self.shards)
+        last_percent = -1
+        running = len(self.shards)
+
+        futures = []
+        shards = len(self.shards)
+        rate, in_flight = shared_limiter.limits()
+        limits = (rate and max(1, rate // shards), in_flight and max(1, in_flight // shards))
+        pool = ProcessPoolExecutor(max_workers=shards, mp_context=self.context,
+                                   initializer=_init_worker, initargs=(channel, self.stop_event, limits))
+        try:
+            with self.metrics.phase("connect"):
+                futures += [pool.submit(_scan_shard, i, shard, self.options, self.restored)
+                            for i, shard in enumerate(self.shards)]
+                while running:
+                    try:
+                        kind, index, value, shard_counters, position = channel.get(timeout=0.2)
+                    except queue.Empty:
+                        # a worker that died does not send "done"
+                        for future in futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+                        continue
+
+                    self.absorb(kind, index, value, position)
+                    if kind == "result":
+                        yield value
+                        continue
+                    if kind == "done":
+                        running -= 1
+                    if self.checkpoint is not None:
+                        self.checkpoint.tick()
+
+                    # merge progress and metrics of the shard
+                    self.metrics.merge(shard_counters, counters[index])
+                    counters[index] = shard_counters
+                    percents[index] = value
+                    percent = int(sum(p * size for p, size in zip(percents, sizes)) / total)
+                    if self.progress is not None and percent != last_percent:
+                        last_percent = percent
+                        self.progress(percent)
+        finally:
+            # consumer stopped early -> stop the workers as well
+            if running:
+                self.stop_event.set()
+            # keep reading, a worker blocks on a full channel (results and positions still go to the checkpoint)
+            while True:
+                finished = all(future.done() for future in futures)
+                try:
+                    kind, index, value, _, position = channel.get(timeout=0.1)
+                except queue.Empty:
+                    if finished:
+                        break
+                    continue
+                self.absorb(kind, index, value, position)
+                if kind == "done":
+                    running -= 1
+            pool.shutdown(wait=True, cancel_futures=True)
+            channel.close()
+            if self.checkpoint is not None:
+                if running or self.stop_event.is_set():
+                    self.checkpoint.save()
+                else:
+                    self.checkpoint.remove()
+
+    # result or position of a shard -> state for the checkpoint
+    def absorb(self, kind, index, value, position):
+        if kind == "result":
+            self.found.append(value)
+        else:
+            self.positions[index] = position
+
+    # all results, sorted
+    def run(self):
+        return sorted(self.iter_results())
+
+    def stop(self):
+        self.stop_event.set()
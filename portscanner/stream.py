@@ -0,0 +1,63 @@
+"""
+Helpers for streaming results while a scan is still running
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import time
+import asyncio
+
+
+# Collects single results and hands them over as one list every `interval` seconds
+# (or when `max_size` is reached), so the GUI does not get one signal per hit
+class ResultBatcher:
+
+    def __init__(self, emit, interval=0.1, max_size=1000):
+        self.emit = emit
+        self.interval = interval
+        self.max_size = max_size
+        self.batch = []
+        self.last_flush = time.monotonic()
+
+    def add(self, item):
+        self.batch.append(item)
+        if len(self.batch) >= self.max_size:
+            self.flush()
+        else:
+            self.tick()
+
+    # flush if the interval is over, can also be called without new results
+    def tick(self):
+        if self.batch and time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if self.batch:
+            batch, self.batch = self.batch, []
+            self.emit(batch)
+
+
+# drive an async generator from normal (blocking) code with an own event loop
+def iterate_async(agen):
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            step = asyncio.ensure_future(agen.__anext__(), loop=loop)
+            try:
+                item = loop.run_until_complete(step)
+            except StopAsyncIteration:
+                break
+            except BaseException:
+                # interrupted (Ctrl+C) while the step was waiting: cancel it, so the generators clean up
+                step.cancel()
+                loop.run_until_complete(asyncio.gather(step, return_exceptions=True))
+                raise
+            yield item
+    finally:
+        loop.run_until_complete(agen.aclose())
+        # inner generators of a wrapping agen are closed in tasks of their own, let them finish
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        pending = asyncio.all_tasks(loop)
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
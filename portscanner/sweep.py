@@ -0,0 +1,167 @@
+"""
+Sweep driver for host discovery over one non-blocking socket (ICMP echo, ARP)
+
+Sends to the addresses at `rate` packets/s while it reads the replies and repeats the silent
+addresses for `retries` more rounds. Only the probes of the last timeout are kept (rate x timeout
+entries); a retry round walks the addresses again and skips the ones in `answered` - an AddressBitmap
+of the network costs 1 bit per address. What is sent and how a reply looks is up to the caller:
+
+    send(ip)   sends one probe, returns a tag the reply has to match (e.g. the ICMP sequence number)
+    replies()  reads what is waiting on the socket -> (ip, tag, result) for every reply of a probe
+
+iter_window runs blocking jobs (ping processes) on a thread pool without reading all addresses first.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import time
+import select
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from .metrics import OPEN, TIMEOUT, ERROR
+from .ratelimit import RESOURCE_ERRNOS, shared_limiter
+
+WINDOW = 4  # queued jobs per worker of a thread pool sweep
+
+
+# number of items for the progress, 0 = unknown: .count of HostRange / HostOrder / TargetSpec
+# (len() only works up to sys.maxsize, an IPv6 /64 has more addresses), else len() of a sequence
+def total_of(items):
+    count = getattr(items, "count", None)
+    if isinstance(count, int):
+        return count
+    return len(items) if hasattr(items, "__len__") else 0
+
+
+# generator: yields `result` of every answering address as soon as its reply arrives
+# A probe without reply counts as timeout after `timeout`, or the measured network timeout once an
+# RttTable (rtt) has samples. `rate` is the limit of this sweep, the limiter (default: shared_limiter)
+# the one of all scans together. answered: set-like (add, in) for the answering addresses, default a set
+def iter_sweep(addresses, sock, send, replies, timeout=1.0, rate=1000, stop_event=None, progress=None,
+               metrics=None, rtt=None, retries=0, limiter=None, answered=None):
+    limiter = limiter or shared_limiter
+    if not hasattr(addresses, "__len__"):
+        addresses = list(addresses)  # a sequence can be walked again for the retries
+    answered = answered if answered is not None else set()
+    total = total_of(addresses) or 1
+    pending = {}  # ip -> (tag, send time) still waiting for an answer, oldest first
+    interval = 1.0 / rate if rate else 0.0
+    last_percent = -1
+
+    def wait_for_reply(attempt):
+        if rtt is not None and rtt.network.samples:
+            return rtt.network.retry_timeout(attempt)
+        return timeout
+
+    # probes sent before `before` ran into the timeout -> number of them
+    def expire(before, attempt):
+        expired = 0
+        while pending:
+            ip, (_, sent_at) = next(iter(pending.items()))
+            if sent_at > before:
+                break
+            del pending[ip]
+            expired += 1
+            limiter.done(TIMEOUT, attempt)
+            if metrics is not None:
+                metrics.probe_done(TIMEOUT)
+        return expired
+
+    try:
+        for attempt in range(retries + 1):
+            next_send = time.monotonic()
+            wait = wait_for_reply(attempt)
+            silent = 0
+            idx = 0
+            queue = iter(addresses)
+            upcoming = next(queue, None)
+
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                now = time.monotonic()
+
+                # send everything that is due according to the rate
+                while upcoming is not None and now >= next_send:
+                    ip = str(upcoming)
+                    if ip in answered:
+                        upcoming = next(queue, None)  # answered in an earlier round
+                        continue
+                    delay = limiter.try_acquire(hold=False)
+                    if delay:
+                        next_send = now + delay  # the rate of all scans is used up
+                        break
+                    if metrics is not None:
+                        metrics.probe_sent()
+                    try:
+                        tag = send(ip)
+                        pending.pop(ip, None)
+                        pending[ip] = (tag, time.monotonic())
+                    except OSError as e:
+                        # e.g. broadcast / network address, or the send buffer is full
+                        if e.errno in RESOURCE_ERRNOS:
+                            limiter.congested(e.errno)
+                        if metrics is not None:
+                            metrics.probe_done(ERROR)
+                    idx += 1
+                    next_send += interval
+                    upcoming = next(queue, None)
+
+                silent += expire(now - wait, attempt)
+                # nothing left to send or to wait for
+                if upcoming is None and not pending:
+                    break
+
+                until = pending[next(iter(pending))][1] + wait if pending else next_send
+                if upcoming is not None:
+                    until = min(until, next_send)
+                readable, _, _ = select.select([sock], [], [], max(0.0, min(until - now, 0.05)))
+                if readable:
+                    for ip, tag, result in replies():
+                        waiting = pending.get(ip)
+                        if waiting is None or waiting[0] != tag:
+                            continue  # a host we did not ask (any more), or an older probe
+                        del pending[ip]
+                        answered.add(ip)
+                        limiter.done(OPEN, attempt)  # an answer to a retry counts as loss
+                        sample = time.monotonic() - waiting[1]
+                        if metrics is not None:
+                            metrics.probe_done(OPEN, sample)
+                        if rtt is not None:
+                            rtt.update(ip, sample)
+                        yield result
+
+                if attempt == 0:
+                    percent = int(idx / total * 100)
+                    if progress is not None and percent != last_percent:
+                        last_percent = percent
+                        progress(percent)
+
+            # next round only for the silent ones
+            if not silent:
+                break
+    finally:
+        # everything without reply ran into the timeout
+        if metrics is not None:
+            for _ in pending:
+                metrics.probe_done(TIMEOUT)
+
+
+# function(item) for every item on a thread pool, reads `items` only as far as needed for `window`
+# queued calls -> yields (item, result) in the order they finish
+def iter_window(pool, function, items, window):
+    futures = {}
+    items = iter(items)
+    try:
+        while True:
+            for item in items:
+                futures[pool.submit(function, item)] = item
+                if len(futures) >= window:
+                    break
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures.pop(future), future.result()
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,191 @@
+"""
+Half-open SYN scan: SYN packets from one raw socket, no connection and no socket per port
+
+    SYN-ACK -> open    (the kernel answers it with RST, the handshake is never finished)
+    RST     -> closed
+    nothing -> timeout (filtered, the caller decides whether to ask again)
+
+The sequence number of every SYN is a keyed hash of (address, port, source port), a reply is only
+taken when its ack is that cookie + 1 - nothing is stored per probe but the future that waits for it.
+Needs root / CAP_NET_RAW and IPv4, everything else goes through the connect scan.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+import time
+import errno
+import socket
+import struct
+import asyncio
+import hashlib
+from functools import lru_cache
+
+from .icmp import icmp_checksum
+from .metrics import OPEN, CLOSED, FILTERED, TIMEOUT, ERROR
+from .ratelimit import RESOURCE_ERRNOS
+from .tcp import FILTERED_ERRNOS, tcp_connect_probe
+
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+# MSS option like a normal client, some stacks drop SYNs without any option
+TCP_MSS_OPTION = struct.pack("!BBH", 2, 4, 1460)
+
+RECEIVE_BUFFER = 4 * 1024 * 1024
+
+
+# own address on the route to `host` (no packet is sent), needed for the TCP checksum
+@lru_cache(maxsize=4096)
+def source_address(host):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect((host, 9))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
+# address literal as it is, names through the resolver of the loop (no blocking lookup on the loop)
+async def resolve_ipv4(loop, host, port):
+    try:
+        socket.inet_aton(host)
+        return host
+    except OSError:
+        infos = await loop.getaddrinfo(host, port, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        return infos[0][4][0]
+
+
+# TCP header of a SYN with a correct checksum over the IPv4 pseudo header
+def build_syn(src_ip, dst_ip, src_port, dst_port, seq, window=1024):
+    offset = (20 + len(TCP_MSS_OPTION)) // 4 << 4
+    header = struct.pack("!HHIIBBHHH", src_port, dst_port, seq, 0, offset, TCP_SYN, window, 0, 0)
+    segment = header + TCP_MSS_OPTION
+    pseudo = socket.inet_aton(src_ip) + socket.inet_aton(dst_ip) + struct.pack("!BBH", 0, socket.IPPROTO_TCP,
+                                                                                len(segment))
+    checksum = icmp_checksum(pseudo + segment)
+    return segment[:16] + struct.pack("!H", checksum) + segment[18:]
+
+
+# IPv4 packet from the raw socket -> (src ip, src port, dst port, ack, flags) or None
+def parse_tcp_reply(packet):
+    if len(packet) < 20 or packet[0] >> 4 != 4 or packet[9] != socket.IPPROTO_TCP:
+        return None
+    header_length = (packet[0] & 0x0F) * 4
+    segment = packet[header_length:]
+    if len(segment) < 14:
+        return None
+    src_port, dst_port, _, ack, _, flags = struct.unpack("!HHIIBB", segment[:14])
+    return socket.inet_ntoa(packet[12:16]), src_port, dst_port, ack, flags
+
+
+# raw TCP socket that may send and read replies, raises PermissionError without root / CAP_NET_RAW
+def open_syn_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+    sock.setblocking(False)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+    except OSError:
+        pass
+    return sock
+
+
+def syn_available():
+    try:
+        open_syn_socket().close()
+        return True
+    except OSError:
+        return False
+
+
+# SYN prober for iter_connect_targets (probe_func): one raw socket for all probes of a scan,
+# replies are read on the event loop of the first probe
+# the source port stays bound by an idle TCP socket, so no connection of this machine gets it and
+# the kernel resets every SYN-ACK that arrives there
+class SynProber:
+
+    def __init__(self):
+        self.sock = open_syn_socket()
+        self.placeholder = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.placeholder.bind(("", 0))
+        self.source_port = self.placeholder.getsockname()[1]
+        self.secret = os.urandom(16)
+        self.pending = {}  # (ip, port) -> (future, send time)
+        self.loop = None
+
+    def cookie(self, ip, port):
+        digest = hashlib.blake2s(f"{ip}|{port}|{self.source_port}".encode(), key=self.secret,
+                                 digest_size=4).digest()
+        return int.from_bytes(digest, "big")
+
+    def attach(self, loop):
+        if self.loop is loop:
+            return
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.remove_reader(self.sock.fileno())
+        self.loop = loop
+        loop.add_reader(self.sock.fileno(), self.read_replies)
+
+    def read_replies(self):
+        while True:
+            try:
+                packet = self.sock.recv(128)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            reply = parse_tcp_reply(packet)
+            if reply is None:
+                continue
+            ip, port, dst_port, ack, flags = reply
+            if dst_port != self.source_port:
+                continue  # other traffic of this machine
+            waiting = self.pending.get((ip, port))
+            if waiting is None or ack != (self.cookie(ip, port) + 1) & 0xFFFFFFFF:
+                continue  # late answer after the timeout, or not ours
+            future, sent_at = waiting
+            if future.done():
+                continue
+            if flags & TCP_RST:
+                future.set_result((CLOSED, time.monotonic() - sent_at))
+            elif flags & TCP_SYN and flags & TCP_ACK:
+                future.set_result((OPEN, time.monotonic() - sent_at))
+
+    # same interface as tcp_connect_probe -> (outcome, rtt in seconds or None)
+    async def probe(self, host, port, timeout, family=socket.AF_INET):
+        if family != socket.AF_INET:
+            return await tcp_connect_probe(host, port, timeout, family)
+        loop = asyncio.get_running_loop()
+        self.attach(loop)
+        try:
+            ip = await resolve_ipv4(loop, host, port)
+            src_ip = source_address(ip)
+        except OSError as e:
+            return (FILTERED if e.errno in FILTERED_ERRNOS else ERROR), None
+
+        key = (ip, port)
+        future = loop.create_future()
+        self.pending[key] = (future, time.monotonic())
+        try:
+            try:
+                self.sock.sendto(build_syn(src_ip, ip, self.source_port, port, self.cookie(ip, port)), (ip, 0))
+            except BlockingIOError:
+                raise OSError(errno.ENOBUFS, "raw socket send buffer full")
+            except OSError as e:
+                if e.errno in RESOURCE_ERRNOS:
+                    raise
+                return (FILTERED if e.errno in FILTERED_ERRNOS else ERROR), None
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return TIMEOUT, None
+        finally:
+            if self.pending.get(key, (None,))[0] is future:
+                del self.pending[key]
+
+    def close(self):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.remove_reader(self.sock.fileno())
+        self.loop = None
+        self.sock.close()
+        self.placeholder.close()
@@ -0,0 +1,317 @@
+"""
+Target specification: several hosts / networks and several ports / ranges
+
+    hosts: "192.168.1.0/24,10.0.0.5,printer.local" (IPv6 prefixes as well)
+    ports: "22,80,8000-8100" or "top100" (most common TCP ports, like nmap), "udptop20" for UDP
+
+Nothing is materialized: networks stay (first address, count), target n of hosts x ports is
+computed when it is needed, so a /8 or an IPv6 prefix costs as much memory as a single host.
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import copy
+import socket
+import random
+import bisect
+import ipaddress
+
+# most common TCP ports, most frequent first (nmap top 100)
+TOP_PORTS = (
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995, 993, 5900,
+    1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000, 514, 5060, 179, 1026, 2000, 8443, 8000,
+    32768, 554, 26, 1433, 49152, 2001, 515, 8008, 49154, 1027, 5666, 646, 5000, 5631, 631, 49153, 8081,
+    2049, 88, 79, 5800, 106, 2121, 1110, 49155, 6000, 513, 990, 5357, 427, 49156, 543, 544, 5101, 144,
+    7, 389, 8009, 3128, 444, 9999, 5009, 7070, 5190, 3000, 5432, 1900, 3986, 13, 1029, 9, 5051, 6646,
+    49157, 1028, 873, 1755, 2717, 4899, 9100, 119, 37,
+)
+
+# most common UDP ports, most frequent first (nmap top 20)
+TOP_UDP_PORTS = (631, 161, 137, 123, 138, 1434, 445, 135, 67, 53, 139, 500, 68, 520, 1900, 4500, 514, 49152, 162, 69)
+
+
+# "22,80,1000-2000,top20,udptop5" -> sorted list without duplicates
+def parse_ports(spec):
+    ports = set()
+    for part in str(spec).replace(" ", "").split(","):
+        if not part:
+            continue
+        prefix, top = None, None
+        if part.lower().startswith("udptop"):
+            prefix, top = "udptop", TOP_UDP_PORTS
+        elif part.lower().startswith("top"):
+            prefix, top = "top", TOP_PORTS
+        if top is not None:
+            count = int(part[len(prefix):].lstrip(":") or len(top))
+            if not 1 <= count <= len(top):
+                raise ValueError(f"{prefix} ports: 1..{len(top)}, not {count}")
+            ports.update(top[:count])
+            continue
+        if "-" in part:
+            start, end = (int(p) for p in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if not 1 <= start <= end <= 65535:
+            raise ValueError(f"invalid port range: {part}")
+        ports.update(range(start, end + 1))
+    if not ports:
+        raise ValueError("no ports given")
+    return sorted(ports)
+
+
+# [22, 80, 1000, 1001, 1002] -> "22,80,1000-1002" (parse_ports gives the list back)
+def format_ports(ports):
+    parts = []
+    ports = sorted(set(ports))
+    start = previous = None
+    for port in ports + [None]:
+        if start is not None and port == previous + 1:
+            previous = port
+            continue
+        if start is not None:
+            parts.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = port
+    return ",".join(parts)
+
+
+# "192.168.1.0/24,10.0.0.5,myhost" -> list of addresses / names (networks without network and broadcast address)
+def parse_hosts(spec):
+    hosts = []
+    seen = set()
+    for part in str(spec).replace(" ", "").split(","):
+        if not part:
+            continue
+        try:
+            network = ipaddress.ip_network(part, strict=False)
+        except ValueError:
+            addresses = [part]  # hostname, resolved when connecting
+        else:
+            if network.num_addresses == 1:
+                addresses = [str(network.network_address)]
+            else:
+                addresses = [str(ip) for ip in network.hosts()]
+        for address in addresses:
+            if address not in seen:
+                seen.add(address)
+                hosts.append(address)
+    if not hosts:
+        raise ValueError("no hosts given")
+    return hosts
+
+
+# "192.168.1.0/24" -> (version, first host, number of hosts), like network.hosts() but without building them
+# None for hostnames
+def host_span(part):
+    try:
+        network = ipaddress.ip_network(part, strict=False)
+    except ValueError:
+        return None
+    first, count = int(network.network_address), network.num_addresses
+    if network.version == 4 and network.prefixlen < 31:
+        return 4, first + 1, count - 2  # without network and broadcast address
+    if network.version == 6 and network.prefixlen < 127:
+        return 6, first + 1, count - 1  # without the subnet-router anycast address
+    return network.version, first, count
+
+
+# Hosts of a spec as lazy sequence: len(), hosts[n], `in` and iteration without an address list
+# overlapping networks / addresses are merged, addresses come sorted (IPv4 first), hostnames at the end
+# every=True: all addresses of the networks (with network and broadcast address, for host discovery)
+class HostRange:
+
+    def __init__(self, spec, every=False):
+        parts = str(spec).replace(" ", "").split(",") if isinstance(spec, str) else [str(p) for p in spec]
+        self.parts = [part for part in parts if part]  # as given, e.g. for a checkpoint
+        spans = []
+        self.names = []
+        for part in self.parts:
+            span = host_span(part)
+            if span is not None and every:
+                network = ipaddress.ip_network(part, strict=False)
+                span = network.version, int(network.network_address), network.num_addresses
+            if span is None:
+                if part not in self.names:
+                    self.names.append(part)  # hostname, resolved when connecting
+            elif span[2]:
+                spans.append(span)
+
+        # merge overlapping / adjacent spans -> every address only once
+        self.spans = []
+        for version, first, count in sorted(spans):
+            if self.spans and self.spans[-1][0] == version and first <= self.spans[-1][1] + self.spans[-1][2]:
+                last_version, last_first, last_count = self.spans[-1]
+                end = max(last_first + last_count, first + count)
+                self.spans[-1] = (version, last_first, end - last_first)
+            else:
+                self.spans.append((version, first, count))
+
+        # index of the first host of every span, for bisect
+        self.offsets = []
+        total = 0
+        for _, _, count in self.spans:
+            self.offsets.append(total)
+            total += count
+        self.addresses = total
+        # len() only works up to sys.maxsize, an IPv6 /64 has more hosts
+        self.count = total + len(self.names)
+        if not self.count:
+            raise ValueError("no hosts given")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("host index out of range")
+        if index >= self.addresses:
+            return self.names[index - self.addresses]
+        span = bisect.bisect_right(self.offsets, index) - 1
+        version, first, _ = self.spans[span]
+        make = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+        return str(make(first + index - self.offsets[span]))
+
+    def __iter__(self):
+        for version, first, count in self.spans:
+            make = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+            for value in range(first, first + count):
+                yield str(make(value))
+        yield from self.names
+
+    def __contains__(self, host):
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return host in self.names
+        value = int(address)
+        for version, first, count in self.spans:
+            if version == address.version and first <= value < first + count:
+                return True
+        return False
+
+
+# Hosts in scan order without a list of them: `first` (e.g. the hosts seen last time) before the rest,
+# the rest in order or shuffled
+class HostOrder:
+
+    def __init__(self, hosts, first=(), shuffle=False, seed=None):
+        self.hosts = hosts
+        self.first = [host for host in dict.fromkeys(str(h) for h in first) if host in hosts]
+        self.order = Permutation(hosts.count, seed) if shuffle else None
+        self.count = hosts.count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        yield from self.first
+        skip = set(self.first)
+        for index in range(self.count):
+            host = self.hosts[self.order[index]] if self.order is not None else self.hosts[index]
+            if host not in skip:
+                yield host
+
+
+# Full-cycle pseudo-random permutation of 0..size-1 with random access and O(1) memory (like zmap / masscan)
+# a few keyed LCG steps with xorshift run through all 2**bits values once, values >= size are
+# walked further along their cycle until they fit (less than 2 steps on average)
+class Permutation:
+
+    ROUNDS = 3
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.bits = max(2, (size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.shift = (self.bits + 1) // 2
+        rng = random.Random(self.seed)
+        # multiplier % 4 == 1 and odd increment -> every step is a bijection of 0..2**bits-1
+        self.keys = [(rng.getrandbits(self.bits) << 2 | 1, rng.getrandbits(self.bits) | 1)
+                     for _ in range(self.ROUNDS)]
+
+    def step(self, value):
+        for multiplier, increment in self.keys:
+            value = (value * multiplier + increment) & self.mask
+            value ^= value >> self.shift  # high bits into the low ones, LCG low bits have short cycles
+        return value
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError("permutation index out of range")
+        value = self.step(index)
+        while value >= self.size:
+            value = self.step(value)
+        return value
+
+
+# hosts x ports, walked so that consecutive probes go to different hosts
+# target n = (hosts[n % len(hosts)], ports[n // len(hosts)]), in this order or shuffled by a Permutation
+# span: the target numbers of this spec - shards and resumed scans are slices of range(len(hosts) * len(ports))
+class TargetSpec:
+
+    def __init__(self, hosts, ports, shuffle=False, seed=None):
+        self.hosts = hosts if isinstance(hosts, HostRange) else HostRange(hosts)
+        self.ports = parse_ports(ports) if isinstance(ports, str) else sorted(set(ports))
+        size = self.hosts.count * len(self.ports)
+        self.order = Permutation(size, seed) if shuffle else None
+        self.span = range(size)
+
+    @property
+    def seed(self):
+        return self.order.seed if self.order is not None else None
+
+    # number of targets, also above sys.maxsize (len() raises OverflowError there)
+    @property
+    def count(self):
+        return max(0, (self.span.stop - self.span.start + self.span.step - 1) // self.span.step)
+
+    def __len__(self):
+        return self.count
+
+    # port by port, host by host: every host gets one probe per round
+    # shuffled: spread over all hosts, subnets and ports
+    def __iter__(self):
+        for _, target in self.iter_positions():
+            yield target
+
+    # (position in span, (host, port)) - the position is where a scan continues (see skip)
+    def iter_positions(self):
+        for position, number in enumerate(self.span):
+            yield position, self.target(number)
+
+    def target(self, number):
+        if self.order is not None:
+            number = self.order[number]
+        port, host = divmod(number, self.hosts.count)
+        return self.hosts[host], self.ports[port]
+
+    def sliced(self, span):
+        part = copy.copy(self)
+        part.span = span
+        return part
+
+    # every `count`-th target from `index` on, shards together have every target once
+    def shard(self, index, count):
+        return self.sliced(self.span[index::count])
+
+    # without the first `count` targets (resume)
+    def skip(self, count):
+        return self.sliced(self.span[count:])
+
+
+# own IPv4 address (no data is sent, the route decides the interface)
+def local_ipv4():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+    finally:
+        s.close()
+
+
+# network of the own address, e.g. "192.168.178.0/24"
+def local_network(prefix=24):
+    return str(ipaddress.ip_network(f"{local_ipv4()}/{prefix}", strict=False))
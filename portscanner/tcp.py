@@ -0,0 +1,249 @@
+"""
+TCP connect scan engine (asyncio, bounded number of connects in flight)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import time
+import errno
+import socket
+import asyncio
+
+from .metrics import OPEN, CLOSED, FILTERED, TIMEOUT, ERROR
+from .ratelimit import FD_RESERVE, RESOURCE_ERRNOS, shared_limiter
+
+
+# limit the number of parallel connects to what the process may open
+def clamp_concurrency(concurrency):
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError, OSError):
+        return max(1, concurrency)  # Windows has no RLIMIT_NOFILE
+    if soft == resource.RLIM_INFINITY:
+        return max(1, concurrency)
+    return max(1, min(concurrency, soft - FD_RESERVE))
+
+
+# how often a running scan looks at its stop event while probes are in flight
+STOP_POLL = 0.05
+
+
+# a probe that fails this often because this machine is out of sockets / buffers counts as ERROR
+RESOURCE_RETRIES = 10
+
+
+# errors that mean "no route / blocked on the way", not "nobody listens"
+FILTERED_ERRNOS = {errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EACCES, errno.EPERM}
+
+
+# one non-blocking TCP connect -> (outcome, rtt in seconds or None)
+# on_open(sock, host, port) can still use the connection before it is closed (e.g. ServiceTable.grab)
+# raises OSError when this machine runs out of sockets / buffers (RESOURCE_ERRNOS), that is no answer of the target
+async def tcp_connect_probe(host, port, timeout, family=socket.AF_INET, on_open=None):
+    loop = asyncio.get_running_loop()
+    s = socket.socket(family, socket.SOCK_STREAM)
+    s.setblocking(False)
+    start = time.monotonic()
+    connect = asyncio.ensure_future(loop.sock_connect(s, (host, port)))
+    try:
+        await asyncio.wait_for(connect, timeout)
+        sample = time.monotonic() - start
+        # TCP simultaneous open: a connect to a free ephemeral port of this machine can get that
+        # same port as source and "connects" to itself - nobody listens there
+        if s.getsockname() == s.getpeername():
+            return CLOSED, sample
+        if on_open is not None:
+            await on_open(s, host, port)
+        return OPEN, sample
+    except asyncio.TimeoutError:
+        return TIMEOUT, None
+    except ConnectionRefusedError:
+        return CLOSED, time.monotonic() - start  # RST is an answer as well
+    except OSError as e:
+        if e.errno in RESOURCE_ERRNOS:
+            raise
+        return (FILTERED if e.errno in FILTERED_ERRNOS else ERROR), None
+    finally:
+        # cancelled right when the answer came -> fetch the error, else asyncio logs it
+        if connect.done() and not connect.cancelled():
+            connect.exception()
+        s.close()
+
+
+# True if the port accepted the connection
+async def probe_tcp_port(host, port, timeout, family=socket.AF_INET):
+    outcome, _ = await tcp_connect_probe(host, port, timeout, family)
+    return outcome == OPEN
+
+
+# Connect-scan over (host, port) pairs with a fixed pool of workers, so at most `concurrency`
+# connects are in flight, and at most `per_host` of them to the same host
+# async generator: yields every open (host, port) as soon as the connect succeeds
+# with an RttTable (rtt) every probe gets the measured timeout of the host instead of the fixed `timeout`,
+# and timed-out probes to hosts that answered before are repeated up to `retries` times
+# targets should already be interleaved over the hosts (see TargetSpec), total is used for the progress
+# targets can also be an async iterator that is still growing (pipeline), then total=0 -> no progress
+# record(host, port, outcome) is called for every finished probe (e.g. PortStateTable.record)
+# probe_func / pacing: other probes than a TCP connect (UDP: udp_probe with UdpPacing)
+# every probe also waits for the limiter (default: shared_limiter, the packet rate of all scans together)
+async def iter_connect_targets(targets, total=None, timeout=0.5, concurrency=1000, stop_event=None, progress=None,
+                               metrics=None, rtt=None, retries=0, per_host=None, record=None,
+                               probe_func=tcp_connect_probe, pacing=None, limiter=None):
+    limiter = limiter or shared_limiter
+    target_aiter = None
+    if hasattr(targets, "__aiter__"):
+        target_aiter = targets.__aiter__()
+        pull_lock = asyncio.Lock()
+
+        # one worker at a time may advance the async iterator
+        async def next_target():
+            async with pull_lock:
+                try:
+                    return await target_aiter.__anext__()
+                except StopAsyncIteration:
+                    return None
+    else:
+        if total is None:
+            targets = list(targets)
+            total = len(targets)
+        target_iter = iter(targets)
+
+        async def next_target():
+            return next(target_iter, None)
+
+    found = asyncio.Queue()
+    host_slots = {}  # host -> [semaphore for per_host, probes using it]
+    done = 0
+    last_percent = -1
+
+    async def probe_with_retries(host, port):
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        attempt = 0
+        local_errors = 0
+        while True:
+            if rtt is None:
+                probe_timeout = timeout
+            else:
+                probe_timeout = rtt.retry_timeout(host, attempt)
+            if pacing is not None:
+                await pacing.wait(host)
+            await limiter.acquire()
+            if metrics is not None:
+                metrics.probe_sent()
+            try:
+                outcome, sample = await probe_func(host, port, probe_timeout, family)
+            except OSError as e:
+                limiter.release(error=e.errno)
+                if e.errno not in RESOURCE_ERRNOS:
+                    raise
+                # out of sockets / buffers here: the limiter has slowed down, send the same probe again
+                if metrics is not None:
+                    metrics.probe_done(ERROR)
+                local_errors += 1
+                if local_errors > RESOURCE_RETRIES:
+                    return ERROR
+                continue
+            except BaseException:
+                limiter.release()  # cancelled
+                raise
+            limiter.release(outcome, attempt=attempt)
+            if metrics is not None:
+                metrics.probe_done(outcome, sample)
+            if pacing is not None:
+                pacing.update(host, outcome, attempt)
+            if sample is not None and rtt is not None:
+                rtt.update(host, sample)
+            # a silent port on a host that answers elsewhere may just be packet loss
+            if outcome == TIMEOUT and attempt < retries and (rtt is None or rtt.responsive(host)):
+                attempt += 1
+                continue
+            return outcome
+
+    # the semaphore of a host lives only while probes to it are in flight or waiting
+    # (a /8 would otherwise keep one per address until the end)
+    async def probe(host, port):
+        if per_host is None:
+            return await probe_with_retries(host, port)
+        entry = host_slots.get(host)
+        if entry is None:
+            entry = host_slots[host] = [asyncio.Semaphore(per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await probe_with_retries(host, port)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del host_slots[host]
+
+    async def worker():
+        nonlocal done, last_percent
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return
+            target = await next_target()
+            if target is None:
+                return
+            host, port = target
+            outcome = await probe(host, port)
+            if record is not None:
+                record(host, port, outcome)
+            if outcome == OPEN:
+                found.put_nowait((host, port))
+            done += 1
+            if not total:
+                continue
+            # only report when the percentage really changes
+            percent = int(done / total * 100)
+            if progress is not None and percent != last_percent:
+                last_percent = percent
+                progress(percent)
+
+    # stop() ends the scan right away, the probes in flight do not run into their timeouts first
+    async def watch_stop():
+        while not stop_event.is_set():
+            await asyncio.sleep(STOP_POLL)
+        found.put_nowait(None)
+
+    workers = clamp_concurrency(concurrency)
+    if total:
+        workers = min(workers, total)
+    tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+    all_done = asyncio.gather(*tasks)
+    all_done.add_done_callback(lambda _: found.put_nowait(None))  # end marker
+    watcher = asyncio.ensure_future(watch_stop()) if stop_event is not None else None
+
+    try:
+        while True:
+            target = await found.get()
+            if target is None:
+                break
+            yield target
+        if all_done.done():
+            all_done.result()  # raise errors of the workers
+    finally:
+        # consumer stopped early -> do not leave connects behind
+        if watcher is not None:
+            watcher.cancel()
+        all_done.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(all_done, return_exceptions=True)  # no "exception never retrieved" for the cancel
+        if target_aiter is not None and hasattr(target_aiter, "aclose"):
+            await target_aiter.aclose()
+
+
+# Connect-scan of one host, yields every open port as soon as the connect succeeds
+async def iter_connect_scan(host, ports, timeout=0.5, concurrency=1000, stop_event=None, progress=None,
+                            metrics=None, rtt=None, retries=0):
+    ports = list(ports)
+    async for _, port in iter_connect_targets(((host, port) for port in ports), len(ports), timeout, concurrency,
+                                              stop_event, progress, metrics, rtt, retries):
+        yield port
+
+
+# same as iter_connect_scan, but returns the sorted list at the end
+async def connect_scan(host, ports, timeout=0.5, concurrency=1000, stop_event=None, progress=None, metrics=None,
+                       rtt=None, retries=0):
+    open_ports = [port async for port in iter_connect_scan(host, ports, timeout, concurrency, stop_event, progress,
+                                                           metrics, rtt, retries)]
+    return sorted(open_ports)
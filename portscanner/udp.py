@@ -0,0 +1,135 @@
+"""
+UDP scan: protocol payloads for well-known ports, ICMP port unreachable via connected sockets
+
+    answer                -> open
+    ICMP port unreachable -> closed   (the kernel reports it as ECONNREFUSED on the connected socket)
+    nothing               -> open|filtered
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import time
+import struct
+import socket
+import asyncio
+
+from .metrics import OPEN, CLOSED, FILTERED, TIMEOUT, ERROR
+from .tcp import FILTERED_ERRNOS
+from .ratelimit import RESOURCE_ERRNOS
+
+# hosts in UdpPacing before the ones that are back to a new host's state are dropped
+PACING_HOSTS = 4096
+
+
+def dns_query(name, qtype=1, qclass=1, ident=0x1234, flags=0x0100):
+    header = struct.pack("!HHHHHH", ident, flags, 1, 0, 0, 0)
+    labels = b"".join(bytes([len(part)]) + part.encode() for part in name.split(".") if part)
+    return header + labels + b"\x00" + struct.pack("!HH", qtype, qclass)
+
+
+# SNMPv1 get-request, community "public", sysDescr.0
+SNMP_GET = bytes.fromhex("302902010004067075626c6963a01c0204000000010201000201003"
+                         "00e300c06082b060102010101000500")
+
+# what a service on this port answers to (everything else gets an empty datagram)
+UDP_PAYLOADS = {
+    53: dns_query("version.bind", qtype=16, qclass=3),                       # DNS, TXT CHAOS
+    69: b"\x00\x01portscanner\x00octet\x00",                                 # TFTP read request
+    111: struct.pack("!IIIIII", 0x72FE1AF0, 0, 2, 100000, 2, 0) + b"\x00" * 16,  # portmapper NULL call
+    123: b"\x1b" + b"\x00" * 47,                                             # NTP client request
+    137: (b"\x80\xf0\x00\x00\x00\x01\x00\x00\x00\x00\x00\x00\x20" + b"CKAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+          b"\x00\x00\x21\x00\x01"),                                          # NetBIOS node status
+    161: SNMP_GET,
+    1900: (b"M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\nMAN: \"ssdp:discover\"\r\n"
+           b"MX: 1\r\nST: ssdp:all\r\n\r\n"),                                # SSDP / UPnP
+    5353: dns_query("_services._dns-sd._udp.local", qtype=12, flags=0),     # mDNS service list
+}
+
+
+def udp_payload(port):
+    return UDP_PAYLOADS.get(port, b"")
+
+
+# one datagram on a connected UDP socket -> (outcome, rtt in seconds or None)
+# TIMEOUT = open|filtered, the caller decides whether to ask again
+# raises OSError when this machine runs out of sockets / buffers (RESOURCE_ERRNOS)
+async def udp_probe(host, port, timeout, family=socket.AF_INET):
+    loop = asyncio.get_running_loop()
+    s = socket.socket(family, socket.SOCK_DGRAM)
+    s.setblocking(False)
+    receive = None
+    try:
+        await loop.sock_connect(s, (host, port))  # no packet, only fixes the peer for the ICMP errors
+        start = time.monotonic()
+        s.send(udp_payload(port))
+        receive = asyncio.ensure_future(loop.sock_recv(s, 2048))
+        await asyncio.wait_for(receive, timeout)
+        return OPEN, time.monotonic() - start
+    except asyncio.TimeoutError:
+        return TIMEOUT, None
+    except ConnectionRefusedError:
+        return CLOSED, time.monotonic() - start  # ICMP port unreachable
+    except OSError as e:
+        if e.errno in RESOURCE_ERRNOS:
+            raise
+        return (FILTERED if e.errno in FILTERED_ERRNOS else ERROR), None
+    finally:
+        # cancelled right when the answer came -> fetch the error, else asyncio logs it
+        if receive is not None and receive.done() and not receive.cancelled():
+            receive.exception()
+        s.close()
+
+
+# Send pacing for UDP: at most `rate` datagrams/s overall and `host_rate` per host.
+# Linux sends only 6 port unreachables at once and then 1 per second (net.ipv4.icmp_ratelimit),
+# the other ports look silent. When a retry of a silent port gets the unreachable, the first one
+# was dropped by such a limit -> the rate of the host is halved (down to min_host_rate).
+# Only hosts with a lowered rate or a send slot still ahead are kept, so a sweep over many hosts
+# does not keep one entry per address.
+class UdpPacing:
+
+    def __init__(self, rate=1000, host_rate=100, min_host_rate=1):
+        self.rate = rate
+        self.host_rate = host_rate
+        self.min_host_rate = min_host_rate
+        self.next_send = 0.0
+        self.hosts = {}  # host -> [rate, next send time]
+        self.prune_at = PACING_HOSTS
+
+    def host(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            if len(self.hosts) >= self.prune_at:
+                self.prune(time.monotonic())
+            state = self.hosts[host] = [self.host_rate, 0.0]
+        return state
+
+    # drop the hosts a new entry would look the same for: full rate and the next slot already passed
+    def prune(self, now):
+        self.hosts = {host: state for host, state in self.hosts.items()
+                      if state[0] < self.host_rate or state[1] > now}
+        self.prune_at = max(PACING_HOSTS, 2 * len(self.hosts))
+
+    # reserves the next free slot of the host and of the whole scan, sleeps until then
+    async def wait(self, host):
+        state = self.host(host)
+        now = time.monotonic()
+        slot = max(now, state[1])
+        state[1] = slot + 1.0 / state[0]
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        now = time.monotonic()
+        slot = max(now, self.next_send)
+        self.next_send = slot + (1.0 / self.rate if self.rate else 0.0)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    # attempt: 0 = first probe of the port, 1.. = retries
+    def update(self, host, outcome, attempt=0):
+        if outcome == CLOSED and attempt > 0:
+            state = self.host(host)
+            state[0] = max(self.min_host_rate, state[0] / 2)
+
+    # current rate for a host (datagrams/s)
+    def host_rate_of(self, host):
+        return self.host(host)[0]
@@ -18,15 +18,19 @@ class Ui_MainWindow(object):
         self.localHostsText = QtWidgets.QTextEdit(parent=self.centralwidget)
         self.localHostsText.setGeometry(QtCore.QRect(330, 120, 281, 141))
         self.localHostsText.setObjectName("localHostsText")
-        self.openPortsText = QtWidgets.QTextEdit(parent=self.centralwidget)
-        self.openPortsText.setGeometry(QtCore.QRect(20, 290, 221, 101))
-        self.openPortsText.setObjectName("openPortsText")
+        self.openPortsTable = QtWidgets.QTableView(parent=self.centralwidget)
+        self.openPortsTable.setGeometry(QtCore.QRect(20, 290, 261, 101))
+        self.openPortsTable.setObjectName("openPortsTable")
         self.ipAddressText = QtWidgets.QTextEdit(parent=self.centralwidget)
         self.ipAddressText.setGeometry(QtCore.QRect(20, 40, 131, 51))
         self.ipAddressText.setObjectName("ipAddressText")
-        self.freePortsText = QtWidgets.QTextEdit(parent=self.centralwidget)
-        self.freePortsText.setGeometry(QtCore.QRect(20, 140, 221, 101))
-        self.freePortsText.setObjectName("freePortsText")
+        self.freePortsTable = QtWidgets.QTableView(parent=self.centralwidget)
+        self.freePortsTable.setGeometry(QtCore.QRect(20, 140, 261, 101))
+        self.freePortsTable.setObjectName("freePortsTable")
+        self.portFilterEdit = QtWidgets.QLineEdit(parent=self.centralwidget)
+        self.portFilterEdit.setGeometry(QtCore.QRect(140, 100, 141, 26))
+        self.portFilterEdit.setClearButtonEnabled(True)
+        self.portFilterEdit.setObjectName("portFilterEdit")
         self.myIPBtn = QtWidgets.QPushButton(parent=self.centralwidget)
         self.myIPBtn.setGeometry(QtCore.QRect(20, 100, 101, 26))
         self.myIPBtn.setObjectName("myIPBtn")
@@ -97,6 +101,7 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow"))
+        self.portFilterEdit.setPlaceholderText(_translate("MainWindow", "Filter: 22, state:open"))
         self.myIPBtn.setText(_translate("MainWindow", "my IP Address"))
         self.freeBtn.setText(_translate("MainWindow", "Free Ports"))
         self.openPortsBtn.setText(_translate("MainWindow", "Open Ports"))
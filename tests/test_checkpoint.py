@@ -0,0 +1,98 @@
+"""
+Tests for the watermark of finished targets and resuming a scan from its checkpoint
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import os
+
+from portscanner import TargetScan, ShardedScan
+from portscanner.checkpoint import Watermark, save_checkpoint, load_checkpoint
+from benchmarks.simulator import TargetSimulator
+
+BASE_PORT = 35100
+
+
+def test_watermark_waits_for_the_gap():
+    watermark = Watermark()
+    for target in ("a", "b", "c", "d"):
+        watermark.issue(target)
+    watermark.done("c")
+    watermark.done("b")
+    assert watermark.position == 0
+    watermark.done("a")
+    assert watermark.position == 3
+    watermark.done("d")
+    assert watermark.position == 4
+
+
+def test_watermark_ignores_unknown_targets():
+    watermark = Watermark()
+    watermark.issue("a")
+    watermark.done("x")
+    watermark.done("a")
+    watermark.done("a")
+    assert watermark.position == 1
+
+
+def test_save_checkpoint_replaces_the_file(tmp_path):
+    path = str(tmp_path / "scan.json")
+    save_checkpoint(path, {"span": [0, 10, 1]})
+    save_checkpoint(path, {"span": [4, 10, 1]})
+    assert load_checkpoint(path) == {"span": [4, 10, 1]}
+    assert os.listdir(tmp_path) == ["scan.json"]
+
+
+def test_resume_continues_at_the_position(tmp_path):
+    path = str(tmp_path / "scan.json")
+    done_port, open_port = BASE_PORT + 2, BASE_PORT + 7
+    with TargetSimulator(open_ports=(open_port,)):
+        scan = TargetScan("127.0.0.1", f"{BASE_PORT}-{BASE_PORT + 9}", timeout=0.5, retries=0, checkpoint=path)
+        # as if the first 5 targets were finished before the scan was stopped, one of them open
+        state = scan.checkpoint_state()
+        state["span"][0] = 5
+        state["results"] = [["127.0.0.1", done_port]]
+        save_checkpoint(path, state)
+
+        resumed = TargetScan.resume(path)
+        assert resumed.run() == [("127.0.0.1", done_port), ("127.0.0.1", open_port)]
+    assert resumed.metrics.snapshot()["probes_sent"] == 5
+    assert not os.path.exists(path)  # complete -> removed
+
+
+def test_open_port_past_the_position_is_not_reported_twice(tmp_path):
+    path = str(tmp_path / "scan.json")
+    open_port = BASE_PORT + 7
+    with TargetSimulator(open_ports=(open_port,)):
+        scan = TargetScan("127.0.0.1", f"{BASE_PORT}-{BASE_PORT + 9}", timeout=0.5, retries=0, checkpoint=path)
+        # target 5 was still in flight when the scan was stopped, the open port after it had finished
+        state = scan.checkpoint_state()
+        state["span"][0] = 5
+        state["results"] = [["127.0.0.1", open_port]]
+        save_checkpoint(path, state)
+
+        resumed = TargetScan.resume(path)
+        assert resumed.run() == [("127.0.0.1", open_port)]
+    assert resumed.metrics.snapshot()["probes_sent"] == 4
+
+
+def test_sharded_resume_skips_restored_targets(tmp_path):
+    path = str(tmp_path / "scan.json")
+    open_port = BASE_PORT + 7
+    with TargetSimulator(open_ports=(open_port,)):
+        scan = ShardedScan("127.0.0.1", f"{BASE_PORT}-{BASE_PORT + 9}", workers=2, timeout=0.5, retries=0,
+                           checkpoint=path)
+        state = scan.checkpoint_state()  # nothing finished yet, but the open port already found
+        state["results"] = [["127.0.0.1", open_port]]
+        save_checkpoint(path, state)
+
+        assert ShardedScan.resume(path).run() == [("127.0.0.1", open_port)]
+
+
+def test_stopped_scan_keeps_its_checkpoint(tmp_path):
+    path = str(tmp_path / "scan.json")
+    scan = TargetScan("127.0.0.1", f"{BASE_PORT}-{BASE_PORT + 9}", checkpoint=path)
+    scan.stop()
+    assert scan.run() == []
+    state = load_checkpoint(path)
+    assert state["kind"] == "tcp"
+    assert state["span"] == [0, 10, 1]
@@ -0,0 +1,39 @@
+"""
+Tests for the command line: options that do not go together, scans built from the arguments
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import pytest
+
+from portscanner.cli import build_parser, check_args, make_scan
+
+
+def parse(*argv):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    return args
+
+
+@pytest.mark.parametrize("argv", [
+    ("--fixed-timeout", "--max-timeout", "3"),
+    ("--fixed-timeout", "--min-timeout", "0.1"),
+    ("--delta", "--fixed-timeout"),
+    ("--udp", "--syn"),
+    ("--services", "--workers", "4"),
+])
+def test_conflicting_options(argv, capsys):
+    with pytest.raises(SystemExit):
+        parse("scan", "127.0.0.1", *argv)
+    assert "does not work together with" in capsys.readouterr().err
+
+
+def test_defaults_are_not_conflicts():
+    args = parse("scan", "127.0.0.1", "--fixed-timeout", "--workers", "1")
+    assert args.fixed_timeout
+
+
+def test_fixed_timeout_keeps_the_retries():
+    scan = make_scan(parse("scan", "127.0.0.1", "-p", "22", "--fixed-timeout", "--retries", "3"))
+    assert scan.rtt is None
+    assert scan.retries == 3
@@ -0,0 +1,97 @@
+"""
+Tests for result records and the streaming exporters
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import csv
+import gzip
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from portscanner.export import result_record, open_exporter, export_format, FIELDS
+
+
+def test_record_of_a_port_scan_result():
+    record = result_record(("10.0.0.1", 22), service=("ssh", "OpenSSH_9.6"))
+    assert record == dict.fromkeys(FIELDS) | {"host": "10.0.0.1", "port": 22, "protocol": "tcp", "state": "open",
+                                              "service": "ssh", "version": "OpenSSH_9.6"}
+
+
+def test_record_of_a_host_found_by_the_pipeline():
+    record = result_record(("10.0.0.1", None))
+    assert (record["host"], record["port"], record["protocol"], record["state"]) == ("10.0.0.1", None, None, "up")
+
+
+def test_records_of_delta_scans():
+    assert result_record(("new", "10.0.0.1", 443))["state"] == "open"
+    assert result_record(("gone", "10.0.0.1", 443))["state"] == "closed"
+    assert result_record(("gone", "10.0.0.1", None))["state"] == "down"
+    assert result_record(("new", "10.0.0.1", None))["change"] == "new"
+
+
+def test_record_of_a_free_port():
+    record = result_record(8080, state="free", host="localhost", protocol="udp")
+    assert (record["host"], record["port"], record["protocol"], record["state"]) == ("localhost", 8080, "udp", "free")
+
+
+def test_records_of_host_discovery():
+    arp = result_record({"ip": "10.0.0.5", "mac": "aa:bb:cc:dd:ee:ff", "hostname": "unknown"})
+    assert (arp["host"], arp["mac"], arp["hostname"]) == ("10.0.0.5", "aa:bb:cc:dd:ee:ff", None)
+    dns = result_record("printer.lan: 10.0.0.7")
+    assert (dns["host"], dns["hostname"], dns["state"]) == ("10.0.0.7", "printer.lan", "up")
+    assert result_record("10.0.0.8: no hostname")["hostname"] is None
+    assert result_record("10.0.0.9")["host"] == "10.0.0.9"
+
+
+def test_empty_version_is_none():
+    assert result_record(("10.0.0.1", 80), service=("http", ""))["version"] is None
+
+
+@pytest.mark.parametrize("name, fmt", [("a.jsonl", "jsonl"), ("a.JSON", "jsonl"), ("a.csv.gz", "csv"),
+                                       ("a.xml", "xml")])
+def test_export_format_from_the_file_name(name, fmt):
+    assert export_format(name) == fmt
+
+
+def test_unknown_export_format():
+    with pytest.raises(ValueError):
+        export_format("scan.txt")
+
+
+def test_jsonl_gz(tmp_path):
+    path = tmp_path / "scan.jsonl.gz"
+    with open_exporter(str(path)) as writer:
+        writer.write(("10.0.0.1", 22))
+        writer.write(("10.0.0.2", 80), ("http", "nginx"))
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{"host": "10.0.0.1", "port": 22, "protocol": "tcp", "state": "open"},
+                     {"host": "10.0.0.2", "port": 80, "protocol": "tcp", "state": "open", "service": "http",
+                      "version": "nginx"}]
+
+
+def test_csv(tmp_path):
+    path = tmp_path / "scan.csv"
+    with open_exporter(str(path), protocol="udp") as writer:
+        writer.write(("10.0.0.1", 53))
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(FIELDS)
+    assert rows[1][:4] == ["10.0.0.1", "53", "udp", "open"]
+
+
+def test_nmap_xml(tmp_path):
+    path = tmp_path / "scan.xml"
+    with open_exporter(str(path), services="22,80", scan_type="syn") as writer:
+        writer.write(("10.0.0.1", 22), ("ssh", "OpenSSH_9.6"))
+        writer.write(("gone", "10.0.0.2", None))
+    root = ET.parse(path).getroot()
+    assert root.find("scaninfo").get("numservices") == "2"
+    first, second = root.findall("host")
+    assert first.find("ports/port").get("portid") == "22"
+    assert first.find("ports/port/state").get("reason") == "syn-ack"
+    assert first.find("ports/port/service").get("version") == "OpenSSH_9.6"
+    assert second.find("status").get("state") == "down"
+    assert root.find("runstats/hosts").attrib == {"up": "1", "down": "1", "total": "2"}
@@ -0,0 +1,50 @@
+"""
+Tests for the ICMP echo engine: packets and sweeps of IPv4 and IPv6 loopback
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import socket
+import struct
+
+import pytest
+
+from portscanner.icmp import (iter_icmp_sweep, open_icmp_socket, build_echo_request, parse_echo_reply,
+                              icmp_checksum, ICMP_ECHO_REPLY, ICMPV6_ECHO_REPLY, ICMPV6_ECHO_REQUEST)
+
+
+def icmp_available(family):
+    sock, _ = open_icmp_socket(family)
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def test_echo_request_checksum():
+    packet = build_echo_request(0x1234, 7)
+    assert icmp_checksum(packet) == 0
+    assert struct.unpack("!BBHHH", packet[:8])[3:] == (0x1234, 7)
+
+
+def test_icmpv6_echo_request_leaves_the_checksum_to_the_kernel():
+    packet = build_echo_request(0x1234, 7, family=socket.AF_INET6)
+    assert struct.unpack("!BBHHH", packet[:8]) == (ICMPV6_ECHO_REQUEST, 0, 0, 0x1234, 7)
+
+
+def test_parse_echo_reply():
+    reply = struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, 0, 5, 9)
+    assert parse_echo_reply(reply, is_raw=False) == (5, 9)
+    assert parse_echo_reply(bytes([0x45]) + bytes(19) + reply, is_raw=True) == (5, 9)
+    assert parse_echo_reply(reply, is_raw=False, family=socket.AF_INET6) is None
+    reply6 = struct.pack("!BBHHH", ICMPV6_ECHO_REPLY, 0, 0, 5, 9)
+    assert parse_echo_reply(reply6, is_raw=True, family=socket.AF_INET6) == (5, 9)
+
+
+@pytest.mark.parametrize("family, addresses, alive", [
+    (socket.AF_INET, ["127.0.0.1"], ["127.0.0.1"]),
+    (socket.AF_INET6, ["::1"], ["::1"]),
+])
+def test_sweep_of_loopback(family, addresses, alive):
+    if not icmp_available(family):
+        pytest.skip("no ICMP socket")
+    assert list(iter_icmp_sweep(addresses, timeout=0.5, rate=0, family=family)) == alive
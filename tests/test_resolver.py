@@ -0,0 +1,128 @@
+"""
+Tests for the reverse-DNS cache and resolver, with a stub instead of real DNS
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import socket
+import itertools
+import threading
+
+from portscanner import resolver
+from portscanner.resolver import HostnameCache, ReverseResolver
+from portscanner.targets import HostRange, HostOrder
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# answers "host-<last byte>" for even last bytes, herror for odd ones; counts the lookups
+class StubLookup:
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, ip):
+        with self.lock:
+            self.calls.append(ip)
+        last = int(ip.rsplit(".", 1)[1])
+        if last % 2:
+            raise socket.herror(1, "Unknown host")
+        return f"host-{last}", [], [ip]
+
+
+def test_cache_hit_and_expiry(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resolver.time, "time", clock)
+    cache = HostnameCache(ttl=60, negative_ttl=10)
+    cache.put("10.0.0.1", "a.example")
+    cache.put("10.0.0.2", None)
+    assert cache.get("10.0.0.1") == (True, "a.example")
+    assert cache.get("10.0.0.2") == (True, None)
+    clock.now += 30
+    assert cache.get("10.0.0.1") == (True, "a.example")
+    assert cache.get("10.0.0.2") == (False, None)  # failed lookups expire sooner
+    clock.now += 31
+    assert cache.get("10.0.0.1") == (False, None)
+    assert cache.get("10.0.0.3") == (False, None)
+
+
+def test_cache_drops_the_least_recently_used():
+    cache = HostnameCache(maxsize=2)
+    cache.put("10.0.0.1", "a")
+    cache.put("10.0.0.2", "b")
+    cache.get("10.0.0.1")
+    cache.put("10.0.0.3", "c")
+    assert cache.get("10.0.0.2") == (False, None)
+    assert cache.get("10.0.0.1") == (True, "a")
+    assert cache.get("10.0.0.3") == (True, "c")
+
+
+def test_cache_file_round_trip(tmp_path):
+    path = str(tmp_path / "dns.json")
+    cache = HostnameCache(path=path)
+    cache.put("10.0.0.1", "a")
+    cache.put("10.0.0.2", None)
+    cache.save()
+    loaded = HostnameCache(path=path)
+    assert loaded.get("10.0.0.1") == (True, "a")
+    assert loaded.get("10.0.0.2") == (True, None)
+
+
+def test_resolve_many_with_stub():
+    lookup = StubLookup()
+    names = ReverseResolver(workers=4, cache=HostnameCache(), lookup=lookup).resolve_many(
+        [f"10.0.0.{i}" for i in range(1, 7)])
+    assert names == {"10.0.0.1": None, "10.0.0.2": "host-2", "10.0.0.3": None, "10.0.0.4": "host-4",
+                     "10.0.0.5": None, "10.0.0.6": "host-6"}
+
+
+def test_answers_come_from_the_cache():
+    lookup = StubLookup()
+    dns = ReverseResolver(workers=4, cache=HostnameCache(), lookup=lookup)
+    dns.resolve_many(["10.0.0.2", "10.0.0.3"])
+    assert dns.resolve("10.0.0.2") == "host-2"
+    assert dns.resolve("10.0.0.3") is None
+    assert sorted(lookup.calls) == ["10.0.0.2", "10.0.0.3"]
+
+
+def test_addresses_are_read_lazily():
+    read = []
+
+    def addresses():
+        for i in itertools.count():
+            read.append(i)
+            yield f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+    dns = ReverseResolver(workers=2, cache=HostnameCache(), lookup=StubLookup())
+    answers = dns.iter_resolve(addresses())
+    first = [next(answers) for _ in range(10)]
+    answers.close()
+    assert len(first) == 10
+    assert len(read) < 100  # a bounded window, not the whole (endless) range
+
+
+def test_ipv6_prefix_larger_than_sys_maxsize():
+    percents = []
+    dns = ReverseResolver(workers=2, cache=HostnameCache(), lookup=lambda ip: ("v6", [], [ip]))
+    answers = dns.iter_resolve(HostOrder(HostRange("2001:db8::/64", every=True)), progress=percents.append)
+    first = [next(answers) for _ in range(3)]
+    answers.close()
+    assert [hostname for _, hostname in first] == ["v6", "v6", "v6"]
+    assert percents == [0]
+
+
+def test_stop_event_ends_the_lookups():
+    stop = threading.Event()
+    dns = ReverseResolver(workers=2, cache=HostnameCache(), lookup=StubLookup())
+    results = []
+    for pair in dns.iter_resolve((f"10.0.{i >> 8}.{i & 255}" for i in range(10000)), stop_event=stop):
+        results.append(pair)
+        stop.set()
+    assert len(results) < 100
@@ -0,0 +1,69 @@
+"""
+Tests for the SYN prober: packets, the cookie and probes on loopback (needs root / CAP_NET_RAW)
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import socket
+import struct
+import asyncio
+
+import pytest
+
+from portscanner.syn import SynProber, syn_available, build_syn, parse_tcp_reply, TCP_SYN
+from portscanner.icmp import icmp_checksum
+from portscanner.metrics import OPEN, CLOSED
+from benchmarks.simulator import TargetSimulator
+
+BASE_PORT = 35300
+
+needs_raw_socket = pytest.mark.skipif(not syn_available(), reason="raw sockets need root / CAP_NET_RAW")
+
+
+def test_syn_checksum_and_fields():
+    segment = build_syn("10.0.0.1", "10.0.0.2", 40000, 443, 0x12345678)
+    src_port, dst_port, seq, ack, _, flags = struct.unpack("!HHIIBB", segment[:14])
+    assert (src_port, dst_port, seq, ack, flags) == (40000, 443, 0x12345678, 0, TCP_SYN)
+    pseudo = socket.inet_aton("10.0.0.1") + socket.inet_aton("10.0.0.2") + struct.pack(
+        "!BBH", 0, socket.IPPROTO_TCP, len(segment))
+    assert icmp_checksum(pseudo + segment) == 0  # a correct checksum sums up to zero
+
+
+def test_parse_tcp_reply():
+    ip_header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 40, 0, 0, 64, socket.IPPROTO_TCP, 0,
+                            socket.inet_aton("10.0.0.2"), socket.inet_aton("10.0.0.1"))
+    segment = struct.pack("!HHIIBBHHH", 443, 40000, 1, 0x12345679, 0x50, 0x12, 1024, 0, 0)
+    assert parse_tcp_reply(ip_header + segment) == ("10.0.0.2", 443, 40000, 0x12345679, 0x12)
+    assert parse_tcp_reply(ip_header[:9] + bytes([socket.IPPROTO_UDP]) + ip_header[10:] + segment) is None
+    assert parse_tcp_reply(ip_header + segment[:10]) is None
+
+
+@needs_raw_socket
+def test_cookie_per_target():
+    prober = SynProber()
+    try:
+        assert prober.cookie("127.0.0.1", 80) == prober.cookie("127.0.0.1", 80)
+        assert prober.cookie("127.0.0.1", 80) != prober.cookie("127.0.0.1", 81)
+        assert prober.cookie("127.0.0.1", 80) != prober.cookie("127.0.0.2", 80)
+        other = SynProber()
+        assert other.cookie("127.0.0.1", 80) != prober.cookie("127.0.0.1", 80)  # own secret per scan
+        other.close()
+    finally:
+        prober.close()
+
+
+@needs_raw_socket
+def test_syn_probe_on_loopback():
+    async def probe_both(prober):
+        return await asyncio.gather(prober.probe("127.0.0.1", BASE_PORT, 1.0),
+                                    prober.probe("127.0.0.1", BASE_PORT + 1, 1.0))
+
+    prober = SynProber()
+    try:
+        with TargetSimulator(open_ports=(BASE_PORT,)):
+            (open_outcome, open_rtt), (closed_outcome, _) = asyncio.run(probe_both(prober))
+    finally:
+        prober.close()
+    assert open_outcome == OPEN
+    assert open_rtt is not None
+    assert closed_outcome == CLOSED
+    assert prober.pending == {}
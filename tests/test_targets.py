@@ -0,0 +1,87 @@
+"""
+Tests for the target space: port specs, Permutation, TargetSpec and its shards
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import pytest
+
+from portscanner.targets import parse_ports, format_ports, Permutation, TargetSpec, HostRange, TOP_PORTS
+from portscanner.shard import shard_targets
+
+
+def test_parse_ports_ranges_and_duplicates():
+    assert parse_ports("80,22,1000-1002,22") == [22, 80, 1000, 1001, 1002]
+    assert parse_ports(" 443 , 1-2") == [1, 2, 443]
+
+
+def test_parse_ports_top_lists():
+    assert parse_ports("top5") == sorted(TOP_PORTS[:5])
+    assert parse_ports("udptop3,53") == [53, 137, 161, 631]
+
+
+@pytest.mark.parametrize("spec", ["0", "65536", "10-5", "top0", "", "abc"])
+def test_parse_ports_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_ports(spec)
+
+
+def test_format_ports_round_trip():
+    ports = [1, 2, 3, 22, 80, 8000, 8001]
+    assert format_ports(ports) == "1-3,22,80,8000-8001"
+    assert parse_ports(format_ports(ports)) == ports
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000, 4099])
+def test_permutation_is_a_bijection(size):
+    order = Permutation(size, seed=7)
+    assert sorted(order[i] for i in range(size)) == list(range(size))
+
+
+def test_permutation_same_seed_same_order():
+    first, second = Permutation(500, seed=3), Permutation(500, seed=3)
+    assert [first[i] for i in range(500)] == [second[i] for i in range(500)]
+    assert [first[i] for i in range(500)] != list(range(500))
+
+
+def test_permutation_index_out_of_range():
+    with pytest.raises(IndexError):
+        Permutation(10, seed=1)[10]
+
+
+def test_target_spec_interleaves_hosts():
+    targets = TargetSpec("10.0.0.1,10.0.0.2", "22,80")
+    assert list(targets) == [("10.0.0.1", 22), ("10.0.0.2", 22), ("10.0.0.1", 80), ("10.0.0.2", 80)]
+    assert targets.count == 4
+
+
+def test_target_spec_network_without_network_and_broadcast_address():
+    hosts = HostRange("192.168.5.0/30")
+    assert [hosts[i] for i in range(hosts.count)] == ["192.168.5.1", "192.168.5.2"]
+
+
+def test_shuffled_target_spec_has_every_target_once():
+    plain = TargetSpec("10.1.0.0/28", "1-20")
+    shuffled = TargetSpec("10.1.0.0/28", "1-20", shuffle=True, seed=11)
+    assert sorted(shuffled) == sorted(plain)
+    assert list(shuffled) != list(plain)
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+@pytest.mark.parametrize("shards", [1, 3, 8])
+def test_shards_cover_every_target_once(shuffle, shards):
+    targets = TargetSpec("10.2.0.0/29,10.3.0.1", "22,80,443", shuffle=shuffle, seed=5)
+    parts = shard_targets(targets, shards)
+    assert len(parts) == shards
+    combined = [target for part in parts for target in part]
+    assert sorted(combined) == sorted(targets)
+    assert sum(part.count for part in parts) == targets.count
+
+
+def test_more_shards_than_targets():
+    targets = TargetSpec("10.0.0.1", "22,80")
+    assert len(shard_targets(targets, 8)) == 2
+
+
+def test_skip_continues_in_the_same_order():
+    targets = TargetSpec("10.4.0.0/28", "1-5", shuffle=True, seed=9)
+    assert list(targets.skip(17)) == list(targets)[17:]
@@ -0,0 +1,55 @@
+"""
+Tests for the UDP probe and scan on loopback: ICMP port unreachable, echoed datagrams, pacing
+
+Copyright © 2025 Martin Tastler - license see Portscanner.py
+"""
+import asyncio
+
+from portscanner import UdpScan
+from portscanner.udp import udp_probe, UdpPacing, PACING_HOSTS
+from portscanner.metrics import OPEN, CLOSED
+from portscanner.portstate import PORT_UNKNOWN
+from benchmarks.simulator import TargetSimulator
+
+BASE_PORT = 35200
+
+
+def test_closed_port_answers_port_unreachable():
+    outcome, rtt = asyncio.run(udp_probe("127.0.0.1", BASE_PORT, 1.0))
+    assert outcome == CLOSED
+    assert rtt is not None
+
+
+def test_open_port_answers():
+    with TargetSimulator(udp_ports=(BASE_PORT + 1,)):
+        outcome, rtt = asyncio.run(udp_probe("127.0.0.1", BASE_PORT + 1, 1.0))
+    assert outcome == OPEN
+    assert rtt is not None
+
+
+def test_udp_scan_on_loopback():
+    with TargetSimulator(udp_ports=(BASE_PORT + 1,)):
+        scan = UdpScan("127.0.0.1", f"{BASE_PORT}-{BASE_PORT + 2}", timeout=0.3, retries=1, rate=0,
+                       host_rate=1000)
+        assert scan.run() == [("127.0.0.1", BASE_PORT + 1)]
+    assert scan.silent_ports() == []
+    assert scan.states.get("127.0.0.1", BASE_PORT) == PORT_UNKNOWN  # closed ports are not kept
+
+
+def test_late_port_unreachable_halves_the_host_rate():
+    pacing = UdpPacing(host_rate=100, min_host_rate=10)
+    pacing.update("10.0.0.1", CLOSED, attempt=0)
+    assert pacing.host_rate_of("10.0.0.1") == 100
+    for _ in range(5):
+        pacing.update("10.0.0.1", CLOSED, attempt=1)
+    assert pacing.host_rate_of("10.0.0.1") == 10
+    assert pacing.host_rate_of("10.0.0.2") == 100
+
+
+def test_pacing_keeps_only_hosts_with_state():
+    pacing = UdpPacing(host_rate=100)
+    pacing.update("10.0.0.1", CLOSED, attempt=1)
+    for i in range(3 * PACING_HOSTS):
+        pacing.host(f"10.1.{i >> 8}.{i & 255}")
+    assert len(pacing.hosts) <= PACING_HOSTS
+    assert pacing.host_rate_of("10.0.0.1") == 50